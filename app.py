@@ -1,10 +1,86 @@
-from flask import Flask, render_template, redirect, url_for, session, request, flash
+from flask import (Flask, render_template, redirect, url_for, session, request, flash, g, jsonify,
+                   current_app, has_app_context, has_request_context, stream_with_context)
 import sqlite3  # Этот импорт должен быть в самом верху!
+import base64
+import binascii
+import csv
+import hashlib
+import io
+import json
 import os
+import threading
 import time
-
-app = Flask(__name__)
-app.secret_key = 'your_secret_key_here_change_this'  # Важно изменить на свой ключ!
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask.cli import with_appcontext
+
+from kalendar import build_calendar
+from limity import create_login_limiter
+from mero import DEFAULT_EVENTS, EventsModule, insert_events, parse_event_start
+from paroli import PasswordHashBusy, hash_password, hash_passwords, verify_password
+from sessii import ServerSessionInterface, create_session_backend
+from soobsh import BROADCASTS, MessagesModule, insert_default_messages
+from star import StarostaModule
+from prepod import TeachersModule
+from rasp import (ScheduleModule, insert_exams, insert_lessons, iter_default_exams,
+                  iter_default_lessons, materialize_timetables, timetable_events)
+
+# ==================== РЕГИСТРАЦИЯ МАРШРУТОВ ====================
+
+# Маршруты и команды CLI собираются при импорте модуля, а подключаются
+# к приложению в create_app(). Имена endpoint'ов совпадают с именами
+# функций, как при @app.route.
+_routes = []
+_cli_commands = []
+
+def route(rule, **options):
+    """Аналог @app.route с отложенной регистрацией"""
+    def decorator(f):
+        _routes.append((rule, f, options))
+        return f
+    return decorator
+
+def cli_command(command):
+    """Отложенная регистрация команды click (flask <имя команды>)"""
+    _cli_commands.append(command)
+    return command
+
+class LazyModule:
+    """Заместитель объекта, который создается при первом обращении.
+
+    Модули и хранилища создаются не при импорте, а когда впервые
+    понадобятся, поэтому импорт app.py не обращается к БД.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    @property
+    def is_loaded(self):
+        """Создан ли уже объект"""
+        return self._instance is not None
+
+    def reset(self):
+        """Забыть созданный объект (в новом процессе он создается заново)"""
+        self._instance = None
+        self._lock = threading.Lock()
+
+# Сессии хранятся на сервере (см. sessii.py), в cookie - только идентификатор
+session_backend = LazyModule(create_session_backend)
 
 # ==================== МОДУЛИ ====================
 
@@ -15,45 +91,74 @@ class TutoringModule:
     
     def get_db_connection(self):
         """Получить соединение с БД"""
-        conn = sqlite3.connect(self.db_name)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return get_db_connection()
     
     # Исправленный метод - должен быть внутри класса с правильным отступом
-    def get_tutoring_data(self):
-        """Получить все репетиторства для отображения на странице"""
+    def get_tutoring_data(self, after=None, limit=None):
+        """Получить репетиторства для отображения на странице.
+
+        Без limit возвращаются все записи. С limit - одна страница,
+        упорядоченная по (created_at, id) по убыванию; after - курсор
+        последней строки предыдущей страницы, next_cursor - курсор
+        для следующей (None, если страниц больше нет).
+        """
         try:
             conn = self.get_db_connection()
             cursor = conn.cursor()
             
-            # Получаем все репетиторства с информацией о записях
-            cursor.execute('''
-            SELECT t.*, 
-                   COUNT(tr.id) as registered_count
-            FROM tutoring t
-            LEFT JOIN tutoring_registrations tr ON t.id = tr.tutoring_id AND tr.status != 'отменено'
-            GROUP BY t.id
-            ORDER BY t.created_at DESC
-            ''')
+            # Получаем репетиторства (счетчики записей ведутся триггерами)
+            if limit is None:
+                cursor.execute('''
+                SELECT t.*
+                FROM tutoring t
+                ORDER BY t.created_at DESC, t.id DESC
+                ''')
+            else:
+                key = decode_cursor(after, 2)
+                cursor.execute(f'''
+                SELECT t.*
+                FROM tutoring t
+                {'WHERE (t.created_at, t.id) < (?, ?)' if key else ''}
+                ORDER BY t.created_at DESC, t.id DESC
+                LIMIT ?
+                ''', (*(key or ()), limit + 1))
             
-            result = []
-            for row in cursor.fetchall():
-                # Получаем список записавшихся студентов
+            rows = cursor.fetchall()
+            next_cursor = None
+            if limit is not None and len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor([rows[-1]['created_at'], rows[-1]['id']])
+
+            # Получаем записавшихся студентов одним запросом
+            # и группируем их по репетиторствам
+            if limit is None:
                 cursor.execute('''
-                SELECT tr.student_id, u.full_name as name, tr.status
+                SELECT tr.tutoring_id, tr.student_id, u.full_name as name, tr.status
                 FROM tutoring_registrations tr
                 JOIN users u ON tr.student_id = u.id
-                WHERE tr.tutoring_id = ? AND tr.status != 'отменено'
-                ''', (row['id'],))
-                
-                students = []
-                for student_row in cursor.fetchall():
-                    students.append({
-                        'student_id': student_row[0],
-                        'name': student_row[1],
-                        'status': student_row[2]
-                    })
-                
+                WHERE tr.status != 'отменено'
+                ORDER BY tr.id
+                ''')
+            else:
+                ids = [row['id'] for row in rows]
+                cursor.execute(f'''
+                SELECT tr.tutoring_id, tr.student_id, u.full_name as name, tr.status
+                FROM tutoring_registrations tr
+                JOIN users u ON tr.student_id = u.id
+                WHERE tr.tutoring_id IN ({', '.join('?' * len(ids))}) AND tr.status != 'отменено'
+                ORDER BY tr.id
+                ''', ids)
+
+            students_by_tutoring = {}
+            for student_row in cursor.fetchall():
+                students_by_tutoring.setdefault(student_row['tutoring_id'], []).append({
+                    'student_id': student_row['student_id'],
+                    'name': student_row['name'],
+                    'status': student_row['status']
+                })
+
+            result = []
+            for row in rows:
                 result.append({
                     'id': row['id'],
                     'subject': row['subject'],
@@ -67,76 +172,86 @@ class TutoringModule:
                     'price': row['price'],
                     'max_students': row['max_students'],
                     'registered_count': row['registered_count'] or 0,
+                    'pending_count': row['pending_count'] or 0,
                     'status': row['status'],
-                    'students': students,
+                    'students': students_by_tutoring.get(row['id'], []),
                     'created_at': row['created_at']
                 })
             
-            conn.close()
-            
             # Разделяем на преподавателей и студентов
             return {
                 'teachers': [t for t in result if t['tutor_type'] == 'teacher'],
-                'students': [t for t in result if t['tutor_type'] == 'student']
+                'students': [t for t in result if t['tutor_type'] == 'student'],
+                'next_cursor': next_cursor
             }
             
         except Exception as e:
             print(f"❌ Ошибка получения данных репетиторства: {e}")
-            return {'teachers': [], 'students': []}
+            return {'teachers': [], 'students': [], 'next_cursor': None}
     
-    def register_student_for_tutoring(self, tutoring_id, student_id, student_name):
-        """Записать студента на репетиторство"""
-        conn = None
+    def reserve_seat(self, tutoring_id, student_id):
+        """Атомарно занять место на репетиторстве.
+
+        Проверка лимита мест (по счетчику registered_count) и вставка
+        выполняются одной командой
+        INSERT ... SELECT внутри BEGIN IMMEDIATE, поэтому одновременные
+        записи не могут превысить max_students. Повторная запись
+        отсекается уникальным индексом (tutoring_id, student_id).
+
+        Возвращает (успех, код): 'ok', 'not_found', 'duplicate', 'full', 'own'.
+        """
+        conn = self.get_db_connection()
         try:
-            conn = self.get_db_connection()
-            cursor = conn.cursor()
-            
-            # 1. Проверяем, существует ли репетиторство
-            cursor.execute('SELECT * FROM tutoring WHERE id = ?', (tutoring_id,))
-            tutoring = cursor.fetchone()
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.execute('''
+            INSERT INTO tutoring_registrations (tutoring_id, student_id, status)
+            SELECT t.id, ?, 'ожидает'
+            FROM tutoring t
+            WHERE t.id = ? AND t.tutor_id != ? AND t.registered_count < t.max_students
+            ''', (student_id, tutoring_id, student_id))
+
+            if cursor.rowcount == 1:
+                conn.commit()
+                return True, 'ok'
+
+            # Место не занято - выясняем причину в той же транзакции
+            tutoring = conn.execute('SELECT tutor_id FROM tutoring WHERE id = ?',
+                                    (tutoring_id,)).fetchone()
+            registered = conn.execute('''
+            SELECT 1 FROM tutoring_registrations WHERE tutoring_id = ? AND student_id = ?
+            ''', (tutoring_id, student_id)).fetchone()
+            conn.rollback()
+
             if not tutoring:
-                return False, "Репетиторство не найдено"
-            
-            # 2. Проверяем, не записан ли уже студент
-            cursor.execute('''
-                SELECT id FROM tutoring_registrations 
-                WHERE tutoring_id = ? AND student_id = ?
-            ''', (tutoring_id, student_id))
-            
-            if cursor.fetchone():
-                return False, "Вы уже записаны на это репетиторство"
-            
-            # 3. Проверяем количество свободных мест
-            cursor.execute('''
-                SELECT COUNT(*) FROM tutoring_registrations 
-                WHERE tutoring_id = ? AND status != 'отменено'
-            ''', (tutoring_id,))
-            
-            registered_count = cursor.fetchone()[0]
-            max_students = tutoring['max_students']
-            
-            if registered_count >= max_students:
-                return False, "Нет свободных мест"
-            
-            # 4. Проверяем, не пытается ли репетитор записаться на свое же занятие
+                return False, 'not_found'
+            if registered:
+                return False, 'duplicate'
             if tutoring['tutor_id'] == student_id:
-                return False, "Вы не можете записаться на своё же репетиторство"
-            
-            # 5. Записываем студента
-            cursor.execute('''
-                INSERT INTO tutoring_registrations (tutoring_id, student_id, status)
-                VALUES (?, ?, 'ожидает')
-            ''', (tutoring_id, student_id))
-            
-            conn.commit()
-            return True, "Вы успешно записались на репетиторство!"
-            
+                return False, 'own'
+            return False, 'full'
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            return False, 'duplicate'
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+
+    def register_student_for_tutoring(self, tutoring_id, student_id, student_name):
+        """Записать студента на репетиторство"""
+        messages = {
+            'ok': "Вы успешно записались на репетиторство!",
+            'not_found': "Репетиторство не найдено",
+            'duplicate': "Вы уже записаны на это репетиторство",
+            'full': "Нет свободных мест",
+            'own': "Вы не можете записаться на своё же репетиторство"
+        }
+        try:
+            success, code = self.reserve_seat(tutoring_id, student_id)
+            return success, messages[code]
         except Exception as e:
             print(f"❌ Ошибка записи на репетиторство: {e}")
             return False, f"Ошибка: {str(e)}"
-        finally:
-            if conn:
-                conn.close()
     
     def add_tutoring(self, subject, tutor_name, tutor_id, tutor_type, 
                     days, time, room, price, description='', max_students=10):
@@ -156,52 +271,23 @@ class TutoringModule:
             conn.commit()
             return True, "Репетиторство успешно добавлено"
         except Exception as e:
+            conn.rollback()
             return False, f"Ошибка: {str(e)}"
-        finally:
-            conn.close()
     
     def register_student(self, tutoring_id, student_id):
         """Записать студента на репетиторство"""
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
-        
+        messages = {
+            'ok': "Вы успешно записались на репетиторство",
+            'not_found': "Репетиторство не найдено",
+            'duplicate': "Вы уже записаны на это репетиторство",
+            'full': "На это репетиторство нет свободных мест",
+            'own': "Вы не можете записаться на своё же репетиторство"
+        }
         try:
-            # Проверяем, не записан ли уже
-            cursor.execute('''
-            SELECT id FROM tutoring_registrations 
-            WHERE tutoring_id = ? AND student_id = ?
-            ''', (tutoring_id, student_id))
-            
-            if cursor.fetchone():
-                return False, "Вы уже записаны на это репетиторство"
-            
-            # Проверяем количество мест
-            cursor.execute('''
-            SELECT COUNT(id) as count FROM tutoring_registrations 
-            WHERE tutoring_id = ? AND status != 'отменено'
-            ''', (tutoring_id,))
-            
-            registered_count = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT max_students FROM tutoring WHERE id = ?', (tutoring_id,))
-            max_students = cursor.fetchone()[0]
-            
-            if registered_count >= max_students:
-                return False, "На это репетиторство нет свободных мест"
-            
-            # Записываем студента
-            cursor.execute('''
-            INSERT INTO tutoring_registrations (tutoring_id, student_id, status)
-            VALUES (?, ?, 'ожидает')
-            ''', (tutoring_id, student_id))
-            
-            conn.commit()
-            return True, "Вы успешно записались на репетиторство"
-            
+            success, code = self.reserve_seat(tutoring_id, student_id)
+            return success, messages[code]
         except Exception as e:
             return False, f"Ошибка: {str(e)}"
-        finally:
-            conn.close()
     
     def get_my_tutoring(self, tutor_id):
         """Получить репетиторства, созданные мной"""
@@ -209,22 +295,45 @@ class TutoringModule:
         cursor = conn.cursor()
         
         cursor.execute('''
-        SELECT t.*, 
-               COUNT(tr.id) as registered_count
-        FROM tutoring t
-        LEFT JOIN tutoring_registrations tr ON t.id = tr.tutoring_id
-        WHERE t.tutor_id = ?
-        GROUP BY t.id
-        ORDER BY t.created_at DESC
+        SELECT * FROM tutoring
+        WHERE tutor_id = ?
+        ORDER BY created_at DESC
         ''', (tutor_id,))
         
         result = []
         for row in cursor.fetchall():
             result.append(dict(row))
         
-        conn.close()
         return result
     
+    def check_registration_counts(self, fix=False):
+        """Сверить счетчики registered_count/pending_count с реальными записями.
+
+        Возвращает список расхождений; при fix=True счетчики пересчитываются.
+        """
+        conn = self.get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+        SELECT t.id, t.registered_count, t.pending_count,
+               COALESCE(SUM(tr.status != 'отменено'), 0) as actual_registered,
+               COALESCE(SUM(tr.status = 'ожидает'), 0) as actual_pending
+        FROM tutoring t
+        LEFT JOIN tutoring_registrations tr ON t.id = tr.tutoring_id
+        GROUP BY t.id
+        HAVING t.registered_count != actual_registered OR t.pending_count != actual_pending
+        ''')
+        drift = [dict(row) for row in cursor.fetchall()]
+
+        if fix and drift:
+            cursor.executemany('''
+            UPDATE tutoring SET registered_count = ?, pending_count = ? WHERE id = ?
+            ''', [(d['actual_registered'], d['actual_pending'], d['id']) for d in drift])
+            conn.commit()
+            print(f"⚠️  Исправлены счетчики записей для {len(drift)} репетиторств")
+
+        return drift
+
     def delete_tutoring(self, tutoring_id, tutor_id):
         """Удалить репетиторство (только создатель)"""
         conn = self.get_db_connection()
@@ -246,78 +355,10 @@ class TutoringModule:
             conn.commit()
             return True, "Репетиторство успешно удалено"
         except Exception as e:
+            conn.rollback()
             return False, f"Ошибка: {str(e)}"
-        finally:
-            conn.close()
 
 # Простые заглушки для других модулей (для обратной совместимости)
-class StarostaModule:
-    def get_students_data(self, *args): 
-        return [
-            {'name': 'Иванов И.И.', 'group': 'ПИ-21', 'attendance': '95%', 'grades': '4.5'},
-            {'name': 'Петров П.П.', 'group': 'ПИ-21', 'attendance': '88%', 'grades': '4.2'},
-            {'name': 'Сидорова А.С.', 'group': 'ПИ-21', 'attendance': '92%', 'grades': '4.7'}
-        ]
-    
-    def get_reports_data(self): 
-        return [
-            {'title': 'Отчет за сентябрь', 'date': '2024-09-30', 'status': 'Сдан'},
-            {'title': 'Отчет за октябрь', 'date': '2024-10-31', 'status': 'В работе'}
-        ]
-    
-    def get_info_for_headman(self): 
-        return {
-            'group': 'ПИ-21',
-            'total_students': 25,
-            'excellent': 8,
-            'good': 12,
-            'satisfactory': 5
-        }
-    
-    def get_messages(self): 
-        return [
-            {'from': 'Деканат', 'message': 'Собрание старост 15.11 в 14:00', 'date': '2024-11-10'},
-            {'from': 'Преподаватель', 'message': 'Принести отчеты до пятницы', 'date': '2024-11-08'}
-        ]
-
-class ScheduleModule:
-    def get_schedule(self, course): 
-        return {
-            'Понедельник': ['Математика 9:00-10:30', 'Программирование 11:00-12:30'],
-            'Вторник': ['Физика 9:00-10:30', 'Базы данных 11:00-12:30'],
-            'Среда': ['Английский 9:00-10:30', 'Web-разработка 11:00-12:30'],
-            'Четверг': ['Математика 9:00-10:30', 'Алгоритмы 11:00-12:30'],
-            'Пятница': ['Физкультура 9:00-10:30', 'Проектирование 11:00-12:30']
-        }
-    
-    def get_course_days(self, course):
-        return ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница']
-    
-    def get_exams_schedule(self, course):
-        return [
-            {'subject': 'Математика', 'date': '2024-12-20', 'time': '9:00', 'room': '301'},
-            {'subject': 'Программирование', 'date': '2024-12-22', 'time': '9:00', 'room': '305'}
-        ]
-
-class TeachersModule:
-    def get_all_teachers(self):
-        return [
-            {'name': 'Иванов И.И.', 'department': 'Программная инженерия', 'subjects': ['Математика', 'Алгоритмы']},
-            {'name': 'Петрова М.С.', 'department': 'Информационные системы', 'subjects': ['Базы данных', 'Web-разработка']},
-            {'name': 'Сидоров А.В.', 'department': 'Программная инженерия', 'subjects': ['Программирование', 'ООП']}
-        ]
-    
-    def get_departments(self):
-        return ['Программная инженерия', 'Информационные системы', 'Компьютерные науки']
-
-class EventsModule:
-    def get_events(self):
-        return [
-            {'title': 'День открытых дверей', 'date': '2024-11-15', 'location': 'Актовый зал'},
-            {'title': 'Научная конференция', 'date': '2024-11-20', 'location': 'Конференц-зал'},
-            {'title': 'Спортивные соревнования', 'date': '2024-11-25', 'location': 'Спортзал'}
-        ]
-
 class PracticeModule:
     def get_practice_data(self):
         return {
@@ -331,45 +372,91 @@ class PracticeModule:
             ]
         }
 
-# Инициализация модулей
-starosta_module = StarostaModule()
-schedule_module = ScheduleModule()
-teachers_module = TeachersModule()
-events_module = EventsModule()
-practice_module = PracticeModule()
-tutoring_module = TutoringModule()
+# Модули создаются при первом обращении
+messages_module = LazyModule(lambda: MessagesModule(connection_factory=get_db_connection))
+starosta_module = LazyModule(lambda: StarostaModule(messages=messages_module))
+schedule_module = LazyModule(lambda: ScheduleModule(connection_factory=get_db_connection))
+teachers_module = LazyModule(TeachersModule)
+events_module = LazyModule(lambda: EventsModule(connection_factory=get_db_connection))
+practice_module = LazyModule(PracticeModule)
+tutoring_module = LazyModule(TutoringModule)
+
+
+class DataVersions:
+    """Версии данных модулей (для ETag/Last-Modified и кэширования).
 
-print("✅ Все модули инициализированы")
+    Версии хранятся в памяти процесса. Для данных в БД, которые могут
+    изменить другие процессы, регистрируется источник версии (register),
+    и она берется из него.
+    """
+
+    def __init__(self):
+        self._versions = {}
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, source):
+        """Брать версию данных name из source() -> (версия, время изменения)"""
+        self._sources[name] = source
+
+    def get(self, name):
+        """Вернуть (версия, время последнего изменения) данных модуля"""
+        source = self._sources.get(name)
+        if source is not None:
+            return source()
+        with self._lock:
+            return self._versions.setdefault(name, (1, time.time()))
+
+    def bump(self, name):
+        """Отметить, что данные модуля изменились"""
+        with self._lock:
+            version, _ = self._versions.get(name, (0, 0))
+            self._versions[name] = (version + 1, time.time())
+
+
+data_versions = DataVersions()
+# Мероприятия и расписание лежат в БД; версию ведут триггеры, модули сверяют ее периодически
+data_versions.register('events', lambda: events_module.get_version())
+data_versions.register('schedule', lambda: schedule_module.get_version())
+# Преподаватели хранятся в памяти процесса: версия - ревизия модуля,
+# ее увеличивают add_teacher и remove_teacher
+data_versions.register('teachers', lambda: teachers_module.get_version())
+
+
+def bump_data_version(name):
+    """Новая версия данных модуля: сбрасывает связанные страницы в кэше"""
+    data_versions.bump(name)
+    page_cache.invalidate(name)
 
 # ==================== БАЗА ДАННЫХ ====================
 
+USERS_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    password TEXT NOT NULL,
+    full_name TEXT NOT NULL,
+    user_type TEXT NOT NULL CHECK(user_type IN ('student', 'teacher', 'starosta', 'admin')),
+    email TEXT,
+    phone TEXT,
+    group_name TEXT,
+    course INTEGER,
+    department TEXT,
+    position TEXT,
+    created_by TEXT DEFAULT 'system',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+'''
+
 def init_db():
-    """Создание базы данных и таблиц"""
+    """Создание недостающих таблиц и миграция схемы (данные не удаляются)"""
     print("🔄 Инициализация базы данных...")
     conn = None
     try:
         conn = sqlite3.connect('university.db')
         cursor = conn.cursor()
 
-        cursor.execute('DROP TABLE IF EXISTS users')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            full_name TEXT NOT NULL,
-            user_type TEXT NOT NULL CHECK(user_type IN ('student', 'teacher', 'starosta', 'admin')),
-            email TEXT,
-            phone TEXT,
-            group_name TEXT,
-            course INTEGER,
-            department TEXT,
-            position TEXT,
-            created_by TEXT DEFAULT 'system',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
+        cursor.execute(USERS_TABLE_SQL)
 
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS tutoring (
@@ -402,15 +489,22 @@ def init_db():
         )
         ''')
 
+        fix_users_columns(conn)
+        conn.commit()
+        run_migrations(conn)
+
+        # Администратор создается после миграций: в базе vxod.py таблица
+        # users приводится к текущей схеме миграцией 6
         cursor.execute("SELECT COUNT(*) FROM users WHERE user_type = 'admin'")
         if cursor.fetchone()[0] == 0:
             cursor.execute('''
             INSERT INTO users (username, password, full_name, user_type, email, created_by)
             VALUES (?, ?, ?, ?, ?, ?)
-            ''', ('admin', 'admin123', 'Администратор системы', 'admin', 'admin@university.ru', 'system'))
+            ''', ('admin', hash_password('admin123'), 'Администратор системы', 'admin', 'admin@university.ru', 'system'))
+            conn.commit()
             print("✅ Создан администратор: admin / admin123")
 
-        conn.commit()
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
         print("✅ База данных успешно инициализирована")
 
     except Exception as e:
@@ -420,109 +514,585 @@ def init_db():
         if conn:
             conn.close()
 
+def fix_users_columns(conn):
+    """Добавить недостающие столбцы в таблицу users без ее пересоздания"""
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(users)')}
+    missing = [col for col in ('id', 'username', 'full_name', 'user_type') if col not in columns]
+    if missing:
+        raise RuntimeError(f"Таблица users несовместима, отсутствуют столбцы: {missing}")
+    if 'password' not in columns:
+        print("⚠️  Отсутствует столбец password, добавляю...")
+        conn.execute("ALTER TABLE users ADD COLUMN password TEXT NOT NULL DEFAULT ''")
+    if 'created_by' not in columns:
+        conn.execute("ALTER TABLE users ADD COLUMN created_by TEXT DEFAULT 'system'")
+
+def migrate_vxod_users(conn):
+    """Привести таблицу users из старого vxod.py к текущей схеме.
+
+    В базах vxod.py хэш пароля лежит в столбце password_hash TEXT NOT NULL:
+    приложение его не читает, а вставка новых пользователей падает.
+    Хэши переносятся в password (если он еще пуст), таблица пересоздается
+    без password_hash; лишние столбцы (например, unread_count), индексы
+    и триггеры таблицы сохраняются.
+    """
+    old_columns = {row[1]: row for row in conn.execute('PRAGMA table_info(users)')}
+    if 'password_hash' not in old_columns:
+        return
+    print("🔄 Перенос паролей из password_hash (схема vxod.py)...")
+    dependents = [row[0] for row in conn.execute('''
+    SELECT sql FROM sqlite_master
+    WHERE tbl_name = 'users' AND type IN ('index', 'trigger') AND sql IS NOT NULL
+    ''')]
+
+    conn.execute(USERS_TABLE_SQL.replace('IF NOT EXISTS users', 'users_new'))
+    new_columns = {row[1] for row in conn.execute('PRAGMA table_info(users_new)')}
+    for name, (_, _, col_type, not_null, default, _) in old_columns.items():
+        if name not in new_columns and name != 'password_hash':
+            conn.execute(f"ALTER TABLE users_new ADD COLUMN {name} {col_type}"
+                         f"{' NOT NULL' if not_null else ''}"
+                         f"{f' DEFAULT {default}' if default is not None else ''}")
+            new_columns.add(name)
+
+    copied = [name for name in old_columns if name in new_columns and name != 'password']
+    password = ("COALESCE(NULLIF(password, ''), password_hash)" if 'password' in old_columns
+                else 'password_hash')
+    conn.execute(f'''
+    INSERT INTO users_new ({', '.join(copied)}, password)
+    SELECT {', '.join(copied)}, {password} FROM users
+    ''')
+    # Триггеры других таблиц ссылаются на users - при переименовании
+    # их проверку отключаем (так делает и документация SQLite)
+    conn.execute('PRAGMA legacy_alter_table = ON')
+    try:
+        conn.execute('DROP TABLE users')
+        conn.execute('ALTER TABLE users_new RENAME TO users')
+    finally:
+        conn.execute('PRAGMA legacy_alter_table = OFF')
+    for sql in dependents:
+        conn.execute(sql)
+
 def check_and_fix_db():
-    """Проверка и исправление базы данных"""
-    db_exists = os.path.exists('university.db')
-    print(f"📁 Файл БД существует: {db_exists}")
-    
-    if not db_exists:
+    """Проверка базы данных при запуске.
+
+    Если PRAGMA user_version совпадает с текущей версией схемы, никаких
+    проверок не выполняется; иначе недостающие таблицы и индексы
+    создаются через init_db().
+    """
+    if os.path.exists('university.db'):
+        conn = None
+        try:
+            conn = sqlite3.connect('university.db')
+            if conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION:
+                print("✅ Схема базы данных актуальна")
+                return True
+        except sqlite3.DatabaseError as e:
+            print(f"❌ Ошибка при проверке БД: {e}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+    else:
         print("📝 Создаю новую базу данных...")
-        init_db()
-        return True
-    
-    conn = None
+
     try:
-        conn = sqlite3.connect('university.db')
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='users'")
-        if not cursor.fetchone():
-            print("⚠️  Таблица users не найдена, создаю заново...")
-            conn.close()
-            init_db()
-            return True
-        
-        cursor.execute("SELECT * FROM users LIMIT 1")
-        columns = [description[0] for description in cursor.description]
-        
-        required_columns = ['id', 'username', 'password', 'full_name', 'user_type']
-        missing_columns = [col for col in required_columns if col not in columns]
-        
-        if missing_columns:
-            print(f"⚠️  Отсутствуют столбцы: {missing_columns}. Пересоздаю таблицу...")
-            conn.close()
-            init_db()
-            return True
-        
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='tutoring'")
-        if not cursor.fetchone():
-            print("⚠️  Таблица tutoring не найдена, создаю...")
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tutoring (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                subject TEXT NOT NULL,
-                tutor_name TEXT NOT NULL,
-                tutor_id INTEGER NOT NULL,
-                tutor_type TEXT NOT NULL CHECK(tutor_type IN ('teacher', 'student')),
-                description TEXT,
-                days TEXT NOT NULL,
-                time TEXT NOT NULL,
-                room TEXT NOT NULL,
-                price TEXT NOT NULL,
-                max_students INTEGER DEFAULT 10,
-                status TEXT DEFAULT 'Идет набор',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (tutor_id) REFERENCES users(id)
-            )
-            ''')
-        
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='tutoring_registrations'")
-        if not cursor.fetchone():
-            print("⚠️  Таблица tutoring_registrations не найдена, создаю...")
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tutoring_registrations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tutoring_id INTEGER NOT NULL,
-                student_id INTEGER NOT NULL,
-                status TEXT DEFAULT 'ожидает',
-                registered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (tutoring_id) REFERENCES tutoring(id),
-                FOREIGN KEY (student_id) REFERENCES users(id)
-            )
-            ''')
-        
-        conn.commit()
-        print("✅ Структура базы данных в порядке")
+        init_db()
         return True
     except Exception as e:
-        print(f"❌ Ошибка при проверке БД: {e}")
-        print("🔄 Пытаюсь восстановить базу данных...")
+        print(f"❌ Не удалось подготовить БД: {e}")
+        return False
+
+# ==================== МИГРАЦИИ СХЕМЫ ====================
+
+# Упорядоченный список миграций: (версия, описание, шаги). Шаг - SQL-команда
+# или функция, принимающая соединение.
+# Примененные версии записываются в таблицу schema_version.
+MIGRATIONS = [
+    (1, 'Индексы для репетиторства и списка пользователей', [
+        # Перед созданием уникального индекса убираем повторные записи
+        '''DELETE FROM tutoring_registrations
+           WHERE id NOT IN (SELECT MIN(id) FROM tutoring_registrations
+                            GROUP BY tutoring_id, student_id)''',
+        '''CREATE UNIQUE INDEX IF NOT EXISTS idx_registrations_tutoring_student
+           ON tutoring_registrations(tutoring_id, student_id)''',
+        '''CREATE INDEX IF NOT EXISTS idx_registrations_tutoring_status
+           ON tutoring_registrations(tutoring_id, status)''',
+        '''CREATE INDEX IF NOT EXISTS idx_registrations_student
+           ON tutoring_registrations(student_id)''',
+        '''CREATE INDEX IF NOT EXISTS idx_tutoring_tutor_created
+           ON tutoring(tutor_id, created_at)''',
+        '''CREATE INDEX IF NOT EXISTS idx_users_type_name
+           ON users(user_type, full_name)''',
+    ]),
+    (2, 'Счетчики записей в tutoring, поддерживаемые триггерами', [
+        'ALTER TABLE tutoring ADD COLUMN registered_count INTEGER NOT NULL DEFAULT 0',
+        'ALTER TABLE tutoring ADD COLUMN pending_count INTEGER NOT NULL DEFAULT 0',
+        '''UPDATE tutoring SET
+               registered_count = (SELECT COUNT(*) FROM tutoring_registrations tr
+                                   WHERE tr.tutoring_id = tutoring.id AND tr.status != 'отменено'),
+               pending_count = (SELECT COUNT(*) FROM tutoring_registrations tr
+                                WHERE tr.tutoring_id = tutoring.id AND tr.status = 'ожидает')''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_registrations_insert
+           AFTER INSERT ON tutoring_registrations
+           BEGIN
+               UPDATE tutoring SET
+                   registered_count = registered_count + (COALESCE(NEW.status, 'отменено') != 'отменено'),
+                   pending_count = pending_count + (NEW.status IS 'ожидает')
+               WHERE id = NEW.tutoring_id;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_registrations_delete
+           AFTER DELETE ON tutoring_registrations
+           BEGIN
+               UPDATE tutoring SET
+                   registered_count = registered_count - (COALESCE(OLD.status, 'отменено') != 'отменено'),
+                   pending_count = pending_count - (OLD.status IS 'ожидает')
+               WHERE id = OLD.tutoring_id;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_registrations_update
+           AFTER UPDATE OF status, tutoring_id ON tutoring_registrations
+           BEGIN
+               UPDATE tutoring SET
+                   registered_count = registered_count - (COALESCE(OLD.status, 'отменено') != 'отменено'),
+                   pending_count = pending_count - (OLD.status IS 'ожидает')
+               WHERE id = OLD.tutoring_id;
+               UPDATE tutoring SET
+                   registered_count = registered_count + (COALESCE(NEW.status, 'отменено') != 'отменено'),
+                   pending_count = pending_count + (NEW.status IS 'ожидает')
+               WHERE id = NEW.tutoring_id;
+           END''',
+    ]),
+    (3, 'Индекс для постраничного вывода репетиторств', [
+        '''CREATE INDEX IF NOT EXISTS idx_tutoring_created
+           ON tutoring(created_at)''',
+    ]),
+    (4, 'Таблицы расписания занятий и экзаменов, версия расписания', [
+        '''CREATE TABLE IF NOT EXISTS lessons (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course INTEGER NOT NULL,
+            group_name TEXT,
+            day TEXT NOT NULL,
+            day_order INTEGER NOT NULL,
+            time TEXT NOT NULL,
+            start_min INTEGER NOT NULL,
+            subject TEXT NOT NULL,
+            teacher TEXT NOT NULL,
+            room TEXT NOT NULL
+        )''',
+        '''CREATE INDEX IF NOT EXISTS idx_lessons_course_day
+           ON lessons(course, day_order, start_min)''',
+        '''CREATE TABLE IF NOT EXISTS exams (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            teacher TEXT NOT NULL,
+            room TEXT NOT NULL
+        )''',
+        '''CREATE INDEX IF NOT EXISTS idx_exams_course
+           ON exams(course)''',
+        # Заполняем расписанием по умолчанию, которое раньше было в коде
+        lambda conn: insert_lessons(conn, iter_default_lessons()),
+        lambda conn: insert_exams(conn, iter_default_exams()),
+        # Версии данных, общие для всех процессов: кэши в памяти
+        # сверяются с ними вместо перечитывания таблиц
+        '''CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            modified_at REAL NOT NULL
+        ) WITHOUT ROWID''',
+        '''INSERT OR IGNORE INTO data_versions (name, version, modified_at)
+           VALUES ('schedule', 1, (julianday('now') - 2440587.5) * 86400.0)''',
+        *[f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{action.lower()}
+           AFTER {action} ON {table}
+           BEGIN
+               UPDATE data_versions SET version = version + 1,
+                      modified_at = (julianday('now') - 2440587.5) * 86400.0
+               WHERE name = 'schedule';
+           END''' for table in ('lessons', 'exams') for action in ('INSERT', 'UPDATE', 'DELETE')],
+    ]),
+    (5, 'Готовые расписания групп', [
+        '''CREATE TABLE IF NOT EXISTS group_timetables (
+            course INTEGER NOT NULL,
+            group_name TEXT NOT NULL DEFAULT '',
+            payload TEXT NOT NULL,
+            built_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (course, group_name)
+        ) WITHOUT ROWID''',
+        materialize_timetables,
+    ]),
+    (6, 'Таблица users из vxod.py: пароли из password_hash', [
+        migrate_vxod_users,
+    ]),
+    (7, 'Таблица мероприятий и ее версия в data_versions', [
+        '''CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            date TEXT NOT NULL,
+            time TEXT NOT NULL DEFAULT '',
+            starts_at TEXT NOT NULL,
+            location TEXT NOT NULL DEFAULT '',
+            description TEXT NOT NULL DEFAULT '',
+            organizer TEXT NOT NULL DEFAULT '',
+            status TEXT NOT NULL DEFAULT '',
+            updated_at REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)
+        )''',
+        '''CREATE INDEX IF NOT EXISTS idx_events_starts
+           ON events(starts_at, id)''',
+        '''INSERT OR IGNORE INTO data_versions (name, version, modified_at)
+           VALUES ('events', 1, (julianday('now') - 2440587.5) * 86400.0)''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_events_version_insert
+           AFTER INSERT ON events
+           BEGIN
+               UPDATE data_versions SET version = version + 1,
+                      modified_at = (julianday('now') - 2440587.5) * 86400.0
+               WHERE name = 'events';
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_events_version_update
+           AFTER UPDATE ON events
+           BEGIN
+               UPDATE events SET updated_at = (julianday('now') - 2440587.5) * 86400.0
+               WHERE id = NEW.id;
+               UPDATE data_versions SET version = version + 1,
+                      modified_at = (julianday('now') - 2440587.5) * 86400.0
+               WHERE name = 'events';
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_events_version_delete
+           AFTER DELETE ON events
+           BEGIN
+               UPDATE data_versions SET version = version + 1,
+                      modified_at = (julianday('now') - 2440587.5) * 86400.0
+               WHERE name = 'events';
+           END''',
+        # Мероприятия, которые раньше были в коде
+        lambda conn: insert_events(conn, DEFAULT_EVENTS),
+    ]),
+    (8, 'Сообщения, входящие и счетчики непрочитанных', [
+        '''CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender_id INTEGER,
+            sender_name TEXT NOT NULL,
+            audience TEXT NOT NULL DEFAULT '',
+            subject TEXT NOT NULL DEFAULT '',
+            body TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            recipients INTEGER NOT NULL DEFAULT 0
+        )''',
+        '''CREATE INDEX IF NOT EXISTS idx_messages_sender
+           ON messages(sender_id, created_at)''',
+        # Входящие упорядочены по ключу (получатель, время, сообщение):
+        # страница входящих читается одним проходом по диапазону
+        '''CREATE TABLE IF NOT EXISTS inbox (
+            recipient_id INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            message_id INTEGER NOT NULL,
+            is_read INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (recipient_id, created_at DESC, message_id DESC)
+        ) WITHOUT ROWID''',
+        '''CREATE INDEX IF NOT EXISTS idx_inbox_message
+           ON inbox(message_id)''',
+        'ALTER TABLE users ADD COLUMN unread_count INTEGER NOT NULL DEFAULT 0',
+        '''CREATE TRIGGER IF NOT EXISTS trg_inbox_insert
+           AFTER INSERT ON inbox WHEN NEW.is_read = 0
+           BEGIN
+               UPDATE users SET unread_count = unread_count + 1 WHERE id = NEW.recipient_id;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_inbox_delete
+           AFTER DELETE ON inbox WHEN OLD.is_read = 0
+           BEGIN
+               UPDATE users SET unread_count = unread_count - 1 WHERE id = OLD.recipient_id;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_inbox_update
+           AFTER UPDATE OF is_read ON inbox WHEN OLD.is_read != NEW.is_read
+           BEGIN
+               UPDATE users SET unread_count = unread_count + (NEW.is_read = 0) - (OLD.is_read = 0)
+               WHERE id = NEW.recipient_id;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_users_delete_inbox
+           AFTER DELETE ON users
+           BEGIN
+               DELETE FROM inbox WHERE recipient_id = OLD.id;
+           END''',
+        # Сообщения, которые раньше были заглушкой в star.py
+        insert_default_messages,
+    ]),
+]
+
+def run_migrations(conn):
+    """Применить недостающие миграции схемы, вернуть текущую версию"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    current = conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        print(f"🔄 Миграция {version}: {description}")
         try:
-            if conn:
-                conn.close()
-            init_db()
-            return True
-        except Exception as e2:
-            print(f"❌ Не удалось восстановить БД: {e2}")
-            return False
-    finally:
-        if conn:
-            conn.close()
+            conn.execute('BEGIN')
+            for step in statements:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                         (version, description))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        current = version
 
-# ==================== ФУНКЦИИ ДЛЯ РАБОТЫ С БД ====================
+    return current
 
-def get_db_connection():
-    """Получить соединение с базой данных"""
+# Версия схемы хранится в PRAGMA user_version и позволяет пропускать
+# проверку структуры БД при запуске
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# ==================== ПОСТРАНИЧНЫЙ ВЫВОД ====================
+
+PAGE_SIZE_DEFAULT = 50
+PAGE_SIZE_MAX = 200
+
+def encode_cursor(values):
+    """Закодировать ключ последней строки страницы в курсор для ?after="""
+    raw = json.dumps(values, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, size):
+    """Раскодировать курсор; None, если он пуст или поврежден"""
+    if not cursor:
+        return None
     try:
-        conn = sqlite3.connect('university.db', timeout=10.0)
-        conn.row_factory = sqlite3.Row
-        conn.execute('PRAGMA journal_mode=WAL')
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw.decode('utf-8'))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+def get_page_args():
+    """Параметры ?after= и ?limit= текущего запроса"""
+    after = request.args.get('after')
+    limit = request.args.get('limit', default=PAGE_SIZE_DEFAULT, type=int)
+    return after, max(1, min(limit, PAGE_SIZE_MAX))
+
+# ==================== ФУНКЦИИ ДЛЯ РАБОТЫ С БД ====================
+
+class ConnectionPool:
+    """Пул соединений SQLite с повторным использованием"""
+
+    PRAGMAS = (
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA cache_size=-8000',      # ~8 МБ страничного кэша
+        'PRAGMA mmap_size=67108864',    # 64 МБ
+    )
+
+    def __init__(self, db_name, max_idle=8):
+        self.db_name = db_name
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._inherited = []  # соединения родительского процесса (см. reset_after_fork)
+        self.stats = {'opened': 0, 'reused': 0, 'closed': 0}
+
+    def _connect(self):
+        """Открыть новое соединение и один раз применить PRAGMA"""
+        while True:
+            try:
+                conn = sqlite3.connect(self.db_name, timeout=10.0, check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+                for pragma in self.PRAGMAS:
+                    conn.execute(pragma)
+                return conn
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                time.sleep(0.1)
+
+    def acquire(self):
+        """Взять соединение из пула (или открыть новое)"""
+        with self._lock:
+            if self._idle:
+                self.stats['reused'] += 1
+                return self._idle.pop()
+            self.stats['opened'] += 1
+        return self._connect()
+
+    def release(self, conn):
+        """Вернуть соединение в пул"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+            self.stats['closed'] += 1
+        conn.close()
+
+    def thread_connection(self):
+        """Соединение текущего потока (вне контекста приложения)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self.acquire()
+        else:
+            self.mark_reused()
         return conn
-    except sqlite3.OperationalError as e:
-        if "locked" in str(e):
-            time.sleep(0.1)
-            return get_db_connection()
-        raise
+
+    def close_all(self):
+        """Закрыть свободные соединения и соединение текущего потока.
+
+        Вызывается в главном процессе перед fork воркеров (см. wsgi.py),
+        чтобы воркерам не достались открытые соединения.
+        """
+        conn = getattr(self._local, 'conn', None)
+        self._local = threading.local()
+        with self._lock:
+            connections, self._idle = self._idle, []
+            if conn is not None:
+                connections.append(conn)
+            self.stats['closed'] += len(connections)
+        for conn in connections:
+            conn.close()
+
+    def reset_after_fork(self):
+        """Забыть соединения, унаследованные от родительского процесса.
+
+        Соединение SQLite нельзя ни использовать, ни закрывать в процессе,
+        полученном через fork, а освобождение объекта соединения его
+        закрывает. Поэтому свободные соединения и соединение потока,
+        выполнившего fork, переносятся в список _inherited, который
+        никогда не очищается. Главный процесс gunicorn закрывает свои
+        соединения до fork (close_all), так что обычно список пуст.
+        """
+        conn = getattr(self._local, 'conn', None)
+        self._inherited.extend(self._idle)
+        if conn is not None:
+            self._inherited.append(conn)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def mark_reused(self):
+        """Учесть повторное использование уже выданного соединения"""
+        with self._lock:
+            self.stats['reused'] += 1
+
+    def get_stats(self):
+        """Счетчики открытий и повторных использований"""
+        with self._lock:
+            return dict(self.stats, idle=len(self._idle))
+
+
+db_pool = ConnectionPool('university.db')
+
+
+def get_db_connection():
+    """Получить соединение с базой данных.
+
+    Внутри запроса соединение привязывается к flask.g и возвращается
+    в пул по окончании контекста приложения; вне запроса используется
+    соединение текущего потока. Закрывать его вызывающему не нужно.
+    """
+    if not has_app_context():
+        return db_pool.thread_connection()
+    if 'db' not in g:
+        g.db = db_pool.acquire()
+    else:
+        db_pool.mark_reused()
+    return g.db
+
+
+def release_db_connection(exception=None):
+    """Вернуть соединение запроса в пул (teardown_appcontext)"""
+    conn = g.pop('db', None)
+    if conn is not None:
+        db_pool.release(conn)
+
+
+class UserCache:
+    """LRU-кэш записей пользователей с коротким временем жизни"""
+
+    def __init__(self, max_size=1024, ttl=30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.stats = {'hits': 0, 'misses': 0, 'memo_hits': 0, 'invalidations': 0}
+
+    def get(self, user_id):
+        """Вернуть (запись или None, поколение кэша)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is not None:
+                expires_at, user = entry
+                if expires_at > now:
+                    self._data.move_to_end(user_id)
+                    self.stats['hits'] += 1
+                    return user, self._generation
+                del self._data[user_id]
+            self.stats['misses'] += 1
+            return None, self._generation
+
+    def put(self, user_id, user, generation):
+        """Сохранить запись, если с момента промаха не было инвалидаций"""
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._data[user_id] = (time.monotonic() + self.ttl, user)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def mark_memo_hit(self):
+        """Учесть попадание в кэш текущего запроса"""
+        with self._lock:
+            self.stats['memo_hits'] += 1
+
+    def invalidate(self, user_id):
+        """Удалить запись пользователя из кэша"""
+        with self._lock:
+            self._data.pop(user_id, None)
+            self._generation += 1
+            self.stats['invalidations'] += 1
+
+    def get_stats(self):
+        """Счетчики попаданий и промахов"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return dict(self.stats,
+                        size=len(self._data),
+                        hit_ratio=round(self.stats['hits'] / lookups, 3) if lookups else 0.0)
+
+
+user_cache = UserCache()
+
+
+def invalidate_user(user_id):
+    """Сбросить кэш пользователя (общий и в рамках текущего запроса)"""
+    user_cache.invalidate(user_id)
+    if has_app_context():
+        g.get('user_memo', {}).pop(user_id, None)
+
+def invalidate_user_sessions(user_id):
+    """Завершить все сессии пользователя (после смены роли или удаления)"""
+    session_backend.delete_user(user_id)
+    if has_request_context() and session.get('user_id') == user_id:
+        session.clear()
+
+def refresh_user_sessions(user_id, changes):
+    """Обновить снимок пользователя (username, name) в его сессиях"""
+    session_backend.update_user(user_id, changes)
+    if has_request_context() and session.get('user_id') == user_id:
+        session.update(changes)
 
 def update_user_data(user_id, **kwargs):
     """Обновить данные пользователя в БД"""
@@ -531,9 +1101,11 @@ def update_user_data(user_id, **kwargs):
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute('SELECT id FROM users WHERE id = ?', (user_id,))
-        if not cursor.fetchone():
+        cursor.execute('SELECT user_type FROM users WHERE id = ?', (user_id,))
+        row = cursor.fetchone()
+        if not row:
             return False, "Пользователь не найден"
+        old_role = row[0]
         
         if 'username' in kwargs:
             cursor.execute('SELECT id FROM users WHERE username = ? AND id != ?', 
@@ -559,8 +1131,10 @@ def update_user_data(user_id, **kwargs):
         
         for key, value in kwargs.items():
             if key in field_mapping and value is not None:
-                if key == 'password' and value == '':
-                    continue
+                if key == 'password':
+                    if value == '':
+                        continue
+                    value = hash_password(value)
                 update_fields.append(f"{field_mapping[key]} = ?")
                 update_values.append(value)
         
@@ -573,14 +1147,22 @@ def update_user_data(user_id, **kwargs):
         cursor.execute(sql, update_values)
         
         conn.commit()
+        invalidate_user(user_id)
+        if kwargs.get('user_type') not in (None, old_role):
+            # Роль в сессиях устарела - пользователь войдет заново
+            invalidate_user_sessions(user_id)
+        else:
+            changes = {key: kwargs[field] for field, key in (('username', 'username'), ('full_name', 'name'))
+                       if kwargs.get(field)}
+            if changes:
+                refresh_user_sessions(user_id, changes)
         return True, "Данные успешно обновлены"
         
     except Exception as e:
         print(f"❌ Ошибка обновления пользователя {user_id}: {e}")
-        return False, f"Ошибка: {str(e)}"
-    finally:
         if conn:
-            conn.close()
+            conn.rollback()
+        return False, f"Ошибка: {str(e)}"
 
 def register_user(username, password, full_name, user_type, created_by='system', **kwargs):
     """Регистрация нового пользователя"""
@@ -607,22 +1189,28 @@ def register_user(username, password, full_name, user_type, created_by='system',
         INSERT INTO users (username, password, full_name, user_type, created_by,
                           email, phone, group_name, course, department, position)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (username, password, full_name, user_type, created_by,
+        ''', (username, hash_password(password), full_name, user_type, created_by,
               email, phone, group, course, department, position))
 
         conn.commit()
+        invalidate_user(cursor.lastrowid)
         return True, "Пользователь успешно создан"
     except sqlite3.IntegrityError as e:
+        conn.rollback()
         return False, f"Ошибка базы данных: {str(e)}"
     except Exception as e:
         print(f"❌ Ошибка регистрации: {e}")
-        return False, f"Ошибка при регистрации: {str(e)}"
-    finally:
         if conn:
-            conn.close()
+            conn.rollback()
+        return False, f"Ошибка при регистрации: {str(e)}"
 
 def login_user(username, password):
-    """Вход пользователя"""
+    """Вход пользователя.
+
+    Пароль, сохраненный в старом формате (открытым текстом или с другими
+    параметрами хэширования), перехэшируется после успешного входа.
+    При перегрузке пула хэширования выбрасывает PasswordHashBusy.
+    """
     conn = None
     try:
         conn = get_db_connection()
@@ -631,20 +1219,41 @@ def login_user(username, password):
         cursor.execute('''
         SELECT id, username, password, full_name, user_type, email, phone, 
                group_name, course, department, position, created_by, created_at
-        FROM users WHERE username = ? AND password = ?
-        ''', (username, password))
+        FROM users WHERE username = ?
+        ''', (username,))
 
         user = cursor.fetchone()
-        return dict(user) if user else None
+        if not user:
+            return None
+        user = dict(user)
+        stored = user.pop('password')
+        ok, rehash = verify_password(stored, password)
+        if not ok:
+            return None
+        if rehash:
+            # Условие на старый хэш: параллельная смена пароля не затирается
+            cursor.execute('UPDATE users SET password = ? WHERE id = ? AND password = ?',
+                           (hash_password(password), user['id'], stored))
+            conn.commit()
+        return user
+    except PasswordHashBusy:
+        raise
     except Exception as e:
         print(f"❌ Ошибка входа: {e}")
         return None
-    finally:
-        if conn:
-            conn.close()
 
 def get_user_by_id(user_id):
-    """Получить пользователя по ID"""
+    """Получить пользователя по ID (с кэшированием)"""
+    memo = g.setdefault('user_memo', {}) if has_app_context() else {}
+    if user_id in memo:
+        user_cache.mark_memo_hit()
+        return memo[user_id]
+
+    user, generation = user_cache.get(user_id)
+    if user is not None:
+        memo[user_id] = dict(user)
+        return memo[user_id]
+
     conn = None
     try:
         conn = get_db_connection()
@@ -657,13 +1266,15 @@ def get_user_by_id(user_id):
         ''', (user_id,))
 
         user = cursor.fetchone()
-        return dict(user) if user else None
+        if not user:
+            return None
+        user = dict(user)
+        user_cache.put(user_id, user, generation)
+        memo[user_id] = dict(user)
+        return memo[user_id]
     except Exception as e:
         print(f"❌ Ошибка получения пользователя: {e}")
         return None
-    finally:
-        if conn:
-            conn.close()
 
 def get_all_users():
     """Получить всех пользователей"""
@@ -678,9 +1289,31 @@ def get_all_users():
     except Exception as e:
         print(f"❌ Ошибка получения списка пользователей: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
+
+def get_users_page(after=None, limit=PAGE_SIZE_DEFAULT):
+    """Получить страницу пользователей (курсор по user_type, full_name, id)"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        key = decode_cursor(after, 3)
+        cursor.execute(f'''
+        SELECT * FROM users
+        {'WHERE (user_type, full_name, id) > (?, ?, ?)' if key else ''}
+        ORDER BY user_type, full_name, id
+        LIMIT ?
+        ''', (*(key or ()), limit + 1))
+        users = [dict(row) for row in cursor.fetchall()]
+
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            last = users[-1]
+            next_cursor = encode_cursor([last['user_type'], last['full_name'], last['id']])
+        return users, next_cursor
+    except Exception as e:
+        print(f"❌ Ошибка получения списка пользователей: {e}")
+        return [], None
 
 def delete_user(user_id):
     """Удалить пользователя"""
@@ -691,13 +1324,271 @@ def delete_user(user_id):
 
         cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
         conn.commit()
+        invalidate_user(user_id)
+        invalidate_user_sessions(user_id)
         return cursor.rowcount > 0
     except Exception as e:
         print(f"❌ Ошибка удаления пользователя: {e}")
-        return False
-    finally:
         if conn:
-            conn.close()
+            conn.rollback()
+        return False
+
+# ==================== МАССОВЫЙ ИМПОРТ И ЭКСПОРТ ПОЛЬЗОВАТЕЛЕЙ ====================
+
+USER_TYPES = ('student', 'teacher', 'starosta', 'admin')
+IMPORT_BATCH_SIZE = 500
+IMPORT_MAX_ERRORS = 100  # сколько ошибок по строкам сохранять в отчете
+
+# Столбцы файла выгрузки (пароль не выгружается)
+EXPORT_COLUMNS = ('id', 'username', 'full_name', 'user_type', 'email', 'phone',
+                  'group', 'course', 'department', 'position', 'created_by', 'created_at')
+
+def iter_user_records(stream, fmt):
+    """Читать записи пользователей из текстового потока по одной.
+
+    fmt - 'csv' (с заголовком) или 'jsonl' (объект JSON на строку).
+    Выдает (номер строки, запись или None, ошибка или None).
+    """
+    if fmt == 'csv':
+        for line_number, row in enumerate(csv.DictReader(stream), start=2):
+            yield line_number, {key: value for key, value in row.items() if key}, None
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"некорректный JSON ({e})"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "ожидается объект JSON"
+            continue
+        yield line_number, record, None
+
+def prepare_user_row(record, created_by):
+    """Проверить запись и подготовить строку для INSERT.
+
+    Возвращает (строка, None) или (None, текст ошибки).
+    """
+    values = {key: str(value).strip() if value is not None else ''
+              for key, value in record.items()}
+    username = values.get('username', '')
+    password = values.get('password', '')
+    full_name = values.get('full_name', '')
+    user_type = values.get('user_type', '')
+    if not all([username, password, full_name, user_type]):
+        return None, "не заполнены username, password, full_name или user_type"
+    if user_type not in USER_TYPES:
+        return None, f"неизвестный тип пользователя {user_type!r}"
+    if len(password) < 6:
+        return None, "пароль должен быть не менее 6 символов"
+    course = values.get('course') or None
+    if course is not None:
+        if not course.isdigit() or not (1 <= int(course) <= 6):
+            return None, f"некорректный курс {course!r}"
+        course = int(course)
+    return (username, password, full_name, user_type, values.get('created_by') or created_by,
+            values.get('email') or None, values.get('phone') or None,
+            values.get('group') or values.get('group_name') or None, course,
+            values.get('department') or None, values.get('position') or None), None
+
+def insert_users_batch(conn, rows):
+    """Вставить пачку пользователей одной транзакцией.
+
+    Если пачка не прошла целиком (например, логин успели занять
+    параллельно), строки вставляются по одной. Возвращает список
+    (номер строки, ошибка) для невставленных строк.
+    """
+    sql = '''
+    INSERT INTO users (username, password, full_name, user_type, created_by,
+                       email, phone, group_name, course, department, position)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.executemany(sql, [row for _, row in rows])
+        conn.commit()
+        return []
+    except sqlite3.IntegrityError:
+        conn.rollback()
+
+    errors = []
+    for line_number, row in rows:
+        try:
+            conn.execute(sql, row)
+            conn.commit()
+        except sqlite3.IntegrityError as e:
+            conn.rollback()
+            errors.append((line_number, f"ошибка базы данных: {e}"))
+    return errors
+
+def bulk_import_users(stream, fmt, created_by='system', batch_size=IMPORT_BATCH_SIZE):
+    """Массовый импорт пользователей из CSV или JSONL.
+
+    Файл читается потоково, строки проверяются и вставляются пачками
+    по batch_size в отдельных транзакциях; ошибочные строки пропускаются.
+    Повторы логинов проверяются по множеству логинов, загруженному
+    один раз. Возвращает словарь с ключами created, failed и errors
+    (первые IMPORT_MAX_ERRORS пар (номер строки, ошибка)).
+    """
+    report = {'created': 0, 'failed': 0, 'errors': []}
+
+    def add_error(line_number, message):
+        report['failed'] += 1
+        if len(report['errors']) < IMPORT_MAX_ERRORS:
+            report['errors'].append((line_number, message))
+
+    conn = get_db_connection()
+    usernames = {row[0] for row in conn.execute('SELECT username FROM users')}
+    batch = []
+
+    def flush():
+        # Пароли пачки хэшируются параллельно в пуле хэширования; пачка
+        # очищается только после вставки, сама она всегда хранит пароли
+        hashes = hash_passwords([row[1] for _, row in batch])
+        hashed = [(line_number, row[:1] + (password_hash,) + row[2:])
+                  for (line_number, row), password_hash in zip(batch, hashes)]
+        errors = insert_users_batch(conn, hashed)
+        report['created'] += len(hashed) - len(errors)
+        for line_number, message in errors:
+            add_error(line_number, message)
+        batch.clear()
+
+    try:
+        for line_number, record, error in iter_user_records(stream, fmt):
+            if error is None:
+                row, error = prepare_user_row(record, created_by)
+            if error is None and row[0] in usernames:
+                error = f"логин {row[0]!r} уже существует"
+            if error is not None:
+                add_error(line_number, error)
+                continue
+            usernames.add(row[0])
+            batch.append((line_number, row))
+            if len(batch) >= batch_size:
+                flush()
+    except (csv.Error, UnicodeDecodeError) as e:
+        # Прочитанные до ошибки строки все равно загружаются
+        add_error(None, f"файл не прочитан до конца: {e}")
+    if batch:
+        flush()
+    return report
+
+def iter_users_export(fmt, batch_size=1000):
+    """Потоковая выгрузка пользователей в CSV или JSONL (порциями по id)"""
+    conn = get_db_connection()
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+
+    last_id = 0
+    while True:
+        rows = conn.execute('''
+        SELECT id, username, full_name, user_type, email, phone,
+               group_name, course, department, position, created_by, created_at
+        FROM users WHERE id > ? ORDER BY id LIMIT ?
+        ''', (last_id, batch_size)).fetchall()
+        if fmt == 'csv':
+            writer.writerows(tuple(row) for row in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        else:
+            yield ''.join(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + '\n'
+                          for row in rows)
+        if len(rows) < batch_size:
+            break
+        last_id = rows[-1][0]
+
+# ==================== КЭШ СТРАНИЦ ====================
+
+class PageCache:
+    """LRU-кэш готовых HTML-страниц с ограничением по объему памяти"""
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # ключ -> (html, размер в байтах)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key):
+        """Вернуть страницу из кэша или None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[0]
+
+    def put(self, key, html):
+        """Сохранить страницу, вытесняя самые старые при переполнении"""
+        size = len(html.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (html, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.stats['evictions'] += 1
+
+    def invalidate(self, data_name):
+        """Удалить все страницы, построенные по данным модуля"""
+        with self._lock:
+            for key in [k for k in self._data if k[1] == data_name]:
+                _, size = self._data.pop(key)
+                self._bytes -= size
+                self.stats['invalidations'] += 1
+
+    def get_stats(self):
+        """Доля попаданий и занятая память"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return dict(self.stats,
+                        entries=len(self._data),
+                        bytes=self._bytes,
+                        max_bytes=self.max_bytes,
+                        hit_ratio=round(self.stats['hits'] / lookups, 3) if lookups else 0.0)
+
+
+page_cache = PageCache()
+
+# Поля пользователя, которые выводит шапка страниц
+PAGE_USER_FIELDS = ('user_type', 'full_name')
+
+
+def render_cached_page(template, data_name, user, build_context, variant=None):
+    """Отрисовать страницу через кэш.
+
+    Ключ - (шаблон, модуль данных, версия данных, вариант страницы
+    (например, курс), роль и имя пользователя). Шаблон получает только
+    поля из PAGE_USER_FIELDS, поэтому одна запись кэша подходит всем
+    пользователям с той же ролью и именем. build_context вызывается
+    только при промахе.
+    """
+    # Flash-сообщения показываются один раз, такие страницы не кэшируем
+    if session.get('_flashes'):
+        return render_template(template, user=user, **build_context())
+
+    header_user = {field: user.get(field) for field in PAGE_USER_FIELDS}
+    version, _ = data_versions.get(data_name)
+    key = (template, data_name, version, variant,
+           tuple(header_user[field] for field in PAGE_USER_FIELDS))
+    html = page_cache.get(key)
+    if html is None:
+        html = render_template(template, user=header_user, **build_context())
+        page_cache.put(key, html)
+    return html
 
 # ==================== ДЕКОРАТОРЫ ДЛЯ ПРОВЕРКИ АВТОРИЗАЦИИ ====================
 
@@ -718,32 +1609,62 @@ def admin_required(f):
         if 'user_id' not in session:
             flash('Пожалуйста, войдите в систему', 'warning')
             return redirect(url_for('login'))
-        user_data = get_user_by_id(session['user_id'])
-        if not user_data or user_data['user_type'] != 'admin':
+        # Роль берется из снимка в сессии, без запроса к БД:
+        # при смене роли сессии пользователя удаляются
+        if session.get('user_type') != 'admin':
             flash('Доступ только для администратора', 'error')
             return redirect(url_for('home'))
         return f(*args, **kwargs)
     return decorated_function
 
+def role_required(*allowed_roles):
+    """Требует одну из ролей (по снимку пользователя в сессии)"""
+    from functools import wraps
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if 'user_id' not in session:
+                flash('Пожалуйста, войдите в систему', 'warning')
+                return redirect(url_for('login'))
+            if session.get('user_type') not in allowed_roles:
+                flash(f'Доступ только для: {", ".join(allowed_roles)}', 'error')
+                return redirect(url_for('home'))
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
 # ==================== МАРШРУТЫ ====================
 
-@app.route('/')
+@route('/')
 def home():
     if 'user_id' in session:
         user_data = get_user_by_id(session['user_id'])
         return render_template('index.html', user=user_data)
     return redirect(url_for('login'))
 
-@app.route('/login', methods=['GET', 'POST'])
+# Ограничение частоты попыток входа по IP и по логину
+login_limiter = LazyModule(create_login_limiter)
+
+@route('/login', methods=['GET', 'POST'])
 def login():
     if 'user_id' in session:
         return redirect(url_for('home'))
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
+        # Проверяем лимит до любых обращений к БД
+        allowed, retry_after = login_limiter.check(request.remote_addr, username)
+        if not allowed:
+            flash(f'Слишком много попыток входа, повторите через {int(retry_after) + 1} с', 'error')
+            return render_template('login.html'), 429
         if username and password:
-            user = login_user(username, password)
+            try:
+                user = login_user(username, password)
+            except PasswordHashBusy:
+                flash('Сервер перегружен, попробуйте войти через минуту', 'error')
+                return render_template('login.html')
             if user:
+                session.regenerate()
                 session['user_id'] = user['id']
                 session['username'] = user['username']
                 session['user_type'] = user['user_type']
@@ -756,7 +1677,7 @@ def login():
             flash('Заполните все поля', 'error')
     return render_template('login.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@route('/register', methods=['GET', 'POST'])
 def register():
     if 'user_id' in session:
         return redirect(url_for('home'))
@@ -800,7 +1721,7 @@ def register():
             flash(message, 'error')
     return render_template('register.html')
 
-@app.route('/admin/create_user', methods=['GET', 'POST'])
+@route('/admin/create_user', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def admin_create_user():
@@ -843,13 +1764,13 @@ def admin_create_user():
             flash(message, 'error')
     return render_template('admin_create_user.html', user=user_data, session=session)
 
-@app.route('/logout')
+@route('/logout')
 def logout():
     session.clear()
     flash('Вы успешно вышли из системы', 'info')
     return redirect(url_for('login'))
 
-@app.route('/starosta')
+@route('/starosta')
 @login_required
 def starosta():
     user_data = get_user_by_id(session['user_id'])
@@ -859,7 +1780,7 @@ def starosta():
     students = starosta_module.get_students_data('ПИ-21')
     reports = starosta_module.get_reports_data()
     info = starosta_module.get_info_for_headman()
-    messages = starosta_module.get_messages()
+    messages = starosta_module.get_messages(user_data['id'])
     return render_template('starosta.html',
                            user=user_data,
                            students=students,
@@ -867,75 +1788,97 @@ def starosta():
                            info=info,
                            messages=messages)
 
-@app.route('/raspisanie')
+def get_timetable_target(user_data):
+    """Курс и группа для расписания: из ?course= или из профиля пользователя"""
+    course = request.args.get('course', type=int)
+    if course is not None:
+        return course, None
+    return user_data.get('course') or 1, user_data.get('group_name')
+
+@route('/raspisanie')
 @login_required
 def raspisanie():
     user_data = get_user_by_id(session['user_id'])
-    course = request.args.get('course', default=1, type=int)
-    schedule = schedule_module.get_schedule(course)
-    days = schedule_module.get_course_days(course)
-    exams = schedule_module.get_exams_schedule(course)
-    return render_template('raspisanie.html',
-                           user=user_data,
-                           schedule=schedule,
-                           days=days,
-                           exams=exams,
-                           current_course=course,
-                           courses=[1, 2, 3, 4])
-
-@app.route('/repetitorstvo')
+    course, group = get_timetable_target(user_data)
+    return render_cached_page('raspisanie.html', 'schedule', user_data, lambda: dict(
+        schedule_module.get_group_timetable(course, group),
+        current_course=course,
+        current_group=group,
+        courses=[1, 2, 3, 4]
+    ), variant=(course, group))
+
+@route('/repetitorstvo')
 @login_required
 def repetitorstvo():
     user_data = get_user_by_id(session['user_id'])
+    after, limit = get_page_args()
     try:
-        tutoring_data = tutoring_module.get_tutoring_data()
+        tutoring_data = tutoring_module.get_tutoring_data(after=after, limit=limit)
         return render_template('repetitorstvo.html',
                              user=user_data,
                              teachers=tutoring_data['teachers'],
-                             students=tutoring_data['students'])
+                             students=tutoring_data['students'],
+                             next_cursor=tutoring_data['next_cursor'],
+                             limit=limit)
     except Exception as e:
         print(f"❌ Ошибка в маршруте repetitorstvo: {e}")
         return render_template('repetitorstvo.html',
                              user=user_data,
                              teachers=[],
-                             students=[])
+                             students=[],
+                             next_cursor=None,
+                             limit=limit)
 
-@app.route('/meropriyatiya')
+@route('/meropriyatiya')
 @login_required
 def meropriyatiya():
     user_data = get_user_by_id(session['user_id'])
-    events_data = events_module.get_events()
-    return render_template('meropriyatiya.html',
-                           user=user_data,
-                           events=events_data)
-
-@app.route('/prepodavateli')
+    # Ближайшие мероприятия зависят от даты - она входит в ключ кэша
+    today = datetime.now().date()
+    return render_cached_page('meropriyatiya.html', 'events', user_data, lambda: {
+        'events': events_module.get_events(),
+        'upcoming': events_module.get_upcoming_events(limit=5),
+        'week_events': events_module.get_week_events(today)
+    }, today)
+
+@route('/prepodavateli')
 @login_required
 def prepodavateli():
     user_data = get_user_by_id(session['user_id'])
-    teachers = teachers_module.get_all_teachers()
-    departments = teachers_module.get_departments()
-    return render_template('prepodavateli.html',
-                           user=user_data,
-                           teachers=teachers,
-                           departments=departments)
-
-@app.route('/praktika')
+    query = request.args.get('q', '').strip()
+    department = request.args.get('department', '').strip()
+    subject = request.args.get('subject', '').strip()
+    if query:
+        # Результаты поиска не кэшируем: вариантов запроса слишком много
+        return render_template('prepodavateli.html', user=user_data, query=query,
+                               department=department, subject=subject,
+                               teachers=teachers_module.filter_teachers(department, subject, query),
+                               departments=teachers_module.get_departments(),
+                               facets=teachers_module.get_facets())
+    # Вариантов фильтра по кафедре и предмету немного - их кэшируем
+    return render_cached_page('prepodavateli.html', 'teachers', user_data, lambda: {
+        'teachers': teachers_module.filter_teachers(department, subject),
+        'departments': teachers_module.get_departments(),
+        'facets': teachers_module.get_facets(),
+        'department': department,
+        'subject': subject
+    }, (department, subject))
+
+@route('/praktika')
 @login_required
 def praktika():
     user_data = get_user_by_id(session['user_id'])
-    practice_data = practice_module.get_practice_data()
-    return render_template('praktika.html',
-                           user=user_data,
-                           practice=practice_data)
+    return render_cached_page('praktika.html', 'practice', user_data, lambda: {
+        'practice': practice_module.get_practice_data()
+    })
 
-@app.route('/podderzhka')
+@route('/podderzhka')
 @login_required
 def podderzhka():
     user_data = get_user_by_id(session['user_id'])
     return render_template('podderzhka.html', user=user_data)
 
-@app.route('/profile')
+@route('/profile')
 @login_required
 def profile():
     """Профиль пользователя"""
@@ -943,17 +1886,58 @@ def profile():
     return render_template('profile.html', user=user_data)
 
 
-@app.route('/users')
+@route('/users')
 @login_required
 @admin_required
 def users_list():
     """Список всех пользователей (только для админа)"""
     user_data = get_user_by_id(session['user_id'])
-    users = get_all_users()
-    return render_template('users.html', user=user_data, users=users)
+    after, limit = get_page_args()
+    users, next_cursor = get_users_page(after, limit)
+    return render_template('users.html',
+                           user=user_data,
+                           users=users,
+                           next_cursor=next_cursor,
+                           limit=limit)
+
+
+@route('/admin/import_users', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def admin_import_users():
+    """Массовая загрузка пользователей из CSV или JSONL"""
+    user_data = get_user_by_id(session['user_id'])
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Выберите файл для загрузки', 'error')
+            return render_template('admin_import_users.html', user=user_data)
+        fmt = 'jsonl' if upload.filename.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        report = bulk_import_users(stream, fmt, created_by=session.get('username', 'admin'))
+
+        flash(f"Создано пользователей: {report['created']}, пропущено строк: {report['failed']}",
+              'success' if not report['failed'] else 'warning')
+        for line_number, message in report['errors'][:10]:
+            flash(f"Строка {line_number}: {message}" if line_number else message, 'error')
+        return redirect(url_for('users_list'))
+    return render_template('admin_import_users.html', user=user_data)
+
+
+@route('/admin/export_users')
+@login_required
+@admin_required
+def admin_export_users():
+    """Выгрузка всех пользователей (?format=csv или jsonl)"""
+    fmt = 'jsonl' if request.args.get('format') == 'jsonl' else 'csv'
+    mimetype = 'application/x-ndjson' if fmt == 'jsonl' else 'text/csv'
+    response = current_app.response_class(stream_with_context(iter_users_export(fmt)),
+                                  mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="users.{fmt}"'
+    return response
 
 
-@app.route('/admin/delete_user/<int:user_id>', methods=['POST'])
+@route('/admin/delete_user/<int:user_id>', methods=['POST'])
 @login_required
 @admin_required
 def delete_user_route(user_id):
@@ -966,9 +1950,33 @@ def delete_user_route(user_id):
     return redirect(url_for('users_list'))
 
 
+@route('/admin/stats')
+@login_required
+@admin_required
+def admin_stats():
+    """Счетчики производительности (только для админа)"""
+    return jsonify({
+        'db_pool': db_pool.get_stats(),
+        'user_cache': user_cache.get_stats(),
+        'page_cache': page_cache.get_stats(),
+        'login_limiter': login_limiter.get_stats(),
+        'sessions': session_backend.get_stats()
+    })
+
+
+@route('/admin/check_counts')
+@login_required
+@admin_required
+def admin_check_counts():
+    """Проверка счетчиков записей на репетиторство (только для админа)"""
+    fix = request.args.get('fix') == '1'
+    drift = tutoring_module.check_registration_counts(fix=fix)
+    return jsonify({'drift': drift, 'fixed': fix and bool(drift)})
+
+
 # ==================== РЕПЕТИТОРСТВО (ДОПОЛНИТЕЛЬНЫЕ МАРШРУТЫ) ====================
 
-@app.route('/repetitorstvo/add', methods=['GET', 'POST'])
+@route('/repetitorstvo/add', methods=['GET', 'POST'])
 @login_required
 def add_tutoring():
     """Добавить репетиторство"""
@@ -1019,7 +2027,7 @@ def add_tutoring():
 
 # ==================== МАРШРУТЫ ДЛЯ РЕДАКТИРОВАНИЯ ====================
 
-@app.route('/admin/edit_user/<int:user_id>', methods=['GET', 'POST'])
+@route('/admin/edit_user/<int:user_id>', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def edit_user(user_id):
@@ -1091,7 +2099,7 @@ def edit_user(user_id):
                          user=user_data,
                          target_user=target_user)
 
-@app.route('/repetitorstvo/register/<int:tutoring_id>', methods=['POST'])
+@route('/repetitorstvo/register/<int:tutoring_id>', methods=['POST'])
 @login_required
 def register_for_tutoring(tutoring_id):
     """Записаться на репетиторство"""
@@ -1117,7 +2125,7 @@ def register_for_tutoring(tutoring_id):
     return redirect(url_for('repetitorstvo'))
 
 
-@app.route('/repetitorstvo/my')
+@route('/repetitorstvo/my')
 @login_required
 def my_tutoring():
     """Мои репетиторства"""
@@ -1133,7 +2141,7 @@ def my_tutoring():
                          my_tutoring=my_tutoring_list)
 
 
-@app.route('/repetitorstvo/delete/<int:tutoring_id>')
+@route('/repetitorstvo/delete/<int:tutoring_id>')
 @login_required
 def delete_tutoring(tutoring_id):
     """Удалить репетиторство"""
@@ -1145,6 +2153,344 @@ def delete_tutoring(tutoring_id):
     return redirect(url_for('my_tutoring'))
 
 
+# ==================== JSON API ====================
+
+API_MAX_AGE = 300  # секунд, после чего клиент перепроверяет данные по ETag
+
+def api_login_required(f):
+    from functools import wraps
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Требуется авторизация'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+def api_response(payload, data_name):
+    """JSON-ответ с ETag по содержимому, Last-Modified и Cache-Control.
+
+    Если клиент прислал совпадающий If-None-Match (или If-Modified-Since),
+    возвращается 304 без тела.
+    """
+    body = json.dumps(payload, ensure_ascii=False, sort_keys=True,
+                      separators=(',', ':')).encode('utf-8')
+    return conditional_response(body, 'application/json', data_name)
+
+def conditional_response(body, mimetype, data_name):
+    """Ответ с телом body, ETag по содержимому и Last-Modified по версии данных"""
+    _, modified_at = data_versions.get(data_name)
+
+    response = current_app.response_class(body, mimetype=mimetype)
+    response.set_etag(hashlib.sha256(body).hexdigest()[:32])
+    response.last_modified = datetime.fromtimestamp(int(modified_at), tz=timezone.utc)
+    response.cache_control.private = True
+    response.cache_control.max_age = API_MAX_AGE
+    return response.make_conditional(request)
+
+@route('/api/v1/schedule/<int:course>')
+@api_login_required
+def api_schedule(course):
+    """Расписание курса"""
+    return api_response({
+        'course': course,
+        'days': schedule_module.get_course_days(course),
+        'schedule': schedule_module.get_schedule(course),
+        'exams': schedule_module.get_exams_schedule(course)
+    }, 'schedule')
+
+@route('/api/v1/teachers')
+@api_login_required
+def api_teachers():
+    """Список преподавателей и кафедр.
+
+    ?q= - поиск, ?department= и ?subject= - фильтры (сочетаются между
+    собой), ?limit= - число результатов.
+    """
+    query = request.args.get('q', '').strip()
+    department = request.args.get('department', '').strip()
+    subject = request.args.get('subject', '').strip()
+    limit = request.args.get('limit', type=int)
+    if query and not (department or subject):
+        teachers = teachers_module.search_teachers(query, limit=limit)
+    else:
+        teachers = teachers_module.filter_teachers(department, subject, query)
+        if limit is not None:
+            teachers = teachers[:max(limit, 0)]
+    facets = teachers_module.get_facets()
+    return api_response({
+        'teachers': teachers,
+        'departments': teachers_module.get_departments(),
+        'facets': {name: [{'name': value, 'count': count} for value, count in pairs]
+                   for name, pairs in facets.items()}
+    }, 'teachers')
+
+@route('/api/v1/events')
+@api_login_required
+def api_events():
+    """Мероприятия.
+
+    ?from= и ?to= - мероприятия в этом промежутке дат (to не включается),
+    ?upcoming=1 - предстоящие, ?limit= - не больше limit мероприятий.
+    Даты в формате ДД.ММ.ГГГГ или ГГГГ-ММ-ДД.
+    """
+    date_from = request.args.get('from', '').strip()
+    date_to = request.args.get('to', '').strip()
+    limit = request.args.get('limit', type=int)
+    try:
+        start = parse_event_start(date_from) if date_from else None
+        end = parse_event_start(date_to) if date_to else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if start or end:
+        events = events_module.get_events_between(start or datetime.min, end or datetime.max)
+    elif request.args.get('upcoming'):
+        events = events_module.get_upcoming_events(limit=limit)
+    else:
+        events = events_module.get_events()
+    if limit is not None:
+        events = events[:max(limit, 0)]
+    return api_response({'events': events}, 'events')
+
+@route('/api/v1/practice')
+@api_login_required
+def api_practice():
+    """Практика"""
+    return api_response({'practice': practice_module.get_practice_data()}, 'practice')
+
+@route('/raspisanie.ics')
+@login_required
+def raspisanie_ics():
+    """Расписание группы в формате iCalendar.
+
+    Занятия - еженедельные события начиная с текущей недели,
+    экзамены - события на весь день.
+    """
+    user_data = get_user_by_id(session['user_id'])
+    course, group = get_timetable_target(user_data)
+    timetable = schedule_module.get_group_timetable(course, group)
+
+    today = datetime.now().date()
+    week_start = today - timedelta(days=today.weekday())
+    _, modified_at = data_versions.get('schedule')
+    events = timetable_events(timetable, week_start, f"{course}-{group or 'all'}")
+    body = build_calendar(f"Расписание: {group or f'{course} курс'}", events, modified_at)
+
+    response = conditional_response(body.encode('utf-8'), 'text/calendar', 'schedule')
+    response.headers['Content-Disposition'] = 'attachment; filename="raspisanie.ics"'
+    return response
+
+@route('/api/v1/messages')
+@api_login_required
+def api_messages():
+    """Входящие сообщения (?after= - курсор, ?limit= - размер страницы) и число непрочитанных.
+
+    Данные личные и часто меняются, поэтому ответ не кэшируется.
+    """
+    after, limit = get_page_args()
+    inbox, next_key = messages_module.get_inbox(session['user_id'], after=decode_cursor(after, 2),
+                                                limit=limit)
+    return jsonify({
+        'messages': inbox,
+        'unread_count': messages_module.get_unread_count(session['user_id']),
+        'next_cursor': encode_cursor(list(next_key)) if next_key else None
+    })
+
+@route('/meropriyatiya.ics')
+@login_required
+def meropriyatiya_ics():
+    """Все мероприятия в формате iCalendar (лента собирается заранее, см. mero.py)"""
+    body = events_module.get_ical_feed()
+    response = conditional_response(body.encode('utf-8'), 'text/calendar', 'events')
+    response.headers['Content-Disposition'] = 'attachment; filename="meropriyatiya.ics"'
+    return response
+
+
+# ==================== КОМАНДЫ CLI ====================
+
+@cli_command
+@click.command('import-schedule')
+@with_appcontext
+@click.argument('csv_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--keep', is_flag=True, help='Добавить занятия к текущему расписанию, а не заменить его')
+def import_schedule_command(csv_path, keep):
+    """Загрузить расписание занятий из CSV (course, group, day, time, subject, teacher, room)"""
+    if not check_and_fix_db():
+        raise click.ClickException("База данных не готова")
+    # Версию 'schedule' увеличивают триггеры, другие процессы увидят новое расписание сами
+    success, message = schedule_module.import_lessons_csv(csv_path, replace=not keep)
+    if not success:
+        raise click.ClickException(message)
+    click.echo(f"✅ {message}")
+
+
+@cli_command
+@click.command('import-users')
+@with_appcontext
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True, help='Строк в одной транзакции')
+def import_users_command(path, batch_size):
+    """Загрузить пользователей из CSV или JSONL"""
+    if not check_and_fix_db():
+        raise click.ClickException("База данных не готова")
+    fmt = 'jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        report = bulk_import_users(stream, fmt, batch_size=batch_size)
+    for line_number, message in report['errors']:
+        click.echo(f"⚠️  Строка {line_number}: {message}" if line_number else f"⚠️  {message}")
+    click.echo(f"✅ Создано пользователей: {report['created']}, пропущено строк: {report['failed']}")
+
+
+# ==================== ОБЩИЕ СТРАНИЦЫ (РАНЕЕ vxod.py) ====================
+
+@route('/dashboard')
+@login_required
+def dashboard():
+    """Общая панель управления для всех"""
+    user_data = get_user_by_id(session['user_id'])
+
+    # В зависимости от роли показываем разную информацию
+    if session['user_type'] == 'admin':
+        return render_template('dashboard.html', user=user_data, users=get_all_users())
+    return render_template('dashboard.html', user=user_data)
+
+@route('/schedule')
+@login_required
+def schedule():
+    """Расписание (доступно всем)"""
+    return render_template('schedule.html', user_type=session['user_type'], name=session['name'])
+
+@route('/events')
+@login_required
+def events():
+    """Мероприятия (доступно всем)"""
+    return render_template('events.html', user_type=session['user_type'], name=session['name'])
+
+def get_allowed_audiences(user):
+    """Рассылки, которые может отправить пользователь"""
+    if user['user_type'] in ('admin', 'teacher'):
+        return list(BROADCASTS)
+    if user['user_type'] == 'starosta' and user.get('group_name'):
+        return [f"Группа {user['group_name']}"]
+    return []
+
+def can_broadcast(user, audience):
+    """Может ли пользователь отправить рассылку audience"""
+    if user['user_type'] in ('admin', 'teacher'):
+        return True
+    return audience in get_allowed_audiences(user)
+
+@route('/messages')
+@login_required
+def messages():
+    """Сообщения (доступно всем): входящие постранично, новые сверху"""
+    user_data = get_user_by_id(session['user_id'])
+    after, limit = get_page_args()
+    inbox, next_key = messages_module.get_inbox(user_data['id'], after=decode_cursor(after, 2),
+                                                limit=limit)
+    return render_template('messages.html', user_type=session['user_type'], name=session['name'],
+                           messages=inbox,
+                           unread_count=messages_module.get_unread_count(user_data['id']),
+                           audiences=get_allowed_audiences(user_data),
+                           next_cursor=encode_cursor(list(next_key)) if next_key else None)
+
+@route('/messages/send', methods=['POST'])
+@login_required
+def messages_send():
+    """Отправить сообщение пользователю (по логину) или рассылку"""
+    user_data = get_user_by_id(session['user_id'])
+    audience = request.form.get('audience', '').strip()
+    recipient = request.form.get('recipient', '').strip()
+    subject = request.form.get('subject', '')
+    body = request.form.get('message', '')
+
+    if audience:
+        if not can_broadcast(user_data, audience):
+            flash('Нет прав на эту рассылку', 'error')
+            return redirect(url_for('messages'))
+        success, message = messages_module.send_message(user_data['id'], user_data['full_name'],
+                                                        subject, body, audience=audience)
+    else:
+        row = get_db_connection().execute('SELECT id, full_name FROM users WHERE username = ?',
+                                          (recipient,)).fetchone()
+        if row is None:
+            flash('Получатель не найден', 'error')
+            return redirect(url_for('messages'))
+        success, message = messages_module.send_message(user_data['id'], user_data['full_name'],
+                                                        subject, body, audience=row['full_name'],
+                                                        recipient_ids=[row['id']])
+    flash(message, 'success' if success else 'error')
+    return redirect(url_for('messages'))
+
+@route('/messages/<int:message_id>/read', methods=['POST'])
+@login_required
+def messages_read(message_id):
+    """Отметить сообщение прочитанным"""
+    messages_module.mark_read(session['user_id'], message_id)
+    return redirect(url_for('messages'))
+
+@route('/messages/read_all', methods=['POST'])
+@login_required
+def messages_read_all():
+    """Отметить прочитанными все входящие"""
+    messages_module.mark_all_read(session['user_id'])
+    return redirect(url_for('messages'))
+
+@route('/tasks')
+@login_required
+def tasks():
+    """Задачи (доступно всем)"""
+    return render_template('tasks.html', user_type=session['user_type'], name=session['name'])
+
+
+# ==================== ФАБРИКА ПРИЛОЖЕНИЯ ====================
+
+def create_app(config=None):
+    """Создать приложение Flask.
+
+    Подключает маршруты и команды, собранные при импорте, и хранилище
+    сессий. Модули, пул соединений и хранилища по-прежнему создаются
+    при первом обращении, поэтому вызов не обращается к БД.
+    """
+    app = Flask(__name__)
+    # Важно задать свой ключ (переменная окружения SECRET_KEY)!
+    app.secret_key = os.environ.get('SECRET_KEY', 'your_secret_key_here_change_this')
+    if config:
+        app.config.update(config)
+
+    app.session_interface = ServerSessionInterface(session_backend)
+    app.teardown_appcontext(release_db_connection)
+    for rule, view_func, options in _routes:
+        app.add_url_rule(rule, view_func=view_func, **options)
+    for command in _cli_commands:
+        app.cli.add_command(command)
+    return app
+
+def preload_modules():
+    """Создать модули заранее (в главном процессе до fork, см. wsgi.py)"""
+    for module in (starosta_module, schedule_module, teachers_module,
+                   events_module, practice_module, tutoring_module, messages_module):
+        module._get()
+
+# Хранилища родительского процесса: держат соединения SQLite, которые
+# в воркере нельзя закрывать (см. ConnectionPool.reset_after_fork)
+_inherited_stores = []
+
+def reset_after_fork():
+    """Подготовить процесс-воркер после fork (см. wsgi.py).
+
+    Соединения SQLite и хранилища, которые их держат, в дочернем процессе
+    создаются заново; модули и кэши в памяти остаются - их копия корректна.
+    Унаследованные объекты не освобождаются, чтобы их соединения не
+    закрылись в воркере.
+    """
+    db_pool.reset_after_fork()
+    for module in (session_backend, login_limiter):
+        if module.is_loaded:
+            _inherited_stores.append(module._get())
+        module.reset()
+
+
 # ==================== ЗАПУСК ПРИЛОЖЕНИЯ ====================
 
 if __name__ == '__main__':
@@ -1154,6 +2500,7 @@ if __name__ == '__main__':
     
     # Проверяем и инициализируем БД
     if check_and_fix_db():
+        app = create_app()
         print("✅ База данных готова к работе")
         print("🌐 Приложение доступно по адресам:")
         print("   • На компьютере: http://localhost:5000")
@@ -1163,8 +2510,10 @@ if __name__ == '__main__':
         print("=" * 50)
         
         # ЗАПУСКАЕМ С ДОСТУПОМ ИЗ СЕТИ
+        # Сервер разработки; отладчик только при FLASK_DEBUG=1.
+        # Для рабочего запуска: python wsgi.py
         app.run(
-            debug=True, 
+            debug=os.environ.get('FLASK_DEBUG') == '1', 
             host='0.0.0.0',  # Принимает подключения со всех интерфейсов
             port=5000,
             threaded=True  # Для лучшей производительности
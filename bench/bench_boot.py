@@ -0,0 +1,94 @@
+"""
+Замер загрузки приложения по этапам (как у воркера gunicorn, см. wsgi.py)
+
+Каждый запуск - новый процесс Python в каталоге с базой:
+  - import app (без обращений к БД: файл базы при импорте не создается);
+  - create_app();
+  - check_and_fix_db() (быстрый путь по PRAGMA user_version);
+  - первое обращение к каждому модулю (LazyModule);
+  - fork воркера: от fork до первого запроса к БД в дочернем процессе,
+    с модулями, загруженными до fork (preload_modules), и без них.
+
+    python bench/bench_boot.py
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from common import ROOT, temp_portal
+
+RUNS = 5
+
+PROBE = f'''
+import contextlib, io, json, os, sys, time
+sys.path.insert(0, {ROOT!r})
+os.rename('university.db', 'university.db.bak')
+timings = {{}}
+with contextlib.redirect_stdout(io.StringIO()):
+    started = time.perf_counter()
+    import app
+    timings['import app'] = time.perf_counter() - started
+    assert not os.path.exists('university.db'), 'import app обратился к БД'
+    os.rename('university.db.bak', 'university.db')
+
+    started = time.perf_counter()
+    application = app.create_app()
+    timings['create_app()'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    assert app.check_and_fix_db()
+    timings['check_and_fix_db()'] = time.perf_counter() - started
+
+    def first_query():
+        with application.app_context():
+            app.tutoring_module.get_tutoring_data(limit=50)
+
+    def fork_boot():
+        """Время от fork до первого запроса к БД в дочернем процессе"""
+        app.db_pool.close_all()  # как on_starting в wsgi.py
+        read_end, write_end = os.pipe()
+        started = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            app.reset_after_fork()
+            first_query()
+            os.write(write_end, str(time.perf_counter() - started).encode())
+            os._exit(0)
+        os.close(write_end)
+        elapsed = float(os.read(read_end, 64))
+        os.waitpid(pid, 0)
+        return elapsed
+
+    if hasattr(os, 'fork'):
+        timings['fork + первый запрос (без preload)'] = fork_boot()
+
+    for name in ('starosta_module', 'schedule_module', 'teachers_module', 'events_module',
+                 'practice_module', 'tutoring_module', 'messages_module'):
+        started = time.perf_counter()
+        getattr(app, name)._get()
+        timings[f'первое обращение: {{name}}'] = time.perf_counter() - started
+
+    if hasattr(os, 'fork'):
+        timings['fork + первый запрос (preload)'] = fork_boot()
+print(json.dumps({{stage: seconds * 1000 for stage, seconds in timings.items()}}))
+'''
+
+
+def main():
+    with temp_portal():
+        runs = []
+        for _ in range(RUNS):
+            output = subprocess.run([sys.executable, '-c', PROBE], capture_output=True,
+                                    text=True, check=True, cwd=os.getcwd()).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"Медиана по {RUNS} запускам")
+    print(f"{'Этап':<46}{'мс':>10}")
+    for stage in runs[0]:
+        print(f"{stage:<46}{statistics.median(run[stage] for run in runs):>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
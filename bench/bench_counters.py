@@ -0,0 +1,74 @@
+"""
+Замер счетчиков записей (tutoring.registered_count / pending_count)
+
+10 000 репетиторств и 100 000 записей студентов. Сравнивается чтение
+числа занятых мест из счетчика, поддерживаемого триггерами, с подсчетом
+COUNT(*) / GROUP BY по tutoring_registrations, а также время записи
+(reserve_seat) и полной сверки счетчиков (check_registration_counts).
+
+    python bench/bench_counters.py
+"""
+from common import median_ms, temp_portal
+
+LISTINGS = 10000
+REGISTRATIONS = 100000
+STUDENTS = 1000
+PAGE = 50
+
+COUNTER_ONE = 'SELECT registered_count FROM tutoring WHERE id = ?'
+COUNT_ONE = '''
+SELECT COUNT(*) FROM tutoring_registrations WHERE tutoring_id = ? AND status != 'отменено'
+'''
+COUNTER_PAGE = '''
+SELECT id, registered_count, pending_count FROM tutoring ORDER BY created_at DESC, id DESC LIMIT ?
+'''
+COUNT_PAGE = '''
+SELECT t.id, COALESCE(SUM(tr.status != 'отменено'), 0), COALESCE(SUM(tr.status = 'ожидает'), 0)
+FROM tutoring t LEFT JOIN tutoring_registrations tr ON tr.tutoring_id = t.id
+GROUP BY t.id ORDER BY t.created_at DESC, t.id DESC LIMIT ?
+'''
+
+
+def main():
+    with temp_portal() as portal:
+        app = portal.create_app()
+        with app.app_context():
+            conn = portal.get_db_connection()
+            conn.executemany('''
+            INSERT INTO users (id, username, password, full_name, user_type) VALUES (?, ?, '', ?, 'student')
+            ''', [(10 + i, f'student{i}', f'Студент {i}') for i in range(STUDENTS)])
+            conn.executemany('''
+            INSERT INTO tutoring (id, subject, tutor_name, tutor_id, tutor_type, days, time, room,
+                                  price, max_students)
+            VALUES (?, ?, 'Преподаватель', 1, 'teacher', 'Пн', '10:00', '101', '500', 1000)
+            ''', [(i, f'Предмет {i}') for i in range(1, LISTINGS + 1)])
+            per_listing = REGISTRATIONS // LISTINGS
+            conn.executemany('''
+            INSERT INTO tutoring_registrations (tutoring_id, student_id, status) VALUES (?, ?, ?)
+            ''', [(i, 10 + (i + k) % STUDENTS, 'ожидает' if k % 2 else 'подтверждено')
+                  for i in range(1, LISTINGS + 1) for k in range(per_listing)])
+            conn.commit()
+
+            module = portal.tutoring_module
+            print(f"Репетиторств: {LISTINGS}, записей: {REGISTRATIONS}")
+            print(f"{'Операция':<44}{'счетчик, мс':>13}{'COUNT, мс':>11}")
+            counter_ms = median_ms(lambda: conn.execute(COUNTER_ONE, (LISTINGS // 2,)).fetchone(),
+                                   repeat=200)
+            count_ms = median_ms(lambda: conn.execute(COUNT_ONE, (LISTINGS // 2,)).fetchone(),
+                                 repeat=200)
+            print(f"{'занято мест на одном репетиторстве':<44}{counter_ms:>13.3f}{count_ms:>11.3f}")
+            counter_ms = median_ms(lambda: conn.execute(COUNTER_PAGE, (PAGE,)).fetchall())
+            count_ms = median_ms(lambda: conn.execute(COUNT_PAGE, (PAGE,)).fetchall(), repeat=5)
+            print(f"{f'страница из {PAGE} репетиторств':<44}{counter_ms:>13.3f}{count_ms:>11.3f}")
+
+            student = iter(range(10 + per_listing, 10 + STUDENTS))
+            reserve_ms = median_ms(lambda: module.reserve_seat(1, next(student)), repeat=100)
+            print(f"{'запись (reserve_seat, с триггерами)':<44}{reserve_ms:>13.3f}")
+            check_ms = median_ms(module.check_registration_counts, repeat=5)
+            drift = module.check_registration_counts()
+            print(f"{'сверка счетчиков (check_registration_counts)':<44}{check_ms:>13.1f}"
+                  f"   расхождений: {len(drift)}")
+
+
+if __name__ == '__main__':
+    main()
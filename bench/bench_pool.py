@@ -0,0 +1,65 @@
+"""
+Замер пула соединений SQLite (ConnectionPool) против прежнего подхода
+
+Прежде каждая функция открывала свое соединение, выполняла
+PRAGMA journal_mode=WAL и закрывала его. Здесь "просмотр страницы" -
+три запроса к БД (как у /repetitorstvo: пользователь, список,
+записи), выполняемые из нескольких потоков, как при threaded=True.
+
+    python bench/bench_pool.py
+"""
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import temp_portal
+
+THREADS = 8
+REQUESTS = 2000
+QUERIES = (
+    ('SELECT * FROM users WHERE id = ?', (1,)),
+    ('SELECT * FROM tutoring ORDER BY created_at DESC, id DESC LIMIT 50', ()),
+    ("SELECT * FROM tutoring_registrations WHERE status != 'отменено' LIMIT 50", ()),
+)
+
+
+def page_old(_):
+    """Просмотр страницы: новое соединение на каждый запрос"""
+    for sql, params in QUERIES:
+        conn = sqlite3.connect('university.db', timeout=10.0)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(sql, params).fetchall()
+        conn.close()
+
+
+def run(fn):
+    """Запросов в секунду при THREADS потоках"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        list(pool.map(fn, range(REQUESTS)))
+    return REQUESTS / (time.perf_counter() - started)
+
+
+def main():
+    with temp_portal() as portal:
+        app = portal.create_app()
+
+        def page_pooled(_):
+            """Просмотр страницы: одно соединение из пула на весь запрос"""
+            with app.app_context():
+                for sql, params in QUERIES:
+                    portal.get_db_connection().execute(sql, params).fetchall()
+
+        old_rate = run(page_old)
+        new_rate = run(page_pooled)
+        stats = portal.db_pool.get_stats()
+        print(f"Потоков: {THREADS}, просмотров страниц: {REQUESTS}, запросов к БД на страницу: {len(QUERIES)}")
+        print(f"{'Подход':<34}{'страниц/с':>12}")
+        print(f"{'соединение на каждый запрос':<34}{old_rate:>12.0f}")
+        print(f"{'пул соединений':<34}{new_rate:>12.0f}")
+        print(f"Пул: открыто {stats['opened']}, повторно использовано {stats['reused']}, "
+              f"закрыто {stats['closed']}")
+
+
+if __name__ == '__main__':
+    main()
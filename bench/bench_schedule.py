@@ -0,0 +1,71 @@
+"""
+Замер индексов расписания (ScheduleModule)
+
+40 потоков (курсов) x 6 дней x 6 пар = 1 440 занятий, 60 преподавателей
+и 50 аудиторий в таблице lessons. Выводится время загрузки из БД,
+построения индексов, поиска накладок и запросов: занятия в слоте,
+свободные аудитории, неделя преподавателя (по индексу и прежним
+перебором всех курсов и дней).
+
+    python bench/bench_schedule.py
+"""
+from common import median_ms, temp_portal
+
+import rasp
+
+GROUPS = 40
+DAYS = ('Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота')
+SLOTS = ('09:00-10:30', '10:45-12:15', '12:30-14:00', '14:15-15:45', '16:00-17:30', '17:45-19:15')
+TEACHERS = 60
+ROOMS = 50
+
+
+def lesson_rows():
+    """Занятия без накладок: в каждом слоте у групп разные преподаватели и аудитории"""
+    for group in range(GROUPS):
+        for day_number, day in enumerate(DAYS):
+            for slot_number, time in enumerate(SLOTS):
+                shift = day_number * len(SLOTS) + slot_number
+                yield rasp.make_lesson_row(group + 1, day, time, f'Предмет {shift % 12}',
+                                           f'Преподаватель {(group + shift) % TEACHERS}',
+                                           str(100 + (group + shift) % ROOMS))
+
+
+def teacher_week_scan(schedule, teacher):
+    """Неделя преподавателя перебором всех курсов и дней (как до индексов)"""
+    days = {}
+    for course, course_days in schedule.schedule_data.items():
+        for day, lessons in course_days.items():
+            for lesson in lessons:
+                if lesson['teacher'] == teacher:
+                    days.setdefault(day, []).append(dict(lesson, course=course, day=day))
+    return days
+
+
+def main():
+    with temp_portal() as portal:
+        conn = portal.get_db_connection()
+        conn.execute('DELETE FROM lessons')
+        rasp.insert_lessons(conn, lesson_rows())
+        conn.commit()
+
+        schedule = rasp.ScheduleModule(connection_factory=portal.get_db_connection)
+        lessons = sum(len(day) for days in schedule.schedule_data.values() for day in days.values())
+        print(f"Занятий: {lessons}, накладок: {len(schedule.conflicts)}")
+        rows = [
+            ('загрузка из БД', lambda: schedule.load_schedule()),
+            ('построение индексов и накладок', lambda: schedule.build_indexes()),
+            ('поиск накладок', lambda: schedule.find_conflicts()),
+            ('занятия в слоте (Ср 13:00)', lambda: schedule.get_slot_lessons('Среда', '13:00')),
+            ('занятия в слоте (Ср 18:00)', lambda: schedule.get_slot_lessons('Среда', '18:00')),
+            ('свободные аудитории (Ср 13:00)', lambda: schedule.find_free_rooms('Среда', '13:00')),
+            ('неделя преподавателя', lambda: schedule.get_teacher_schedule('Преподаватель 7')),
+            ('неделя преподавателя перебором', lambda: teacher_week_scan(schedule, 'Преподаватель 7')),
+        ]
+        print(f"{'Операция':<34}{'мс':>10}")
+        for title, action in rows:
+            print(f"{title:<34}{median_ms(action):>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Замер запуска: импорт app.py отдельно от подготовки базы (check_and_fix_db)
+
+Каждый замер - новый процесс Python, запущенный в каталоге с
+большой базой (200 000 пользователей, 50 000 репетиторств, 150 000
+записей). Сравниваются быстрый путь (PRAGMA user_version совпадает)
+и полная проверка схемы (user_version сброшен в 0).
+
+    python bench/bench_startup.py
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from common import ROOT, temp_portal
+
+RUNS = 5
+USERS = 200000
+LISTINGS = 50000
+
+PROBE = f'''
+import contextlib, io, json, sys, time
+sys.path.insert(0, {ROOT!r})
+started = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import app
+    imported = time.perf_counter()
+    ok = app.check_and_fix_db()
+ready = time.perf_counter()
+print(json.dumps([ok, (imported - started) * 1000, (ready - imported) * 1000]))
+'''
+
+
+def probe(before_run=None):
+    """(импорт, подготовка БД) в миллисекундах - медианы по RUNS запускам"""
+    results = []
+    for _ in range(RUNS):
+        if before_run:
+            before_run()
+        output = subprocess.run([sys.executable, '-c', PROBE], capture_output=True,
+                                text=True, check=True, cwd=os.getcwd()).stdout
+        ok, import_ms, ready_ms = json.loads(output.strip().splitlines()[-1])
+        assert ok
+        results.append((import_ms, ready_ms))
+    return (statistics.median(r[0] for r in results), statistics.median(r[1] for r in results))
+
+
+def main():
+    with temp_portal() as portal:
+        conn = portal.db_pool.thread_connection()
+        conn.executemany('''
+        INSERT INTO users (username, password, full_name, user_type) VALUES (?, '', ?, 'student')
+        ''', ((f'student{i}', f'Студент {i}') for i in range(USERS)))
+        conn.executemany('''
+        INSERT INTO tutoring (subject, tutor_name, tutor_id, tutor_type, days, time, room, price)
+        VALUES (?, 'Преподаватель', 1, 'teacher', 'Пн', '10:00', '101', '500')
+        ''', ((f'Предмет {i}',) for i in range(LISTINGS)))
+        conn.executemany('''
+        INSERT INTO tutoring_registrations (tutoring_id, student_id) VALUES (?, ?)
+        ''', ((1 + i % LISTINGS, 2 + i) for i in range(3 * LISTINGS)))
+        conn.commit()
+        size_mb = os.path.getsize('university.db') / 1024 / 1024
+
+        print(f"База: {size_mb:.0f} МБ, запусков на вариант: {RUNS}")
+        print(f"{'Вариант':<36}{'импорт, мс':>12}{'подготовка БД, мс':>20}")
+        import_ms, ready_ms = probe()
+        print(f"{'быстрый путь (user_version)':<36}{import_ms:>12.1f}{ready_ms:>20.1f}")
+
+        import_ms, ready_ms = probe(lambda: conn.execute('PRAGMA user_version = 0'))
+        print(f"{'полная проверка схемы':<36}{import_ms:>12.1f}{ready_ms:>20.1f}")
+
+
+if __name__ == '__main__':
+    main()
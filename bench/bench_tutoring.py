@@ -0,0 +1,57 @@
+"""
+Замер загрузки списка репетиторств (TutoringModule.get_tutoring_data)
+
+Для 10, 100, 1 000 и 10 000 репетиторств (по 3 записи студентов на
+каждое) выводятся число SQL-команд и время: страницы из 50 записей
+(как на /repetitorstvo) и полного списка. Число команд не зависит
+от числа репетиторств, время страницы остается постоянным.
+
+    python bench/bench_tutoring.py
+"""
+from common import QueryCounter, median_ms, temp_portal
+
+SIZES = (10, 100, 1000, 10000)
+STUDENTS = 30
+PER_LISTING = 3
+
+
+def fill(conn, first_id, count):
+    """Добавить count репетиторств с записями студентов"""
+    conn.executemany('''
+    INSERT INTO tutoring (id, subject, tutor_name, tutor_id, tutor_type, description,
+                          days, time, room, price, max_students)
+    VALUES (?, ?, 'Преподаватель', 1, ?, '', 'Пн', '10:00', '101', '500', 10)
+    ''', [(i, f'Предмет {i}', 'teacher' if i % 2 else 'student')
+          for i in range(first_id, first_id + count)])
+    conn.executemany('''
+    INSERT INTO tutoring_registrations (tutoring_id, student_id, status) VALUES (?, ?, 'ожидает')
+    ''', [(i, 2 + (i + k) % STUDENTS) for i in range(first_id, first_id + count)
+          for k in range(PER_LISTING)])
+    conn.commit()
+
+
+def main():
+    with temp_portal() as portal:
+        app = portal.create_app()
+        with app.app_context():
+            conn = portal.get_db_connection()
+            conn.executemany('''
+            INSERT INTO users (username, password, full_name, user_type) VALUES (?, '', ?, 'student')
+            ''', [(f'student{i}', f'Студент {i}') for i in range(STUDENTS)])
+            conn.commit()
+
+            module = portal.tutoring_module
+            print(f"{'Репетиторств':>13}{'команд':>8}{'страница, мс':>14}{'весь список, мс':>17}")
+            total = 0
+            for size in SIZES:
+                fill(conn, total + 1, size - total)
+                total = size
+                with QueryCounter(conn) as counter:
+                    module.get_tutoring_data(limit=50)
+                page_ms = median_ms(lambda: module.get_tutoring_data(limit=50))
+                full_ms = median_ms(lambda: module.get_tutoring_data(), repeat=5)
+                print(f"{size:>13}{counter.count:>8}{page_ms:>14.2f}{full_ms:>17.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Общие заготовки для замеров в каталоге bench/
+
+Каждый замер работает с отдельной базой university.db во временном
+каталоге - рабочая база не затрагивается. Запуск из корня проекта:
+
+    python bench/bench_tutoring.py
+"""
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Скрыть сообщения app.py об инициализации базы"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@contextlib.contextmanager
+def temp_portal():
+    """Модуль app с новой базой university.db во временном каталоге"""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            with quiet():
+                import app as portal
+                portal.db_pool.close_all()
+                if not portal.check_and_fix_db():
+                    raise SystemExit("❌ Не удалось подготовить временную базу")
+            yield portal
+        finally:
+            portal.db_pool.close_all()
+            os.chdir(previous)
+
+
+class QueryCounter:
+    """Счетчик SQL-команд, выполненных через соединение"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.count = 0
+
+    def __enter__(self):
+        self.count = 0
+        self.conn.set_trace_callback(self._trace)
+        return self
+
+    def __exit__(self, *exc):
+        self.conn.set_trace_callback(None)
+
+    def _trace(self, statement):
+        self.count += 1
+
+
+def median_ms(fn, repeat=20):
+    """Медиана времени вызова fn() в миллисекундах"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def percentile(sorted_values, fraction):
+    """Перцентиль по отсортированному списку"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
@@ -0,0 +1,98 @@
+"""
+Нагрузочный тест рабочего запуска: задержки /repetitorstvo и /raspisanie
+
+Сервер запускается отдельно, например:
+
+    python wsgi.py                         (gunicorn, см. wsgi.py)
+    python bench/load_test.py --url http://127.0.0.1:5000 --users 100 --duration 30
+
+Каждый виртуальный пользователь держит свое соединение и по очереди
+запрашивает страницы. Вход выполняется один раз, cookie сессии общая
+для всех пользователей: /login ограничен по частоте попыток с одного
+адреса (limity.py). Выводятся p50/p95/p99, пропускная способность и
+число ошибок (ответов не 200).
+"""
+import argparse
+import http.client
+import threading
+import time
+import urllib.parse
+from http.cookies import SimpleCookie
+
+from common import percentile
+
+PAGES = ('/repetitorstvo', '/raspisanie')
+
+
+def login(url, username, password):
+    """Войти и вернуть заголовок Cookie"""
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    body = urllib.parse.urlencode({'username': username, 'password': password})
+    conn.request('POST', '/login', body=body,
+                 headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    cookie = SimpleCookie(response.getheader('Set-Cookie') or '')
+    if response.status != 302 or 'session' not in cookie:
+        raise SystemExit(f"❌ Не удалось войти как {username} (ответ {response.status})")
+    return f"session={cookie['session'].value}"
+
+
+def virtual_user(url, cookie, deadline, latencies, errors, offset):
+    """Запрашивать страницы по очереди до deadline"""
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    number = offset
+    while time.monotonic() < deadline:
+        page = PAGES[number % len(PAGES)]
+        number += 1
+        started = time.perf_counter()
+        try:
+            conn.request('GET', page, headers={'Cookie': cookie})
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors[page] += 1
+            conn.close()
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+            continue
+        latencies[page].append(time.perf_counter() - started)
+        if response.status != 200:
+            errors[page] += 1
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--users', type=int, default=100, help='одновременных пользователей')
+    parser.add_argument('--duration', type=float, default=30, help='длительность, секунд')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    args = parser.parse_args()
+
+    url = urllib.parse.urlsplit(args.url)
+    cookie = login(url, args.username, args.password)
+    latencies = {page: [] for page in PAGES}
+    errors = {page: 0 for page in PAGES}
+    deadline = time.monotonic() + args.duration
+    threads = [threading.Thread(target=virtual_user,
+                                args=(url, cookie, deadline, latencies, errors, number))
+               for number in range(args.users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"{args.url}: пользователей {args.users}, {args.duration:.0f} с")
+    print(f"{'Страница':<16}{'запросов':>10}{'в секунду':>11}{'p50, мс':>9}"
+          f"{'p95, мс':>9}{'p99, мс':>9}{'ошибок':>8}")
+    for page in PAGES:
+        values = sorted(latencies[page])
+        print(f"{page:<16}{len(values):>10}{len(values) / args.duration:>11.0f}"
+              f"{percentile(values, 0.50) * 1000:>9.1f}{percentile(values, 0.95) * 1000:>9.1f}"
+              f"{percentile(values, 0.99) * 1000:>9.1f}{errors[page]:>8}")
+
+
+if __name__ == '__main__':
+    main()
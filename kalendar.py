@@ -0,0 +1,91 @@
+"""
+Модуль для выгрузки календарей в формате iCalendar (RFC 5545)
+"""
+from datetime import datetime, timezone
+
+
+def ical_escape(text):
+    """Экранировать текстовое значение свойства"""
+    return (str(text).replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def ical_fold(line):
+    """Перенести строку длиннее 75 байт (UTF-8), не разрывая символы"""
+    if len(line.encode('utf-8')) <= 75:
+        return line
+    parts = []
+    current, size = '', 0
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        # Продолжение начинается с пробела, он тоже входит в 75 байт
+        if size + char_size > (75 if not parts else 74):
+            parts.append(current)
+            current, size = '', 0
+        current += char
+        size += char_size
+    parts.append(current)
+    return '\r\n '.join(parts)
+
+
+def format_ical_value(value):
+    """date -> 20241215, datetime -> 20241215T090000 (локальное время)"""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        return value.strftime('%Y%m%dT%H%M%S')
+    return value.strftime('%Y%m%d')
+
+
+def _join(lines):
+    return ''.join(ical_fold(line) + '\r\n' for line in lines)
+
+
+def render_event(event, stamp):
+    """Текст одного VEVENT (с переносами строк и завершающим CRLF).
+
+    Событие - словарь с ключами uid, summary, start, end (date для
+    событий на весь день, datetime для остальных) и необязательными
+    location, description, rrule. stamp - время изменения данных
+    (секунды), попадает в DTSTAMP.
+    """
+    stamp_value = format_ical_value(datetime.fromtimestamp(int(stamp), tz=timezone.utc))
+    all_day = not isinstance(event['start'], datetime)
+    value_type = ';VALUE=DATE' if all_day else ''
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:{event['uid']}",
+        f'DTSTAMP:{stamp_value}',
+        f"DTSTART{value_type}:{format_ical_value(event['start'])}",
+        f"DTEND{value_type}:{format_ical_value(event['end'])}",
+        f"SUMMARY:{ical_escape(event['summary'])}",
+    ]
+    if event.get('location'):
+        lines.append(f"LOCATION:{ical_escape(event['location'])}")
+    if event.get('description'):
+        lines.append(f"DESCRIPTION:{ical_escape(event['description'])}")
+    if event.get('rrule'):
+        lines.append(f"RRULE:{event['rrule']}")
+    lines.append('END:VEVENT')
+    return _join(lines)
+
+
+def assemble_calendar(name, rendered_events):
+    """Собрать календарь из уже отрисованных VEVENT (см. render_event)"""
+    header = _join([
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//University Management System//RU',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{ical_escape(name)}',
+    ])
+    return header + ''.join(rendered_events) + 'END:VCALENDAR\r\n'
+
+
+def build_calendar(name, events, stamp):
+    """Собрать календарь из событий.
+
+    stamp - время изменения данных, попадает в DTSTAMP, чтобы
+    одинаковые данные давали одинаковый файл.
+    """
+    return assemble_calendar(name, [render_event(event, stamp) for event in events])
@@ -0,0 +1,174 @@
+"""
+Модуль для ограничения частоты попыток входа
+
+Алгоритм "ведро с жетонами": у каждого ключа (IP-адреса или логина)
+есть ведро на capacity жетонов, которое пополняется со скоростью
+rate жетонов в секунду. Каждая попытка входа забирает жетон; пустое
+ведро - попытка отклоняется еще до обращения к базе пользователей.
+
+По умолчанию ведра хранятся в памяти процесса. Если задан
+LOGIN_LIMIT_DB, используется общий файл SQLite, и ограничения
+действуют на все процессы приложения.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+
+class TokenBucketLimiter:
+    """Ведра с жетонами в памяти процесса"""
+
+    def __init__(self, rate, capacity, sweep_interval=60):
+        self.rate = rate
+        self.capacity = capacity
+        self.sweep_interval = sweep_interval
+        self._buckets = {}  # ключ -> (жетонов осталось, время обновления)
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self.stats = {'allowed': 0, 'rejected': 0, 'evicted': 0}
+
+    def allow(self, key, now=None):
+        """Забрать жетон для ключа, вернуть (разрешено, через сколько секунд повторить)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(now)
+            tokens, updated = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                self.stats['rejected'] += 1
+                return False, (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1, now)
+            self.stats['allowed'] += 1
+            return True, 0.0
+
+    def _sweep(self, now):
+        """Удалить ведра, которые уже наполнились: они не отличаются от новых"""
+        full = [key for key, (tokens, updated) in self._buckets.items()
+                if tokens + (now - updated) * self.rate >= self.capacity]
+        for key in full:
+            del self._buckets[key]
+        self.stats['evicted'] += len(full)
+        self._last_sweep = now
+
+    def get_stats(self):
+        """Счетчики и число активных ведер"""
+        with self._lock:
+            return dict(self.stats, buckets=len(self._buckets))
+
+
+class SQLiteTokenBucketLimiter:
+    """Ведра с жетонами в файле SQLite, общие для нескольких процессов"""
+
+    def __init__(self, db_name, rate, capacity, sweep_interval=60):
+        self.db_name = db_name
+        self.rate = rate
+        self.capacity = capacity
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+        self._last_sweep = time.time()
+        self.stats = {'allowed': 0, 'rejected': 0, 'evicted': 0}
+        self._connection().execute('''
+        CREATE TABLE IF NOT EXISTS login_buckets (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL
+        ) WITHOUT ROWID
+        ''')
+
+    def _connection(self):
+        """Соединение текущего потока (открывается один раз)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_name, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def allow(self, key, now=None):
+        """Забрать жетон для ключа, вернуть (разрешено, через сколько секунд повторить)"""
+        now = time.time() if now is None else now
+        conn = self._connection()
+        # BEGIN IMMEDIATE сериализует пересчет ведра между процессами
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM login_buckets WHERE key = ?',
+                               (key,)).fetchone()
+            tokens, updated = row if row else (self.capacity, now)
+            tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+            allowed = tokens >= 1
+            conn.execute('''
+            INSERT OR REPLACE INTO login_buckets (key, tokens, updated) VALUES (?, ?, ?)
+            ''', (key, tokens - 1 if allowed else tokens, now))
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(conn, now)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        if not allowed:
+            self.stats['rejected'] += 1
+            return False, (1 - tokens) / self.rate
+        self.stats['allowed'] += 1
+        return True, 0.0
+
+    def _sweep(self, conn, now):
+        """Удалить наполнившиеся ведра"""
+        cursor = conn.execute('''
+        DELETE FROM login_buckets WHERE tokens + (? - updated) * ? >= ?
+        ''', (now, self.rate, self.capacity))
+        self.stats['evicted'] += cursor.rowcount
+        self._last_sweep = now
+
+    def get_stats(self):
+        """Счетчики и число ведер в общей таблице"""
+        buckets = self._connection().execute('SELECT COUNT(*) FROM login_buckets').fetchone()[0]
+        return dict(self.stats, buckets=buckets, db=self.db_name)
+
+
+class LoginLimiter:
+    """Ограничение попыток входа отдельно по IP-адресу и по логину.
+
+    По IP ограничивается перебор с одного адреса, по логину - подбор
+    пароля к одной учетной записи с разных адресов.
+    """
+
+    def __init__(self, ip_limiter, username_limiter):
+        self.ip_limiter = ip_limiter
+        self.username_limiter = username_limiter
+
+    def check(self, ip, username):
+        """Разрешена ли попытка входа; возвращает (разрешено, секунд до следующей попытки)"""
+        allowed, retry_after = self.ip_limiter.allow(f'ip:{ip}')
+        if not allowed:
+            return False, retry_after
+        if username:
+            return self.username_limiter.allow(f'user:{username.strip().lower()}')
+        return True, 0.0
+
+    def get_stats(self):
+        """Счетчики обоих ограничителей"""
+        return {'ip': self.ip_limiter.get_stats(), 'username': self.username_limiter.get_stats()}
+
+
+def create_login_limiter():
+    """Создать ограничитель входа по настройкам из переменных окружения.
+
+    LOGIN_LIMIT_IP и LOGIN_LIMIT_USER - попыток в минуту (по умолчанию
+    20 и 5, столько же допускается подряд), LOGIN_LIMIT_DB - путь к
+    общему файлу SQLite для нескольких процессов.
+    """
+    per_ip = int(os.environ.get('LOGIN_LIMIT_IP', 20))
+    per_user = int(os.environ.get('LOGIN_LIMIT_USER', 5))
+    db_name = os.environ.get('LOGIN_LIMIT_DB')
+
+    def make(per_minute):
+        if db_name:
+            return SQLiteTokenBucketLimiter(db_name, rate=per_minute / 60, capacity=per_minute)
+        return TokenBucketLimiter(rate=per_minute / 60, capacity=per_minute)
+
+    return LoginLimiter(make(per_ip), make(per_user))
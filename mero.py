@@ -1,75 +1,379 @@
 """
 Модуль для работы с мероприятиями
+
+Мероприятия хранятся в таблице events базы university.db, id
+выдает SQLite (AUTOINCREMENT, номера не повторяются после удаления).
+Каждый процесс держит копию мероприятий в памяти, отсортированную по
+дате начала: выборки "с X по Y", "ближайшие N" и "на этой неделе"
+находят границы двоичным поиском (bisect).
+
+Копия сверяется с версией в таблице data_versions (ее увеличивают
+триггеры на events) не чаще раза в EVENTS_VERSION_CHECK секунд и
+перечитывается, только если версия изменилась - так изменения,
+сделанные в одном процессе, видны во всех остальных.
+
+Лента iCalendar собирается из VEVENT, отрисованных по одному: при
+изменении мероприятий перерисовываются только новые и измененные,
+а готовая лента хранится до следующего изменения.
 """
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from kalendar import assemble_calendar, render_event
+
+DATE_FORMATS = ('%d.%m.%Y', '%Y-%m-%d')
+DEFAULT_EVENT_DURATION = timedelta(hours=2)
+EVENTS_VERSION_CHECK = float(os.environ.get('EVENTS_VERSION_CHECK', 2))
+
+# Мероприятия по умолчанию (заполняют таблицу events при миграции)
+DEFAULT_EVENTS = [
+    {
+        'title': 'День открытых дверей',
+        'date': '15.11.2023',
+        'time': '10:00',
+        'location': 'Актовый зал',
+        'description': 'Приглашаем абитуриентов и их родителей',
+        'organizer': 'Администрация',
+        'status': 'Запланировано'
+    },
+    {
+        'title': 'Студенческая конференция',
+        'date': '20.11.2023',
+        'time': '14:00',
+        'location': 'Аудитория 301',
+        'description': 'Доклады студентов по научным работам',
+        'organizer': 'Научный отдел',
+        'status': 'Подготовка'
+    },
+    {
+        'title': 'Спортивные соревнования',
+        'date': '25.11.2023',
+        'time': '09:00',
+        'location': 'Спортзал',
+        'description': 'Соревнования между группами',
+        'organizer': 'Кафедра физкультуры',
+        'status': 'Запланировано'
+    },
+    {
+        'title': 'Новогодний вечер',
+        'date': '28.12.2023',
+        'time': '18:00',
+        'location': 'Актовый зал',
+        'description': 'Новогодний концерт и дискотека',
+        'organizer': 'Студенческий совет',
+        'status': 'Планируется'
+    }
+]
+
+
+def parse_event_start(date_text, time_text=None):
+    """'15.11.2023' (или '2023-11-15') и '10:00' -> datetime; ValueError при ошибке"""
+    for fmt in DATE_FORMATS:
+        try:
+            day = datetime.strptime(date_text.strip(), fmt)
+            break
+        except (AttributeError, ValueError):
+            continue
+    else:
+        raise ValueError(f"Неверная дата мероприятия: {date_text!r}")
+    if time_text:
+        try:
+            hours, minutes = (int(part) for part in time_text.strip().split(':'))
+            return day.replace(hour=hours, minute=minutes)
+        except ValueError:
+            raise ValueError(f"Неверное время мероприятия: {time_text!r}") from None
+    return day
+
+
+def as_datetime(value):
+    """date или datetime -> datetime (date - начало дня)"""
+    if isinstance(value, datetime):
+        return value
+    return datetime(value.year, value.month, value.day)
+
+
+def make_event_row(event):
+    """Проверить мероприятие и подготовить строку для таблицы events"""
+    if not event.get('title'):
+        raise ValueError("Не указано название мероприятия")
+    start = parse_event_start(event.get('date'), event.get('time'))
+    return (event['title'], event['date'], event.get('time') or '',
+            start.isoformat(sep=' ', timespec='minutes'), event.get('location') or '',
+            event.get('description') or '', event.get('organizer') or '', event.get('status') or '')
+
+
+def insert_events(conn, events):
+    """Массовая вставка мероприятий (транзакцией управляет вызывающий)"""
+    conn.executemany('''
+    INSERT INTO events (title, date, time, starts_at, location, description, organizer, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [make_event_row(event) for event in events])
 
 
 class EventsModule:
-    def __init__(self):
-        self.events = []
+    def __init__(self, db_name='university.db', connection_factory=None,
+                 check_interval=EVENTS_VERSION_CHECK):
+        self.db_name = db_name
+        self.connection_factory = connection_factory
+        self.check_interval = check_interval
+        self.events = []      # мероприятия в порядке начала
+        self.starts = []      # начало каждого мероприятия (параллельно self.events)
+        self.by_id = {}       # id -> мероприятие
+        self.version = None   # (версия, время изменения) из data_versions
+        self.revision = 0     # растет при каждой перезагрузке копии
+        self.stats = {'checks': 0, 'reloads': 0}
+        self._stamps = {}     # id -> время изменения мероприятия (для DTSTAMP)
+        self._rendered = {}   # (id, время изменения, поля) -> VEVENT
+        self._feed = None     # (ревизия и название, готовая лента)
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+        self._lock = threading.RLock()
         self.load_events()
 
+    @contextmanager
+    def connection(self):
+        """Соединение с БД (из connection_factory или собственное)"""
+        if self.connection_factory is not None:
+            yield self.connection_factory()
+            return
+        conn = sqlite3.connect(self.db_name)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _read_version(conn):
+        row = conn.execute("SELECT version, modified_at FROM data_versions WHERE name = 'events'").fetchone()
+        return tuple(row) if row else None
+
     def load_events(self):
-        """Загрузить мероприятия"""
-        self.events = [
-            {
-                'id': 1,
-                'title': 'День открытых дверей',
-                'date': '15.11.2023',
-                'time': '10:00',
-                'location': 'Актовый зал',
-                'description': 'Приглашаем абитуриентов и их родителей',
-                'organizer': 'Администрация',
-                'status': 'Запланировано'
-            },
-            {
-                'id': 2,
-                'title': 'Студенческая конференция',
-                'date': '20.11.2023',
-                'time': '14:00',
-                'location': 'Аудитория 301',
-                'description': 'Доклады студентов по научным работам',
-                'organizer': 'Научный отдел',
-                'status': 'Подготовка'
-            },
-            {
-                'id': 3,
-                'title': 'Спортивные соревнования',
-                'date': '25.11.2023',
-                'time': '09:00',
-                'location': 'Спортзал',
-                'description': 'Соревнования между группами',
-                'organizer': 'Кафедра физкультуры',
-                'status': 'Запланировано'
-            },
-            {
-                'id': 4,
-                'title': 'Новогодний вечер',
-                'date': '28.12.2023',
-                'time': '18:00',
-                'location': 'Актовый зал',
-                'description': 'Новогодний концерт и дискотека',
-                'organizer': 'Студенческий совет',
-                'status': 'Планируется'
-            }
-        ]
+        """Загрузить мероприятия из БД (или по умолчанию, если таблицы еще нет)"""
+        try:
+            with self.connection() as conn:
+                version = self._read_version(conn)
+                rows = conn.execute('''
+                SELECT id, title, date, time, starts_at, location, description, organizer, status,
+                       updated_at
+                FROM events ORDER BY starts_at, id
+                ''').fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"⚠️  Мероприятия из БД недоступны ({e}), используются данные по умолчанию")
+            events = [dict(event, id=number) for number, event in enumerate(DEFAULT_EVENTS, 1)]
+            self.set_events(events)
+            return
+
+        events, stamps, starts = [], {}, {}
+        for row in rows:
+            event = dict(row)
+            stamps[event['id']] = event.pop('updated_at')
+            starts[event['id']] = event.pop('starts_at')
+            events.append(event)
+        self.set_events(events, version, stamps, starts)
+
+    def set_events(self, events, version=None, stamps=None, starts=None):
+        """Заменить копию мероприятий (начала разбираются и сортируются один раз).
+
+        starts - id -> starts_at из таблицы events; без него начало
+        берется из полей date и time. Мероприятие, начало которого не
+        разобрать (например, записанное в БД напрямую), пропускается с
+        предупреждением, чтобы не ломать страницы и ленту iCalendar.
+        """
+        parsed = []
+        for event in events:
+            try:
+                if starts and event['id'] in starts:
+                    start = datetime.fromisoformat(starts[event['id']])
+                else:
+                    start = parse_event_start(event['date'], event.get('time'))
+            except (TypeError, ValueError) as e:
+                print(f"⚠️  Мероприятие {event['id']} пропущено: {e}")
+                continue
+            parsed.append((start, event['id'], event))
+        parsed.sort(key=lambda item: item[:2])
+        now = time.time()
+        with self._lock:
+            self.starts = [start for start, _, _ in parsed]
+            self.events = [event for _, _, event in parsed]
+            self.by_id = {event['id']: event for event in self.events}
+            self._stamps = {event_id: (stamps or {}).get(event_id, now) for event_id in self.by_id}
+            # Отрисованные VEVENT неизменившихся мероприятий остаются в кэше
+            keys = {self._render_key(event) for event in self.events}
+            self._rendered = {key: text for key, text in self._rendered.items() if key in keys}
+            self.version = version
+            self.revision += 1
+            self._feed = None
+            self._loaded_at = now
+            self._checked_at = time.monotonic()
+            self.stats['reloads'] += 1
+
+    def _refresh(self):
+        """Перечитать мероприятия, если версия в БД изменилась (проверка не чаще check_interval)"""
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return
+            self.stats['checks'] += 1
+            try:
+                with self.connection() as conn:
+                    version = self._read_version(conn)
+            except sqlite3.OperationalError:
+                version = None
+            if version != self.version:
+                self.load_events()
+            else:
+                self._checked_at = time.monotonic()
+
+    def _expire(self):
+        """Сверить версию при следующем обращении"""
+        self._checked_at = 0.0
+
+    def get_version(self):
+        """(версия, время изменения) мероприятий - для ETag и кэша страниц"""
+        self._refresh()
+        return self.version or (1, self._loaded_at)
 
     def get_events(self):
-        """Получить все мероприятия"""
+        """Получить все мероприятия (по дате начала)"""
+        self._refresh()
         return self.events
 
     def get_event_by_id(self, event_id):
         """Получить мероприятие по ID"""
-        for event in self.events:
-            if event['id'] == event_id:
-                return event
-        return None
+        self._refresh()
+        return self.by_id.get(event_id)
 
     def add_event(self, event_data):
-        """Добавить новое мероприятие"""
-        event_data['id'] = len(self.events) + 1
-        self.events.append(event_data)
+        """Добавить новое мероприятие; False, если данные неверны или БД недоступна"""
+        try:
+            row = make_event_row(event_data)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return False
+        try:
+            with self.connection() as conn:
+                cursor = conn.execute('''
+                INSERT INTO events (title, date, time, starts_at, location, description, organizer, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', row)
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка добавления мероприятия: {e}")
+            return False
+        event_data['id'] = cursor.lastrowid
+        self._expire()
         return True
 
-    def get_upcoming_events(self):
-        """Получить предстоящие мероприятия"""
-        return [e for e in self.events if e['status'] in ['Запланировано', 'Подготовка', 'Планируется']]
\ No newline at end of file
+    def remove_event(self, event_id):
+        """Удалить мероприятие; False, если его нет"""
+        try:
+            with self.connection() as conn:
+                deleted = conn.execute('DELETE FROM events WHERE id = ?', (event_id,)).rowcount
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка удаления мероприятия: {e}")
+            return False
+        self._expire()
+        return deleted > 0
+
+    # ==================== ВЫБОРКИ ПО ДАТАМ ====================
+
+    def get_events_between(self, start, end):
+        """Мероприятия, начинающиеся в [start, end); даты - date или datetime"""
+        self._refresh()
+        with self._lock:
+            low = bisect_left(self.starts, as_datetime(start))
+            high = bisect_left(self.starts, as_datetime(end), low)
+            return self.events[low:high]
+
+    def get_upcoming_events(self, now=None, limit=None):
+        """Получить предстоящие мероприятия (ближайшие limit, если задан)"""
+        now = now or datetime.now()
+        self._refresh()
+        with self._lock:
+            low = bisect_left(self.starts, as_datetime(now))
+            high = len(self.events) if limit is None else low + max(limit, 0)
+            return self.events[low:high]
+
+    def get_week_events(self, day=None):
+        """Мероприятия недели (с понедельника), в которую входит day"""
+        day = day or date.today()
+        if isinstance(day, datetime):
+            day = day.date()
+        week_start = day - timedelta(days=day.weekday())
+        return self.get_events_between(week_start, week_start + timedelta(days=7))
+
+    # ==================== ЛЕНТА ICALENDAR ====================
+
+    def _render_key(self, event):
+        return event['id'], self._stamps[event['id']], tuple(event.items())
+
+    def get_ical_feed(self, name='Мероприятия'):
+        """Лента iCalendar со всеми мероприятиями.
+
+        Каждое VEVENT отрисовывается один раз; DTSTAMP - время
+        изменения мероприятия в БД. Готовая лента переиспользуется,
+        пока мероприятия не изменятся.
+        """
+        self._refresh()
+        with self._lock:
+            if self._feed is not None and self._feed[0] == (self.revision, name):
+                return self._feed[1]
+            rendered = []
+            for start, event in zip(self.starts, self.events):
+                key = self._render_key(event)
+                text = self._rendered.get(key)
+                if text is None:
+                    text = self._rendered[key] = render_event({
+                        'uid': f"event-{event['id']}@university",
+                        'summary': event['title'],
+                        'start': start,
+                        'end': start + DEFAULT_EVENT_DURATION,
+                        'location': event.get('location'),
+                        'description': event.get('description'),
+                    }, self._stamps[event['id']])
+                rendered.append(text)
+            feed = assemble_calendar(name, rendered)
+            self._feed = ((self.revision, name), feed)
+            return feed
+
+
+# ==================== ЗАМЕР ПРОИЗВОДИТЕЛЬНОСТИ ====================
+
+def benchmark(count=100000, queries=1000):
+    """Сравнить выборку по датам перебором и двоичным поиском"""
+    import random
+
+    rng = random.Random(1)
+    first = datetime(2020, 1, 1)
+    # Без таблицы events модуль работает с копией в памяти
+    module = EventsModule(db_name=':memory:', check_interval=float('inf'))
+    module.set_events([{
+        'id': i, 'title': f'Мероприятие {i}',
+        'date': (first + timedelta(days=rng.randrange(3650))).strftime('%d.%m.%Y'),
+        'time': f'{rng.randrange(8, 20)}:00'
+    } for i in range(1, count + 1)])
+    days = [first + timedelta(days=rng.randrange(3650)) for _ in range(queries)]
+
+    started = time.perf_counter()
+    for day in days:
+        [e for e, start in zip(module.events, module.starts) if day <= start < day + timedelta(days=7)]
+    scan_ms = (time.perf_counter() - started) / queries * 1000
+
+    started = time.perf_counter()
+    for day in days:
+        module.get_week_events(day)
+    index_ms = (time.perf_counter() - started) / queries * 1000
+    return scan_ms, index_ms
+
+
+if __name__ == '__main__':
+    scan_ms, index_ms = benchmark()
+    print(f"Мероприятия недели среди 100000: перебор {scan_ms:.3f} мс, двоичный поиск {index_ms:.4f} мс")
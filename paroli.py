@@ -0,0 +1,174 @@
+"""
+Модуль для хэширования и проверки паролей
+
+Общий для app.py и vxod.py. Новые пароли хэшируются scrypt (или
+PBKDF2-HMAC-SHA256), параметры задаются переменными окружения.
+Старые форматы (открытый текст и sha256$соль$хэш из vxod.py)
+проверяются как раньше и помечаются для перехэширования при входе.
+
+Хэширование выполняется в ограниченном пуле потоков: одновременно
+считается не больше PASSWORD_HASH_WORKERS хэшей, а если очередь
+заполнена, вызов завершается ошибкой PasswordHashBusy, а не
+занимает поток Flask неограниченно долго.
+
+Запуск `python paroli.py` измеряет число входов в секунду для
+разных настроек стоимости.
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Текущий алгоритм и его параметры
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+SCRYPT_N = int(os.environ.get('SCRYPT_N', 2 ** 14))
+SCRYPT_R = int(os.environ.get('SCRYPT_R', 8))
+SCRYPT_P = int(os.environ.get('SCRYPT_P', 1))
+PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', 600000))
+
+# Ограничения пула хэширования
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 64))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+
+SALT_BYTES = 16
+
+
+class PasswordHashBusy(RuntimeError):
+    """Очередь на хэширование заполнена - сервер перегружен входами"""
+
+
+# ==================== АЛГОРИТМЫ ====================
+
+def current_params():
+    """Строка алгоритма и параметров, которой помечаются новые хэши"""
+    if PASSWORD_HASH_METHOD == 'pbkdf2':
+        return f'pbkdf2:sha256:{PBKDF2_ITERATIONS}'
+    return f'scrypt:{SCRYPT_N}:{SCRYPT_R}:{SCRYPT_P}'
+
+
+def _derive(params, password, salt):
+    """Посчитать ключ по строке параметров вида 'scrypt:n:r:p' или 'pbkdf2:sha256:итерации'"""
+    parts = params.split(':')
+    if parts[0] == 'scrypt' and len(parts) == 4:
+        n, r, p = (int(value) for value in parts[1:])
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                              maxmem=2 * 128 * n * r * p, dklen=32)
+    if parts[0] == 'pbkdf2' and len(parts) == 3:
+        return hashlib.pbkdf2_hmac(parts[1], password.encode('utf-8'), salt, int(parts[2]))
+    raise ValueError(f"Неизвестный алгоритм хэширования: {params!r}")
+
+
+def _hash_password(password, params=None):
+    """Хэш пароля в формате 'параметры$соль$хэш' (соль и хэш в hex)"""
+    params = params or current_params()
+    salt = secrets.token_bytes(SALT_BYTES)
+    return f'{params}${salt.hex()}${_derive(params, password, salt).hex()}'
+
+
+def _verify_password(stored, password):
+    """Проверить пароль, вернуть (совпал, нужно перехэшировать)"""
+    if not stored or password is None:
+        return False, False
+    parts = stored.split('$')
+
+    if len(parts) == 3 and parts[0].startswith(('scrypt:', 'pbkdf2:')):
+        params, salt, expected = parts
+        try:
+            actual = _derive(params, password, bytes.fromhex(salt)).hex()
+        except ValueError:
+            return False, False
+        ok = hmac.compare_digest(actual, expected)
+        return ok, ok and params != current_params()
+
+    if len(parts) == 3 and parts[0] == 'sha256':
+        # Старый формат vxod.py: один проход SHA-256 по паролю с солью
+        _, salt, expected = parts
+        actual = hashlib.sha256((password + salt).encode()).hexdigest()
+        ok = hmac.compare_digest(actual, expected)
+        return ok, ok
+
+    # Пароль, сохраненный открытым текстом
+    ok = hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8'))
+    return ok, ok
+
+
+# ==================== ПУЛ ХЭШИРОВАНИЯ ====================
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS,
+                               thread_name_prefix='password-hash')
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+
+
+def _reset_after_fork():
+    """Потоки пула не переживают fork - в дочернем процессе пул создается заново"""
+    global _executor, _slots
+    _executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS,
+                                   thread_name_prefix='password-hash')
+    _slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _run(fn, *args):
+    """Выполнить fn в пуле хэширования и дождаться результата"""
+    if not _slots.acquire(timeout=PASSWORD_HASH_TIMEOUT):
+        raise PasswordHashBusy("Слишком много одновременных входов, попробуйте позже")
+    try:
+        future = _executor.submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future.result()
+
+
+def hash_password(password):
+    """Захэшировать пароль текущим алгоритмом"""
+    return _run(_hash_password, password)
+
+
+def hash_passwords(passwords):
+    """Захэшировать несколько паролей параллельно (для массового импорта)"""
+    futures = []
+    for password in passwords:
+        if not _slots.acquire(timeout=PASSWORD_HASH_TIMEOUT):
+            raise PasswordHashBusy("Слишком много одновременных входов, попробуйте позже")
+        future = _executor.submit(_hash_password, password)
+        future.add_done_callback(lambda _: _slots.release())
+        futures.append(future)
+    return [future.result() for future in futures]
+
+
+def verify_password(stored, password):
+    """Проверить пароль, вернуть (совпал, нужно перехэшировать)"""
+    return _run(_verify_password, stored, password)
+
+
+# ==================== ЗАМЕР ПРОИЗВОДИТЕЛЬНОСТИ ====================
+
+def benchmark(settings=None, logins=64, threads=PASSWORD_HASH_WORKERS):
+    """Замерить число проверок пароля в секунду для настроек стоимости"""
+    settings = settings or ['scrypt:4096:8:1', 'scrypt:16384:8:1', 'scrypt:32768:8:1',
+                            'pbkdf2:sha256:100000', 'pbkdf2:sha256:300000', 'pbkdf2:sha256:600000']
+    results = []
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for params in settings:
+            stored = _hash_password('benchmark-password', params)
+            started = time.perf_counter()
+            list(pool.map(lambda _: _verify_password(stored, 'benchmark-password'), range(logins)))
+            elapsed = time.perf_counter() - started
+            results.append((params, logins / elapsed, elapsed / logins * threads * 1000))
+    return results
+
+
+if __name__ == '__main__':
+    print(f"Текущая настройка: {current_params()}, потоков: {PASSWORD_HASH_WORKERS}")
+    print(f"{'Настройка':<24}{'входов/с':>12}{'мс на вход':>14}")
+    for params, per_second, ms in benchmark():
+        print(f"{params:<24}{per_second:>12.1f}{ms:>14.1f}")
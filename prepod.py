@@ -1,12 +1,47 @@
 """
 Модуль для работы со списком преподавателей
 """
+import heapq
+import re
+import time
+from bisect import bisect_left, insort
+
+# Вес поля при ранжировании результатов поиска
+FIELD_WEIGHTS = {'name': 3, 'subjects': 2, 'department': 1}
+
+# Вес типа совпадения: слово целиком, начало слова, середина слова
+MATCH_EXACT, MATCH_PREFIX, MATCH_INFIX = 3, 2, 1
+
+WORD_RE = re.compile(r'\w+')
+
+
+def fold_text(text):
+    """Привести текст к виду для поиска: регистр не важен, ё = е"""
+    return text.casefold().replace('ё', 'е')
+
+
+def tokenize(text):
+    """Слова текста в виде для поиска"""
+    return WORD_RE.findall(fold_text(text))
+
+
+def trigrams(word):
+    """Множество триграмм слова"""
+    return {word[i:i + 3] for i in range(len(word) - 2)}
 
 
 class TeachersModule:
     def __init__(self):
         self.teachers = []
+        self.by_id = {}
+        self.postings = {}     # слово -> {id преподавателя: вес поля}
+        self.words = []        # отсортированные слова (для поиска по началу)
+        self.word_trigrams = {}  # триграмма -> множество слов (для поиска в середине)
+        self.by_department = {}  # кафедра -> множество id преподавателей
+        self.by_subject = {}     # предмет -> множество id преподавателей
+        self.version = (0, time.time())  # (ревизия, время изменения) - ключ кэша страниц
         self.load_teachers()
+        self.build_search_index()
 
     def load_teachers(self):
         """Загрузить данные преподавателей"""
@@ -107,33 +142,245 @@ class TeachersModule:
 
     def get_teacher_by_id(self, teacher_id):
         """Получить преподавателя по ID"""
-        for teacher in self.teachers:
-            if teacher['id'] == teacher_id:
-                return teacher
-        return None
+        return self.by_id.get(teacher_id)
 
     def get_teachers_by_department(self, department):
         """Получить преподавателей по кафедре"""
-        return [t for t in self.teachers if t['department'] == department]
+        return self._teachers_by_ids(self.by_department.get(department, ()))
 
     def get_teachers_by_subject(self, subject):
         """Получить преподавателей по предмету"""
-        return [t for t in self.teachers if subject in t['subjects']]
+        return self._teachers_by_ids(self.by_subject.get(subject, ()))
 
     def get_departments(self):
         """Получить список кафедр"""
-        departments = set()
+        return sorted(self.by_department)
+
+    def get_subjects(self):
+        """Получить список предметов"""
+        return sorted(self.by_subject)
+
+    def get_facets(self):
+        """Кафедры и предметы с числом преподавателей: {'departments': [(название, число)], ...}"""
+        return {
+            'departments': [(name, len(ids)) for name, ids in sorted(self.by_department.items())],
+            'subjects': [(name, len(ids)) for name, ids in sorted(self.by_subject.items())]
+        }
+
+    def filter_teachers(self, department=None, subject=None, query=None):
+        """Преподаватели, подходящие под все заданные условия.
+
+        Кафедра и предмет отбираются пересечением множеств id; при
+        заданном query сохраняется порядок по релевантности поиска.
+        """
+        ids = None
+        for index, value in ((self.by_department, department), (self.by_subject, subject)):
+            if value:
+                facet_ids = index.get(value, set())
+                ids = facet_ids if ids is None else ids & facet_ids
+        if query:
+            found = self.search_teachers(query)
+            return found if ids is None else [t for t in found if t['id'] in ids]
+        return self.teachers if ids is None else self._teachers_by_ids(ids)
+
+    def _teachers_by_ids(self, ids):
+        """Преподаватели по множеству id (в порядке id)"""
+        return [self.by_id[teacher_id] for teacher_id in sorted(ids)]
+
+    def add_teacher(self, teacher):
+        """Добавить преподавателя и обновить индексы (id назначается, если не задан)"""
+        teacher = dict(teacher)
+        teacher.setdefault('id', max(self.by_id, default=0) + 1)
+        if teacher['id'] in self.by_id:
+            raise ValueError(f"Преподаватель с id {teacher['id']} уже есть")
+        self.teachers.append(teacher)
+        self._index_teacher(teacher)
+        self._bump_version()
+        return teacher
+
+    def remove_teacher(self, teacher_id):
+        """Удалить преподавателя и обновить индексы; False, если его нет"""
+        teacher = self.by_id.get(teacher_id)
+        if teacher is None:
+            return False
+        self.teachers.remove(teacher)
+        self._unindex_teacher(teacher)
+        self._bump_version()
+        return True
+
+    def _bump_version(self):
+        self.version = (self.version[0] + 1, time.time())
+
+    def get_version(self):
+        """(ревизия, время изменения) списка преподавателей - для ETag и кэша страниц"""
+        return self.version
+
+    def build_search_index(self):
+        """Построить поисковый индекс и фасеты по ФИО, кафедре и предметам.
+
+        Вызывается после загрузки self.teachers; отдельные изменения
+        учитываются в add_teacher и remove_teacher без перестройки.
+        """
+        self.by_id = {}
+        self.postings = {}
+        self.words = []
+        self.word_trigrams = {}
+        self.by_department = {}
+        self.by_subject = {}
         for teacher in self.teachers:
-            departments.add(teacher['department'])
-        return list(departments)
+            self._index_teacher(teacher, keep_sorted=False)
+        self.words = sorted(self.postings)
+        self._bump_version()
+
+    @staticmethod
+    def _teacher_words(teacher):
+        """Слова преподавателя с наибольшим весом поля, где они встречаются"""
+        fields = [('name', teacher['name']), ('department', teacher['department'])]
+        fields += [('subjects', subject) for subject in teacher['subjects']]
+        words = {}
+        for field, text in fields:
+            weight = FIELD_WEIGHTS[field]
+            for word in tokenize(text):
+                if words.get(word, 0) < weight:
+                    words[word] = weight
+        return words
+
+    def _index_teacher(self, teacher, keep_sorted=True):
+        """Добавить преподавателя в поисковый индекс и фасеты"""
+        teacher_id = teacher['id']
+        self.by_id[teacher_id] = teacher
+        self.by_department.setdefault(teacher['department'], set()).add(teacher_id)
+        for subject in teacher['subjects']:
+            self.by_subject.setdefault(subject, set()).add(teacher_id)
+
+        for word, weight in self._teacher_words(teacher).items():
+            ids = self.postings.get(word)
+            if ids is None:
+                ids = self.postings[word] = {}
+                if keep_sorted:
+                    insort(self.words, word)
+                for trigram in trigrams(word):
+                    self.word_trigrams.setdefault(trigram, set()).add(word)
+            ids[teacher_id] = weight
+
+    def _unindex_teacher(self, teacher):
+        """Убрать преподавателя из поискового индекса и фасетов"""
+        teacher_id = teacher['id']
+        del self.by_id[teacher_id]
+        for index, keys in ((self.by_department, [teacher['department']]),
+                            (self.by_subject, teacher['subjects'])):
+            for key in keys:
+                ids = index.get(key)
+                if ids is not None:
+                    ids.discard(teacher_id)
+                    if not ids:
+                        del index[key]
+
+        for word in self._teacher_words(teacher):
+            ids = self.postings.get(word)
+            if ids is None:
+                continue
+            ids.pop(teacher_id, None)
+            if not ids:
+                del self.postings[word]
+                del self.words[bisect_left(self.words, word)]
+                for trigram in trigrams(word):
+                    words = self.word_trigrams[trigram]
+                    words.discard(word)
+                    if not words:
+                        del self.word_trigrams[trigram]
+
+    def _match_word(self, query_word):
+        """Слова индекса, подходящие под слово запроса: {слово: тип совпадения}"""
+        matches = {}
+        # Начало слова: диапазон в отсортированном списке (без копирования хвоста)
+        words = self.words
+        index = bisect_left(words, query_word)
+        while index < len(words) and words[index].startswith(query_word):
+            matches[words[index]] = MATCH_EXACT if words[index] == query_word else MATCH_PREFIX
+            index += 1
+
+        # Середина слова: пересечение множеств по триграммам
+        query_trigrams = trigrams(query_word)
+        if query_trigrams:
+            candidates = sorted((self.word_trigrams.get(t, set()) for t in query_trigrams), key=len)
+            for word in set.intersection(*candidates):
+                if word not in matches and query_word in word:
+                    matches[word] = MATCH_INFIX
+        return matches
+
+    def search_teachers(self, query, limit=None):
+        """Поиск преподавателей по ФИО, кафедре и предметам.
+
+        Каждое слово запроса должно встретиться у преподавателя (целиком,
+        началом или серединой слова). Результаты упорядочены по
+        релевантности: совпадения в ФИО важнее предметов, предметы
+        важнее кафедры, слово целиком важнее его части.
+        """
+        query_words = tokenize(query)
+        if not query_words:
+            return self.teachers[:limit] if limit else self.teachers
 
-    def search_teachers(self, query):
-        """Поиск преподавателей"""
+        scores = None
+        for query_word in query_words:
+            word_scores = {}
+            for word, match in self._match_word(query_word).items():
+                for teacher_id, weight in self.postings[word].items():
+                    score = weight * match
+                    if word_scores.get(teacher_id, 0) < score:
+                        word_scores[teacher_id] = score
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {teacher_id: score + word_scores[teacher_id]
+                          for teacher_id, score in scores.items() if teacher_id in word_scores}
+            if not scores:
+                return []
+
+        def rank(teacher_id):
+            return -scores[teacher_id], self.by_id[teacher_id]['name']
+
+        if limit:
+            ranked = heapq.nsmallest(limit, scores, key=rank)
+        else:
+            ranked = sorted(scores, key=rank)
+        return [self.by_id[teacher_id] for teacher_id in ranked]
+
+
+# ==================== ЗАМЕР ПРОИЗВОДИТЕЛЬНОСТИ ====================
+
+def benchmark(count=5000, queries=('петр', 'программ', 'базы данных', 'иван серг', 'ммир', 'ё')):
+    """Сравнить поиск по индексу с прежним перебором на count преподавателях"""
+    module = TeachersModule()
+    base = module.teachers
+    module.teachers = [dict(teacher, id=i, name=f"{teacher['name']} {i}")
+                       for i, teacher in ((i, base[i % len(base)]) for i in range(count))]
+    started = time.perf_counter()
+    module.build_search_index()
+    build_ms = (time.perf_counter() - started) * 1000
+
+    def scan(query):
+        # Прежняя реализация search_teachers
         query = query.lower()
-        results = []
-        for teacher in self.teachers:
-            if (query in teacher['name'].lower() or
-                    query in teacher['department'].lower() or
-                    any(query in subject.lower() for subject in teacher['subjects'])):
-                results.append(teacher)
-        return results
\ No newline at end of file
+        return [t for t in module.teachers
+                if query in t['name'].lower() or query in t['department'].lower()
+                or any(query in subject.lower() for subject in t['subjects'])]
+
+    rows = []
+    for query in queries:
+        timings = []
+        for search in (scan, module.search_teachers):
+            started = time.perf_counter()
+            for _ in range(20):
+                found = search(query)
+            timings.append(((time.perf_counter() - started) / 20 * 1000, len(found)))
+        rows.append((query, timings[0], timings[1]))
+    return build_ms, rows
+
+
+if __name__ == '__main__':
+    build_ms, rows = benchmark()
+    print(f"Построение индекса: {build_ms:.1f} мс")
+    print(f"{'Запрос':<14}{'перебор, мс':>14}{'найдено':>9}{'индекс, мс':>13}{'найдено':>9}")
+    for query, (scan_ms, scan_found), (index_ms, index_found) in rows:
+        print(f"{query:<14}{scan_ms:>14.3f}{scan_found:>9}{index_ms:>13.3f}{index_found:>9}")
\ No newline at end of file
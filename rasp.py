@@ -1,101 +1,651 @@
 """
 Модуль для работы с расписанием
+
+Каждый процесс держит расписание в памяти вместе с индексами по
+преподавателям, аудиториям и времени. Копия сверяется с версией
+'schedule' в таблице data_versions (ее увеличивают триггеры на lessons
+и exams) не чаще раза в SCHEDULE_VERSION_CHECK секунд, поэтому импорт
+расписания в одном процессе виден во всех остальных.
 """
+import csv
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import groupby
+
+# Условные преподаватели: у каждой группы свой куратор, поэтому
+# одновременные занятия с ними конфликтом не считаются
+SHARED_TEACHERS = {'Куратор', 'Комиссия'}
+
+SCHEDULE_VERSION_CHECK = float(os.environ.get('SCHEDULE_VERSION_CHECK', 2))
+
+# Порядок дней недели для сортировки занятий
+DAY_ORDER = {
+    'Понедельник': 1, 'Вторник': 2, 'Среда': 3, 'Четверг': 4,
+    'Пятница': 5, 'Суббота': 6, 'Воскресенье': 7
+}
+
+# Расписание по умолчанию (загружается в пустую БД)
+DEFAULT_SCHEDULE = {
+    1: {  # 1 курс
+        'Понедельник': [
+            {'time': '09:00-10:30', 'subject': 'Математика', 'teacher': 'Петрова М.И.', 'room': '301'},
+            {'time': '10:45-12:15', 'subject': 'Информатика', 'teacher': 'Иванов С.П.', 'room': '205'},
+            {'time': '13:00-14:30', 'subject': 'Физика', 'teacher': 'Сидоров А.В.', 'room': '410'},
+            {'time': '14:45-16:15', 'subject': 'История', 'teacher': 'Козлова Е.Н.', 'room': '105'}
+        ],
+        'Вторник': [
+            {'time': '09:00-10:30', 'subject': 'Иностранный язык', 'teacher': 'Смирнова О.Л.', 'room': '208'},
+            {'time': '10:45-12:15', 'subject': 'Физкультура', 'teacher': 'Николаев В.С.', 'room': 'Спортзал'},
+            {'time': '13:00-14:30', 'subject': 'Программирование', 'teacher': 'Иванов С.П.', 'room': '305'}
+        ],
+        'Среда': [
+            {'time': '09:00-10:30', 'subject': 'Математика', 'teacher': 'Петрова М.И.', 'room': '302'},
+            {'time': '10:45-12:15', 'subject': 'Основы алгоритмов', 'teacher': 'Кузнецов Д.Н.', 'room': '206'}
+        ],
+        'Четверг': [
+            {'time': '09:00-10:30', 'subject': 'Базы данных', 'teacher': 'Сидоров А.В.', 'room': '411'},
+            {'time': '10:45-12:15', 'subject': 'Веб-дизайн', 'teacher': 'Козлова Е.Н.', 'room': '306'}
+        ],
+        'Пятница': [
+            {'time': '09:00-10:30', 'subject': 'Физика', 'teacher': 'Сидоров А.В.', 'room': '410'},
+            {'time': '10:45-12:15', 'subject': 'Классный час', 'teacher': 'Куратор', 'room': '105'}
+        ]
+    },
+    2: {  # 2 курс
+        'Понедельник': [
+            {'time': '09:00-10:30', 'subject': 'Базы данных', 'teacher': 'Сидоров А.В.', 'room': '302'},
+            {'time': '10:45-12:15', 'subject': 'Алгоритмы', 'teacher': 'Кузнецов Д.Н.', 'room': '206'},
+            {'time': '13:00-14:30', 'subject': 'Веб-разработка', 'teacher': 'Козлова Е.Н.', 'room': '411'},
+            {'time': '14:45-16:15', 'subject': 'Иностранный язык', 'teacher': 'Смирнова О.Л.', 'room': '106'}
+        ],
+        'Вторник': [
+            {'time': '09:00-10:30', 'subject': 'Сети и коммуникации', 'teacher': 'Петров В.И.', 'room': '307'},
+            {'time': '10:45-12:15', 'subject': 'Операционные системы', 'teacher': 'Иванов С.П.', 'room': '205'}
+        ]
+    },
+    3: {  # 3 курс
+        'Понедельник': [
+            {'time': '09:00-10:30', 'subject': 'Мобильная разработка', 'teacher': 'Козлов Д.Н.', 'room': '303'},
+            {'time': '10:45-12:15', 'subject': 'Тестирование ПО', 'teacher': 'Петрова М.И.', 'room': '207'},
+            {'time': '13:00-14:30', 'subject': 'Сети и коммуникации', 'teacher': 'Петров В.И.', 'room': '412'},
+            {'time': '14:45-16:15', 'subject': 'Экономика', 'teacher': 'Сидорова А.С.', 'room': '107'}
+        ]
+    },
+    4: {  # 4 курс
+        'Понедельник': [
+            {'time': '09:00-10:30', 'subject': 'Дипломное проектирование', 'teacher': 'Иванов С.П.', 'room': '304'},
+            {'time': '10:45-12:15', 'subject': 'Проектный менеджмент', 'teacher': 'Козлова Е.Н.', 'room': '208'},
+            {'time': '13:00-14:30', 'subject': 'Карьера и трудоустройство', 'teacher': 'Николаева Т.В.', 'room': '413'},
+            {'time': '14:45-16:15', 'subject': 'Консультации', 'teacher': 'Куратор', 'room': '108'}
+        ]
+    }
+}
+
+# Экзамены по умолчанию (загружаются в пустую БД)
+DEFAULT_EXAMS = {
+    1: [
+        {'date': '25.12.2023', 'subject': 'Математика', 'teacher': 'Петрова М.И.', 'room': '301'},
+        {'date': '27.12.2023', 'subject': 'Информатика', 'teacher': 'Иванов С.П.', 'room': '205'},
+        {'date': '29.12.2023', 'subject': 'Физика', 'teacher': 'Сидоров А.В.', 'room': '410'}
+    ],
+    2: [
+        {'date': '26.12.2023', 'subject': 'Базы данных', 'teacher': 'Сидоров А.В.', 'room': '302'},
+        {'date': '28.12.2023', 'subject': 'Алгоритмы', 'teacher': 'Кузнецов Д.Н.', 'room': '206'}
+    ],
+    3: [
+        {'date': '22.12.2023', 'subject': 'Мобильная разработка', 'teacher': 'Козлов Д.Н.', 'room': '303'},
+        {'date': '24.12.2023', 'subject': 'Тестирование ПО', 'teacher': 'Петрова М.И.', 'room': '207'}
+    ],
+    4: [
+        {'date': '20.12.2023', 'subject': 'Защита диплома', 'teacher': 'Комиссия', 'room': 'Актовый зал'}
+    ]
+}
+
+
+@lru_cache(maxsize=None)
+def parse_time(value):
+    """'9:00' -> 540: минуты от полуночи; ValueError, если формат неверный"""
+    hours, minutes = value.strip().split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def parse_time_slot(time_slot):
+    """'09:00-10:30' -> (540, 630): начало и конец в минутах от полуночи"""
+    try:
+        start, end = time_slot.split('-')
+        start_min = parse_time(start)
+        end_min = parse_time(end)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Некорректное время занятия: {time_slot!r}")
+    if not 0 <= start_min < end_min <= 24 * 60:
+        raise ValueError(f"Некорректное время занятия: {time_slot!r}")
+    return start_min, end_min
+
+
+def find_overlaps(intervals):
+    """Все пары пересекающихся интервалов (start, end, данные).
+
+    Сканирующая прямая: интервалы сортируются по началу, активные
+    хранятся в куче по концу. O(n log n + k), где k - число пар.
+    """
+    overlaps = []
+    active = []  # (конец, порядковый номер, интервал)
+    for number, interval in enumerate(sorted(intervals, key=lambda i: i[0])):
+        start = interval[0]
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        for _, _, other in active:
+            overlaps.append((other, interval))
+        heapq.heappush(active, (interval[1], number, interval))
+    return overlaps
+
+
+def make_lesson_row(course, day, time, subject, teacher, room, group=None):
+    """Проверить занятие и подготовить строку для таблицы lessons"""
+    try:
+        course = int(course)
+    except (TypeError, ValueError):
+        raise ValueError(f"Некорректный курс: {course!r}")
+    if day not in DAY_ORDER:
+        raise ValueError(f"Некорректный день недели: {day!r}")
+    if not subject or not teacher or not room:
+        raise ValueError("Не указан предмет, преподаватель или аудитория")
+    start_min, _ = parse_time_slot(time)
+    return (course, group or None, day, DAY_ORDER[day], time, start_min, subject, teacher, room)
+
+
+def iter_default_lessons():
+    """Строки таблицы lessons из расписания по умолчанию"""
+    for course, days in DEFAULT_SCHEDULE.items():
+        for day, lessons in days.items():
+            for lesson in lessons:
+                yield make_lesson_row(course, day, lesson['time'], lesson['subject'],
+                                      lesson['teacher'], lesson['room'])
+
+
+def iter_default_exams():
+    """Строки таблицы exams из экзаменов по умолчанию"""
+    for course, exams in DEFAULT_EXAMS.items():
+        for exam in exams:
+            yield (course, exam['date'], exam['subject'], exam['teacher'], exam['room'])
+
+
+def iter_lessons_csv(csv_file):
+    """Прочитать занятия из CSV со столбцами course, group, day, time, subject, teacher, room.
+
+    Столбец group необязателен (пусто - занятие для всего курса).
+    Строки читаются по одной, файл целиком в память не загружается.
+    """
+    reader = csv.DictReader(csv_file)
+    for line_number, row in enumerate(reader, start=2):
+        values = {key: (value or '').strip() for key, value in row.items() if key}
+        try:
+            yield make_lesson_row(values.get('course'), values.get('day'), values.get('time'),
+                                  values.get('subject'), values.get('teacher'), values.get('room'),
+                                  values.get('group'))
+        except ValueError as e:
+            raise ValueError(f"строка {line_number}: {e}")
+
+
+def insert_lessons(conn, rows):
+    """Массовая вставка занятий (транзакцией управляет вызывающий)"""
+    conn.executemany('''
+    INSERT INTO lessons (course, group_name, day, day_order, time, start_min, subject, teacher, room)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+
+
+def insert_exams(conn, rows):
+    """Массовая вставка экзаменов (транзакцией управляет вызывающий)"""
+    conn.executemany('''
+    INSERT INTO exams (course, date, subject, teacher, room) VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+
+
+def materialize_timetables(conn):
+    """Пересобрать таблицу group_timetables из lessons и exams.
+
+    Для каждого курса сохраняется расписание курса целиком (group_name = '')
+    и по одному на каждую группу: общие занятия курса плюс занятия группы.
+    Расписание хранится компактным JSON (см. decode_timetable).
+    Транзакцией управляет вызывающий. Возвращает число расписаний.
+    """
+    lessons = {}
+    for row in conn.execute('''
+    SELECT course, group_name, day_order, start_min, day, time, subject, teacher, room
+    FROM lessons ORDER BY course, day_order, start_min, id
+    '''):
+        row = tuple(row)
+        lessons.setdefault(row[0], {}).setdefault(row[1] or '', []).append(row[2:])
+    exams = {}
+    for row in conn.execute('SELECT course, date, subject, teacher, room FROM exams ORDER BY id'):
+        row = tuple(row)
+        exams.setdefault(row[0], []).append(list(row[1:]))
+
+    rows = []
+    for course in sorted(set(lessons) | set(exams)):
+        groups = lessons.get(course, {})
+        common = groups.get('', [])
+        for group in sorted(set(groups) | {''}):
+            merged = common if group == '' else sorted(common + groups[group], key=lambda l: l[:2])
+            days = [[day, [list(lesson[3:]) for lesson in day_lessons]]
+                    for day, day_lessons in groupby(merged, key=lambda l: l[2])]
+            payload = {'days': days, 'exams': exams.get(course, [])}
+            rows.append((course, group, json.dumps(payload, ensure_ascii=False, separators=(',', ':'))))
+
+    conn.execute('DELETE FROM group_timetables')
+    conn.executemany('''
+    INSERT INTO group_timetables (course, group_name, payload) VALUES (?, ?, ?)
+    ''', rows)
+    return len(rows)
+
+
+def decode_timetable(payload):
+    """Компактный JSON из group_timetables -> days, schedule и exams"""
+    data = json.loads(payload)
+    return {
+        'days': [day for day, _ in data['days']],
+        'schedule': {
+            day: [{'time': time, 'subject': subject, 'teacher': teacher, 'room': room}
+                  for time, subject, teacher, room in lessons]
+            for day, lessons in data['days']
+        },
+        'exams': [{'date': exam_date, 'subject': subject, 'teacher': teacher, 'room': room}
+                  for exam_date, subject, teacher, room in data['exams']]
+    }
+
+
+def timetable_events(timetable, week_start, uid_prefix):
+    """События календаря для расписания из decode_timetable.
+
+    Занятия повторяются еженедельно начиная с недели week_start
+    (понедельник), экзамены - события на весь день.
+    """
+    events = []
+    for day in timetable['days']:
+        day_date = week_start + timedelta(days=DAY_ORDER[day] - 1)
+        for number, lesson in enumerate(timetable['schedule'][day]):
+            try:
+                start_min, end_min = parse_time_slot(lesson['time'])
+            except ValueError:
+                continue
+            day_start = datetime(day_date.year, day_date.month, day_date.day)
+            events.append({
+                'uid': f"{uid_prefix}-{DAY_ORDER[day]}-{start_min}-{number}@university",
+                'summary': lesson['subject'],
+                'start': day_start + timedelta(minutes=start_min),
+                'end': day_start + timedelta(minutes=end_min),
+                'location': f"Аудитория {lesson['room']}",
+                'description': lesson['teacher'],
+                'rrule': 'FREQ=WEEKLY'
+            })
+    for number, exam in enumerate(timetable['exams']):
+        try:
+            exam_date = datetime.strptime(exam['date'], '%d.%m.%Y').date()
+        except ValueError:
+            continue
+        events.append({
+            'uid': f"{uid_prefix}-exam-{number}@university",
+            'summary': f"Экзамен: {exam['subject']}",
+            'start': exam_date,
+            'end': exam_date + timedelta(days=1),
+            'location': f"Аудитория {exam['room']}",
+            'description': exam['teacher']
+        })
+    return events
+
 
 class ScheduleModule:
-    def __init__(self):
+    def __init__(self, db_name='university.db', connection_factory=None,
+                 check_interval=SCHEDULE_VERSION_CHECK):
+        self.db_name = db_name
+        self.connection_factory = connection_factory
+        self.check_interval = check_interval
         self.schedule_data = {}
+        self.by_teacher = {}
+        self.by_room = {}
+        self.by_slot = {}
+        self.slot_starts = {}
+        self.slot_longest = {}
+        self.rooms = []
+        self.conflicts = []
+        self.version = None   # (версия, время изменения) из data_versions
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+        self._lock = threading.RLock()
         self.load_schedule()
+        self.build_indexes()
+
+    @contextmanager
+    def connection(self):
+        """Соединение с БД (из connection_factory или собственное)"""
+        if self.connection_factory is not None:
+            yield self.connection_factory()
+            return
+        conn = sqlite3.connect(self.db_name)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
 
     def load_schedule(self):
-        """Загрузить данные расписания"""
-        self.schedule_data = {
-            1: {  # 1 курс
-                'Понедельник': [
-                    {'time': '09:00-10:30', 'subject': 'Математика', 'teacher': 'Петрова М.И.', 'room': '301'},
-                    {'time': '10:45-12:15', 'subject': 'Информатика', 'teacher': 'Иванов С.П.', 'room': '205'},
-                    {'time': '13:00-14:30', 'subject': 'Физика', 'teacher': 'Сидоров А.В.', 'room': '410'},
-                    {'time': '14:45-16:15', 'subject': 'История', 'teacher': 'Козлова Е.Н.', 'room': '105'}
-                ],
-                'Вторник': [
-                    {'time': '09:00-10:30', 'subject': 'Иностранный язык', 'teacher': 'Смирнова О.Л.', 'room': '208'},
-                    {'time': '10:45-12:15', 'subject': 'Физкультура', 'teacher': 'Николаев В.С.', 'room': 'Спортзал'},
-                    {'time': '13:00-14:30', 'subject': 'Программирование', 'teacher': 'Иванов С.П.', 'room': '305'}
-                ],
-                'Среда': [
-                    {'time': '09:00-10:30', 'subject': 'Математика', 'teacher': 'Петрова М.И.', 'room': '302'},
-                    {'time': '10:45-12:15', 'subject': 'Основы алгоритмов', 'teacher': 'Кузнецов Д.Н.', 'room': '206'}
-                ],
-                'Четверг': [
-                    {'time': '09:00-10:30', 'subject': 'Базы данных', 'teacher': 'Сидоров А.В.', 'room': '411'},
-                    {'time': '10:45-12:15', 'subject': 'Веб-дизайн', 'teacher': 'Козлова Е.Н.', 'room': '306'}
-                ],
-                'Пятница': [
-                    {'time': '09:00-10:30', 'subject': 'Физика', 'teacher': 'Сидоров А.В.', 'room': '410'},
-                    {'time': '10:45-12:15', 'subject': 'Классный час', 'teacher': 'Куратор', 'room': '105'}
-                ]
-            },
-            2: {  # 2 курс
-                'Понедельник': [
-                    {'time': '09:00-10:30', 'subject': 'Базы данных', 'teacher': 'Сидоров А.В.', 'room': '302'},
-                    {'time': '10:45-12:15', 'subject': 'Алгоритмы', 'teacher': 'Кузнецов Д.Н.', 'room': '206'},
-                    {'time': '13:00-14:30', 'subject': 'Веб-разработка', 'teacher': 'Козлова Е.Н.', 'room': '411'},
-                    {'time': '14:45-16:15', 'subject': 'Иностранный язык', 'teacher': 'Смирнова О.Л.', 'room': '106'}
-                ],
-                'Вторник': [
-                    {'time': '09:00-10:30', 'subject': 'Сети и коммуникации', 'teacher': 'Петров В.И.', 'room': '307'},
-                    {'time': '10:45-12:15', 'subject': 'Операционные системы', 'teacher': 'Иванов С.П.', 'room': '205'}
-                ]
-            },
-            3: {  # 3 курс
-                'Понедельник': [
-                    {'time': '09:00-10:30', 'subject': 'Мобильная разработка', 'teacher': 'Козлов Д.Н.', 'room': '303'},
-                    {'time': '10:45-12:15', 'subject': 'Тестирование ПО', 'teacher': 'Петрова М.И.', 'room': '207'},
-                    {'time': '13:00-14:30', 'subject': 'Сети и коммуникации', 'teacher': 'Петров В.И.', 'room': '412'},
-                    {'time': '14:45-16:15', 'subject': 'Экономика', 'teacher': 'Сидорова А.С.', 'room': '107'}
-                ]
-            },
-            4: {  # 4 курс
-                'Понедельник': [
-                    {'time': '09:00-10:30', 'subject': 'Дипломное проектирование', 'teacher': 'Иванов С.П.', 'room': '304'},
-                    {'time': '10:45-12:15', 'subject': 'Проектный менеджмент', 'teacher': 'Козлова Е.Н.', 'room': '208'},
-                    {'time': '13:00-14:30', 'subject': 'Карьера и трудоустройство', 'teacher': 'Николаева Т.В.', 'room': '413'},
-                    {'time': '14:45-16:15', 'subject': 'Консультации', 'teacher': 'Куратор', 'room': '108'}
-                ]
-            }
-        }
+        """Загрузить расписание из БД (или по умолчанию, если таблицы еще нет).
+
+        В schedule_data попадают все занятия - и общие для курса, и
+        занятия отдельных групп (у каждого занятия ключ group, для
+        общих None), чтобы индексы и поиск накладок видели все.
+        """
+        try:
+            with self.connection() as conn:
+                version = self._read_version(conn)
+                rows = conn.execute('''
+                SELECT course, group_name, day, time, subject, teacher, room FROM lessons
+                ORDER BY course, day_order, start_min
+                ''').fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"⚠️  Расписание из БД недоступно ({e}), используются данные по умолчанию")
+            self._set_schedule(DEFAULT_SCHEDULE, None)
+            return
+
+        schedule_data = {}
+        for row in rows:
+            schedule_data.setdefault(row['course'], {}).setdefault(row['day'], []).append({
+                'time': row['time'],
+                'subject': row['subject'],
+                'teacher': row['teacher'],
+                'room': row['room'],
+                'group': row['group_name']
+            })
+        self._set_schedule(schedule_data, version)
+
+    def _set_schedule(self, schedule_data, version):
+        with self._lock:
+            self.schedule_data = schedule_data
+            self.version = version
+            self._loaded_at = time.time()
+            self._checked_at = time.monotonic()
+
+    @staticmethod
+    def _read_version(conn):
+        row = conn.execute("SELECT version, modified_at FROM data_versions WHERE name = 'schedule'").fetchone()
+        return tuple(row) if row else None
+
+    def _refresh(self):
+        """Перечитать расписание и индексы, если версия в БД изменилась (не чаще check_interval)"""
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return
+            try:
+                with self.connection() as conn:
+                    version = self._read_version(conn)
+            except sqlite3.OperationalError:
+                version = None
+            if version != self.version:
+                self.load_schedule()
+                self.build_indexes()
+            else:
+                self._checked_at = time.monotonic()
+
+    def get_version(self):
+        """(версия, время изменения) расписания - для ETag и кэша страниц"""
+        self._refresh()
+        return self.version or (1, self._loaded_at)
+
+    def import_lessons_csv(self, csv_path, replace=True):
+        """Загрузить занятия из CSV одной транзакцией.
+
+        При replace=True текущее расписание заменяется целиком; при любой
+        ошибке в файле ничего не меняется. Возвращает (успех, сообщение).
+        """
+        with self.connection() as conn:
+            try:
+                with open(csv_path, encoding='utf-8-sig', newline='') as csv_file:
+                    conn.execute('BEGIN IMMEDIATE')
+                    if replace:
+                        conn.execute('DELETE FROM lessons')
+                    insert_lessons(conn, iter_lessons_csv(csv_file))
+                count = conn.execute('SELECT COUNT(*) FROM lessons').fetchone()[0]
+                timetables = materialize_timetables(conn)
+                conn.commit()
+            except (OSError, ValueError, sqlite3.Error) as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                return False, f"Ошибка импорта: {e}"
+
+        self.load_schedule()
+        self.build_indexes()
+        message = f"Загружено занятий: {count}, расписаний групп: {timetables}"
+        if self.conflicts:
+            message += f", найдено накладок: {len(self.conflicts)}"
+        return True, message
+
+    def build_indexes(self):
+        """Построить индексы по преподавателям, аудиториям и времени.
+
+        Вызывается после каждой загрузки или изменения schedule_data.
+        by_teacher и by_room: имя -> день -> список занятий по времени
+        начала (занятия с нераспознанным временем - в конце);
+        by_slot: день -> список (начало, конец, занятие) в минутах,
+        отсортированный по началу, slot_starts: день -> начала из
+        by_slot (для двоичного поиска), slot_longest: день -> самое
+        длинное занятие дня в минутах.
+        """
+        by_teacher, by_room, by_slot = {}, {}, {}
+        sort_keys = {}
+        for course, days in self.schedule_data.items():
+            for day, lessons in days.items():
+                for lesson in lessons:
+                    entry = dict(lesson, course=course, day=day)
+                    entry.setdefault('group', None)
+                    by_teacher.setdefault(lesson['teacher'], {}).setdefault(day, []).append(entry)
+                    by_room.setdefault(lesson['room'], {}).setdefault(day, []).append(entry)
+                    try:
+                        start, end = parse_time_slot(lesson['time'])
+                    except ValueError:
+                        # Такое занятие попадет в накладки с типом 'time'
+                        sort_keys[id(entry)] = (24 * 60, 24 * 60, lesson['time'])
+                        continue
+                    sort_keys[id(entry)] = (start, end, lesson['time'])
+                    by_slot.setdefault(day, []).append((start, end, entry))
+
+        for index in (by_teacher, by_room):
+            for days in index.values():
+                for lessons in days.values():
+                    lessons.sort(key=lambda l: sort_keys[id(l)])
+        slot_starts, slot_longest = {}, {}
+        for day, intervals in by_slot.items():
+            intervals.sort(key=lambda interval: interval[:2])
+            slot_starts[day] = [start for start, _, _ in intervals]
+            slot_longest[day] = max(end - start for start, end, _ in intervals)
+        conflicts = self.find_conflicts(by_teacher, by_room)
+        # Индексы заменяются целиком, читающие потоки не видят их наполовину
+        with self._lock:
+            self.by_teacher, self.by_room, self.by_slot = by_teacher, by_room, by_slot
+            self.slot_starts, self.slot_longest = slot_starts, slot_longest
+            self.rooms = sorted(by_room)
+            self.conflicts = conflicts
+
+    def find_conflicts(self, by_teacher=None, by_room=None):
+        """Найти накладки в расписании по уже построенным индексам.
+
+        Для каждого преподавателя и каждой аудитории за каждый день
+        пересекающиеся по времени занятия ищутся сканирующей прямой.
+        Возвращает список словарей с ключами type ('teacher', 'room'
+        или 'time' для нераспознанного времени), key, day, lessons.
+        """
+        by_teacher = self.by_teacher if by_teacher is None else by_teacher
+        by_room = self.by_room if by_room is None else by_room
+        conflicts = []
+        buckets = [('teacher', key, days) for key, days in by_teacher.items()
+                   if key not in SHARED_TEACHERS]
+        buckets += [('room', key, days) for key, days in by_room.items()]
+
+        for kind, key, days in buckets:
+            for day, lessons in days.items():
+                intervals = []
+                for lesson in lessons:
+                    try:
+                        start, end = parse_time_slot(lesson['time'])
+                    except ValueError:
+                        # Ошибку формата сообщаем один раз - по аудитории
+                        if kind == 'room':
+                            conflicts.append({'type': 'time', 'key': lesson['time'],
+                                              'day': day, 'lessons': [lesson]})
+                        continue
+                    intervals.append((start, end, lesson))
+                for first, second in find_overlaps(intervals):
+                    conflicts.append({'type': kind, 'key': key, 'day': day,
+                                      'lessons': [first[2], second[2]]})
+        return conflicts
+
+    @staticmethod
+    def _slot_interval(time):
+        """Время запроса в минутах: '13:00' -> (780, 781), '9:00-10:30' -> (540, 630)"""
+        if '-' in time:
+            return parse_time_slot(time)
+        try:
+            start = parse_time(time)
+        except ValueError:
+            raise ValueError(f"Некорректное время: {time!r}")
+        if not 0 <= start < 24 * 60:
+            raise ValueError(f"Некорректное время: {time!r}")
+        return start, start + 1
+
+    def get_teacher_schedule(self, teacher, day=None):
+        """Занятия преподавателя (за день или вся неделя по дням)"""
+        self._refresh()
+        days = self.by_teacher.get(teacher, {})
+        if day is not None:
+            return days.get(day, [])
+        return days
+
+    def get_room_occupancy(self, room, day=None):
+        """Занятость аудитории (за день или вся неделя по дням)"""
+        self._refresh()
+        days = self.by_room.get(room, {})
+        if day is not None:
+            return days.get(day, [])
+        return days
+
+    def get_slot_lessons(self, day, time):
+        """Все занятия, идущие в указанное время ('13:00' или '13:00-14:30').
+
+        Занятие попадает в ответ, если его интервал пересекается с
+        запрошенным: в 13:00 идет пара 12:15-13:45. Кандидаты находятся
+        двоичным поиском по началу: пересечься могут только занятия,
+        начавшиеся не раньше чем за самое длинное занятие дня до start
+        и до end. ValueError, если время не распознано.
+        """
+        start, end = self._slot_interval(time)
+        self._refresh()
+        with self._lock:
+            intervals = self.by_slot.get(day, [])
+            starts = self.slot_starts.get(day, [])
+            longest = self.slot_longest.get(day, 0)
+        first = bisect_right(starts, start - longest)
+        last = bisect_left(starts, end)
+        return [lesson for _, lesson_end, lesson in intervals[first:last] if lesson_end > start]
+
+    def find_free_rooms(self, day, time):
+        """Аудитории, свободные в указанный день и время"""
+        busy = {lesson['room'] for lesson in self.get_slot_lessons(day, time)}
+        return [room for room in self.rooms if room not in busy]
 
     def get_schedule(self, course):
-        """Получить расписание для курса"""
-        return self.schedule_data.get(course, {})
+        """Получить расписание для курса (индексированное чтение из БД)"""
+        try:
+            with self.connection() as conn:
+                rows = conn.execute('''
+                SELECT day, time, subject, teacher, room FROM lessons
+                WHERE course = ? AND group_name IS NULL
+                ORDER BY day_order, start_min
+                ''', (course,)).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"❌ Ошибка получения расписания: {e}")
+            return self._course_lessons(course)
+
+        schedule = {}
+        for row in rows:
+            schedule.setdefault(row['day'], []).append({
+                'time': row['time'],
+                'subject': row['subject'],
+                'teacher': row['teacher'],
+                'room': row['room']
+            })
+        return schedule
+
+    def _course_lessons(self, course):
+        """Общие для курса занятия из schedule_data (без занятий отдельных групп)"""
+        schedule = {}
+        for day, lessons in self.schedule_data.get(course, {}).items():
+            common = [lesson for lesson in lessons if not lesson.get('group')]
+            if common:
+                schedule[day] = common
+        return schedule
 
     def get_all_schedules(self):
         """Получить все расписания"""
+        self._refresh()
         return self.schedule_data
 
     def get_course_days(self, course):
         """Получить дни недели для курса"""
-        schedule = self.get_schedule(course)
-        return list(schedule.keys()) if schedule else []
+        try:
+            with self.connection() as conn:
+                rows = conn.execute('''
+                SELECT DISTINCT day, day_order FROM lessons
+                WHERE course = ? AND group_name IS NULL
+                ORDER BY day_order
+                ''', (course,)).fetchall()
+        except sqlite3.OperationalError:
+            return list(self._course_lessons(course).keys())
+        return [row['day'] for row in rows]
+
+    def get_group_timetable(self, course, group=None):
+        """Готовое расписание группы (или всего курса, если для группы его нет).
+
+        Одно чтение по первичному ключу group_timetables; возвращает
+        словарь с ключами days, schedule и exams.
+        """
+        try:
+            with self.connection() as conn:
+                row = conn.execute('''
+                SELECT payload FROM group_timetables
+                WHERE course = ? AND group_name IN (?, '')
+                ORDER BY group_name DESC LIMIT 1
+                ''', (course, group or '')).fetchone()
+        except sqlite3.OperationalError as e:
+            print(f"❌ Ошибка получения расписания группы: {e}")
+            return {
+                'days': self.get_course_days(course),
+                'schedule': self.get_schedule(course),
+                'exams': self.get_exams_schedule(course)
+            }
+        if row is None:
+            return {'days': [], 'schedule': {}, 'exams': []}
+        return decode_timetable(row[0])
 
     def get_exams_schedule(self, course):
         """Получить расписание экзаменов"""
-        exams = {
-            1: [
-                {'date': '25.12.2023', 'subject': 'Математика', 'teacher': 'Петрова М.И.', 'room': '301'},
-                {'date': '27.12.2023', 'subject': 'Информатика', 'teacher': 'Иванов С.П.', 'room': '205'},
-                {'date': '29.12.2023', 'subject': 'Физика', 'teacher': 'Сидоров А.В.', 'room': '410'}
-            ],
-            2: [
-                {'date': '26.12.2023', 'subject': 'Базы данных', 'teacher': 'Сидоров А.В.', 'room': '302'},
-                {'date': '28.12.2023', 'subject': 'Алгоритмы', 'teacher': 'Кузнецов Д.Н.', 'room': '206'}
-            ],
-            3: [
-                {'date': '22.12.2023', 'subject': 'Мобильная разработка', 'teacher': 'Козлов Д.Н.', 'room': '303'},
-                {'date': '24.12.2023', 'subject': 'Тестирование ПО', 'teacher': 'Петрова М.И.', 'room': '207'}
-            ],
-            4: [
-                {'date': '20.12.2023', 'subject': 'Защита диплома', 'teacher': 'Комиссия', 'room': 'Актовый зал'}
-            ]
-        }
-        return exams.get(course, [])
\ No newline at end of file
+        try:
+            with self.connection() as conn:
+                rows = conn.execute('''
+                SELECT date, subject, teacher, room FROM exams
+                WHERE course = ?
+                ORDER BY id
+                ''', (course,)).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"❌ Ошибка получения экзаменов: {e}")
+            return DEFAULT_EXAMS.get(course, [])
+        return [dict(row) for row in rows]
@@ -0,0 +1,336 @@
+"""
+Модуль для хранения сессий на стороне сервера
+
+В cookie остается только случайный идентификатор сессии, а данные
+(снимок пользователя: user_id, username, user_type, name и flash-сообщения)
+лежат в хранилище с ограниченным сроком жизни. Данные читаются из
+хранилища только при первом обращении к session в запросе.
+
+Хранилище выбирается переменными окружения: по умолчанию сессии
+хранятся в памяти процесса, при заданном SESSION_DB - в файле SQLite
+(общем для нескольких процессов). Просроченные сессии удаляет
+фоновый поток.
+"""
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask.sessions import SessionInterface, SessionMixin
+
+SESSION_TTL = int(os.environ.get('SESSION_TTL', 12 * 60 * 60))
+SESSION_SWEEP_INTERVAL = int(os.environ.get('SESSION_SWEEP_INTERVAL', 300))
+
+
+def new_session_id():
+    """Случайный идентификатор сессии"""
+    return secrets.token_urlsafe(32)
+
+
+# ==================== ХРАНИЛИЩА ====================
+
+class MemorySessionBackend:
+    """Сессии в памяти процесса"""
+
+    def __init__(self):
+        self._sessions = {}  # sid -> (данные в JSON, user_id, истекает)
+        self._by_user = {}   # user_id -> множество sid
+        self._lock = threading.Lock()
+        self.stats = {'loads': 0, 'saves': 0, 'expired': 0, 'invalidated': 0}
+
+    def load(self, sid, now):
+        """Данные и срок действия сессии или (None, None)"""
+        with self._lock:
+            self.stats['loads'] += 1
+            entry = self._sessions.get(sid)
+            if entry is None or entry[2] <= now:
+                return None, None
+            return json.loads(entry[0]), entry[2]
+
+    def save(self, sid, data, user_id, expires):
+        """Сохранить сессию"""
+        with self._lock:
+            self.stats['saves'] += 1
+            self._remove(sid)
+            self._sessions[sid] = (json.dumps(data, ensure_ascii=False), user_id, expires)
+            if user_id is not None:
+                self._by_user.setdefault(user_id, set()).add(sid)
+
+    def touch(self, sid, expires):
+        """Продлить сессию без перезаписи данных"""
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if entry is not None:
+                self._sessions[sid] = (entry[0], entry[1], expires)
+
+    def delete(self, sid):
+        """Удалить сессию"""
+        with self._lock:
+            self._remove(sid)
+
+    def delete_user(self, user_id):
+        """Удалить все сессии пользователя, вернуть их число"""
+        with self._lock:
+            sids = list(self._by_user.get(user_id, ()))
+            for sid in sids:
+                self._remove(sid)
+            self.stats['invalidated'] += len(sids)
+            return len(sids)
+
+    def update_user(self, user_id, changes):
+        """Обновить снимок пользователя во всех его сессиях"""
+        with self._lock:
+            for sid in self._by_user.get(user_id, ()):
+                raw, _, expires = self._sessions[sid]
+                data = json.loads(raw)
+                data.update(changes)
+                self._sessions[sid] = (json.dumps(data, ensure_ascii=False), user_id, expires)
+
+    def sweep(self, now):
+        """Удалить просроченные сессии, вернуть их число"""
+        with self._lock:
+            expired = [sid for sid, entry in self._sessions.items() if entry[2] <= now]
+            for sid in expired:
+                self._remove(sid)
+            self.stats['expired'] += len(expired)
+            return len(expired)
+
+    def _remove(self, sid):
+        entry = self._sessions.pop(sid, None)
+        if entry is not None and entry[1] is not None:
+            sids = self._by_user.get(entry[1])
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self._by_user[entry[1]]
+
+    def get_stats(self):
+        """Счетчики и число сессий"""
+        with self._lock:
+            return dict(self.stats, sessions=len(self._sessions))
+
+
+class SQLiteSessionBackend:
+    """Сессии в файле SQLite, общие для нескольких процессов"""
+
+    def __init__(self, db_name):
+        self.db_name = db_name
+        self._local = threading.local()
+        self.stats = {'loads': 0, 'saves': 0, 'expired': 0, 'invalidated': 0}
+        conn = self._connection()
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            sid TEXT PRIMARY KEY,
+            user_id INTEGER,
+            data TEXT NOT NULL,
+            expires REAL NOT NULL
+        ) WITHOUT ROWID
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user_id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires)')
+
+    def _connection(self):
+        """Соединение текущего потока (открывается один раз)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_name, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def load(self, sid, now):
+        """Данные и срок действия сессии или (None, None)"""
+        self.stats['loads'] += 1
+        row = self._connection().execute(
+            'SELECT data, expires FROM sessions WHERE sid = ? AND expires > ?', (sid, now)
+        ).fetchone()
+        if row is None:
+            return None, None
+        return json.loads(row[0]), row[1]
+
+    def save(self, sid, data, user_id, expires):
+        """Сохранить сессию"""
+        self.stats['saves'] += 1
+        self._connection().execute('''
+        INSERT OR REPLACE INTO sessions (sid, user_id, data, expires) VALUES (?, ?, ?, ?)
+        ''', (sid, user_id, json.dumps(data, ensure_ascii=False), expires))
+
+    def touch(self, sid, expires):
+        """Продлить сессию без перезаписи данных"""
+        self._connection().execute('UPDATE sessions SET expires = ? WHERE sid = ?', (expires, sid))
+
+    def delete(self, sid):
+        """Удалить сессию"""
+        self._connection().execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def delete_user(self, user_id):
+        """Удалить все сессии пользователя, вернуть их число"""
+        count = self._connection().execute('DELETE FROM sessions WHERE user_id = ?',
+                                           (user_id,)).rowcount
+        self.stats['invalidated'] += count
+        return count
+
+    def update_user(self, user_id, changes):
+        """Обновить снимок пользователя во всех его сессиях"""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute('SELECT sid, data FROM sessions WHERE user_id = ?',
+                                (user_id,)).fetchall()
+            for sid, raw in rows:
+                data = json.loads(raw)
+                data.update(changes)
+                conn.execute('UPDATE sessions SET data = ? WHERE sid = ?',
+                             (json.dumps(data, ensure_ascii=False), sid))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def sweep(self, now):
+        """Удалить просроченные сессии, вернуть их число"""
+        count = self._connection().execute('DELETE FROM sessions WHERE expires <= ?',
+                                           (now,)).rowcount
+        self.stats['expired'] += count
+        return count
+
+    def get_stats(self):
+        """Счетчики и число сессий в таблице"""
+        sessions = self._connection().execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+        return dict(self.stats, sessions=sessions, db=self.db_name)
+
+
+def create_session_backend():
+    """Создать хранилище сессий по настройкам из переменных окружения"""
+    db_name = os.environ.get('SESSION_DB')
+    if db_name:
+        return SQLiteSessionBackend(db_name)
+    return MemorySessionBackend()
+
+
+# ==================== СЕССИЯ FLASK ====================
+
+class ServerSession(SessionMixin):
+    """Сессия, данные которой загружаются из хранилища при первом обращении"""
+
+    def __init__(self, backend, sid=None):
+        self.backend = backend
+        self.sid = sid
+        self.new = sid is None
+        self.expires = None
+        self.modified = False
+        self.accessed = False
+        self.previous_sid = None
+        self._data = None
+
+    def _load(self):
+        self.accessed = True
+        if self._data is None:
+            data = None
+            if self.sid is not None:
+                data, self.expires = self.backend.load(self.sid, time.time())
+            if data is None:
+                # Сессия не найдена или истекла - начинаем новую
+                self.sid, self.new = None, True
+            self._data = data or {}
+        return self._data
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self._load()[key]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def regenerate(self):
+        """Выдать новый идентификатор (при входе), старая сессия удаляется"""
+        self._load()
+        if not self.new:
+            self.previous_sid = self.sid
+        self.sid, self.new = None, True
+        self.modified = True
+
+
+class ServerSessionInterface(SessionInterface):
+    """Интерфейс сессий Flask поверх хранилища сессий.
+
+    Срок действия сессии продлевается, когда от него осталось меньше
+    половины; хранилище при этом не перезаписывается.
+    """
+
+    def __init__(self, backend, ttl=SESSION_TTL, sweep_interval=SESSION_SWEEP_INTERVAL):
+        self.backend = backend
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._sweeper_pid = None
+        self._sweeper_lock = threading.Lock()
+
+    def open_session(self, app, request):
+        self._ensure_sweeper()
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and len(sid) > 64:
+            sid = None
+        return ServerSession(self.backend, sid or None)
+
+    def save_session(self, app, session, response):
+        if not session.accessed:
+            return
+        response.vary.add('Cookie')
+        if session.previous_sid:
+            self.backend.delete(session.previous_sid)
+
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if not session.new:
+                self.backend.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = time.time()
+        if session.new or session.modified:
+            session.sid = session.sid or new_session_id()
+            self.backend.save(session.sid, dict(session), session.get('user_id'), now + self.ttl)
+        elif session.expires - now < self.ttl / 2:
+            self.backend.touch(session.sid, now + self.ttl)
+        else:
+            return
+
+        response.set_cookie(name, session.sid,
+                            expires=self.get_expiration_time(app, session),
+                            httponly=self.get_cookie_httponly(app),
+                            domain=domain, path=path,
+                            secure=self.get_cookie_secure(app),
+                            samesite=self.get_cookie_samesite(app))
+
+    def _ensure_sweeper(self):
+        """Запустить фоновую очистку (один раз в каждом процессе)"""
+        if self._sweeper_pid == os.getpid():
+            return
+        with self._sweeper_lock:
+            if self._sweeper_pid == os.getpid():
+                return
+            self._sweeper_pid = os.getpid()
+            threading.Thread(target=self._sweep_loop, name='session-sweeper', daemon=True).start()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.backend.sweep(time.time())
+            except Exception as e:
+                print(f"❌ Ошибка очистки сессий: {e}")
@@ -0,0 +1,197 @@
+"""
+Модуль встроенного мессенджера
+
+Сообщение хранится один раз в таблице messages, а каждому получателю
+при отправке добавляется строка во входящие (таблица inbox, ключ
+(recipient_id, created_at, message_id)). Рассылки вроде "Все старосты"
+раскладываются по входящим одним INSERT ... SELECT, поэтому страница
+входящих - это один проход по диапазону ключа, сколько бы сообщений
+ни было в базе.
+
+Число непрочитанных хранится в users.unread_count и поддерживается
+триггерами на inbox.
+"""
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+INBOX_PAGE_SIZE = 50
+
+# Рассылки: название -> условие отбора получателей из users
+BROADCASTS = {
+    'Все пользователи': ('1', ()),
+    'Все студенты': ("user_type IN ('student', 'starosta')", ()),
+    'Все старосты': ("user_type = 'starosta'", ()),
+    'Все преподаватели': ("user_type = 'teacher'", ()),
+}
+
+# Рассылки по группе: префикс названия -> условие (группа - параметр)
+GROUP_BROADCASTS = {
+    'Староста ': "user_type = 'starosta' AND group_name = ?",
+    'Группа ': "user_type IN ('student', 'starosta') AND group_name = ?",
+}
+
+# Сообщения, которые раньше были заглушкой в star.py
+DEFAULT_MESSAGES = [
+    ('Деканат', 'Все старосты', 'Собрание старост',
+     'Напоминаем о собрании 15 октября в 15:00', '10.10.2023 14:30'),
+    ('Преподаватель Сидоров А.В.', 'Староста ПИ-21', 'Список группы',
+     'Пришлите, пожалуйста, актуальный список группы', '09.10.2023 10:15'),
+    ('Студент Петров П.П.', 'Староста ПИ-21', 'Вопрос по практике',
+     'Когда будет информация о месте прохождения практики?', '08.10.2023 16:45'),
+]
+
+
+def resolve_audience(audience):
+    """Название рассылки -> (условие WHERE для users, параметры); ValueError, если неизвестно"""
+    if audience in BROADCASTS:
+        return BROADCASTS[audience]
+    for prefix, condition in GROUP_BROADCASTS.items():
+        if audience.startswith(prefix) and audience[len(prefix):].strip():
+            return condition, (audience[len(prefix):].strip(),)
+    raise ValueError(f"Неизвестный адресат рассылки: {audience!r}")
+
+
+def deliver_message(conn, sender_id, sender_name, subject, body, audience=None,
+                    recipient_ids=None, created_at=None):
+    """Сохранить сообщение и разложить его по входящим получателей.
+
+    Получатели - участники рассылки audience (кроме самого отправителя)
+    или пользователи recipient_ids (тогда audience - подпись "Кому").
+    Возвращает (id сообщения, число получателей). Транзакцией управляет
+    вызывающий.
+    """
+    created_at = time.time() if created_at is None else created_at
+    if recipient_ids is not None:
+        ids = sorted({int(recipient_id) for recipient_id in recipient_ids})
+        condition = f"id IN ({', '.join('?' * len(ids))})" if ids else '0'
+        params = tuple(ids)
+    else:
+        condition, params = resolve_audience(audience)
+        # IS NOT: у системных сообщений отправителя нет (NULL)
+        condition, params = f"({condition}) AND id IS NOT ?", (*params, sender_id)
+
+    message_id = conn.execute('''
+    INSERT INTO messages (sender_id, sender_name, audience, subject, body, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ''', (sender_id, sender_name, audience or '', subject, body, created_at)).lastrowid
+    delivered = conn.execute(f'''
+    INSERT INTO inbox (recipient_id, created_at, message_id)
+    SELECT id, ?, ? FROM users WHERE {condition}
+    ''', (created_at, message_id, *params)).rowcount
+    conn.execute('UPDATE messages SET recipients = ? WHERE id = ?', (delivered, message_id))
+    return message_id, delivered
+
+
+def insert_default_messages(conn):
+    """Разослать сообщения по умолчанию (для миграции)"""
+    for sender_name, audience, subject, body, date in DEFAULT_MESSAGES:
+        created_at = datetime.strptime(date, '%d.%m.%Y %H:%M').timestamp()
+        deliver_message(conn, None, sender_name, subject, body, audience=audience,
+                        created_at=created_at)
+
+
+def message_from_row(row):
+    """Строка входящих -> словарь сообщения в формате страниц"""
+    return {
+        'id': row['message_id'],
+        'from': row['sender_name'],
+        'to': row['audience'],
+        'subject': row['subject'],
+        'message': row['body'],
+        'date': datetime.fromtimestamp(row['created_at']).strftime('%d.%m.%Y %H:%M'),
+        'read': bool(row['is_read']),
+        'created_at': row['created_at']
+    }
+
+
+class MessagesModule:
+    def __init__(self, db_name='university.db', connection_factory=None):
+        self.db_name = db_name
+        self.connection_factory = connection_factory
+
+    @contextmanager
+    def connection(self):
+        """Соединение с БД (из connection_factory или собственное)"""
+        if self.connection_factory is not None:
+            yield self.connection_factory()
+            return
+        conn = sqlite3.connect(self.db_name)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def send_message(self, sender_id, sender_name, subject, body, audience=None, recipient_ids=None):
+        """Отправить сообщение пользователям или рассылкой, вернуть (успех, сообщение)"""
+        if not body or not body.strip():
+            return False, "Сообщение не может быть пустым"
+        try:
+            with self.connection() as conn:
+                try:
+                    _, delivered = deliver_message(conn, sender_id, sender_name, subject.strip(),
+                                                   body.strip(), audience, recipient_ids)
+                    if not delivered:
+                        # Сообщение без получателей не сохраняем
+                        conn.rollback()
+                        return False, "Не найдено ни одного получателя"
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+        except ValueError as e:
+            return False, str(e)
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка отправки сообщения: {e}")
+            return False, f"Ошибка: {str(e)}"
+        return True, f"Сообщение отправлено, получателей: {delivered}"
+
+    def get_inbox(self, user_id, after=None, limit=INBOX_PAGE_SIZE):
+        """Страница входящих, новые сверху.
+
+        after - ключ (created_at, message_id) последнего сообщения
+        предыдущей страницы. Возвращает (сообщения, ключ для следующей
+        страницы или None).
+        """
+        with self.connection() as conn:
+            rows = conn.execute(f'''
+            SELECT i.message_id, i.created_at, i.is_read,
+                   m.sender_name, m.audience, m.subject, m.body
+            FROM inbox i JOIN messages m ON m.id = i.message_id
+            WHERE i.recipient_id = ?
+            {'AND (i.created_at, i.message_id) < (?, ?)' if after else ''}
+            ORDER BY i.created_at DESC, i.message_id DESC
+            LIMIT ?
+            ''', (user_id, *(after or ()), limit + 1)).fetchall()
+        next_key = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_key = (rows[-1]['created_at'], rows[-1]['message_id'])
+        return [message_from_row(row) for row in rows], next_key
+
+    def get_unread_count(self, user_id):
+        """Число непрочитанных сообщений пользователя"""
+        with self.connection() as conn:
+            row = conn.execute('SELECT unread_count FROM users WHERE id = ?', (user_id,)).fetchone()
+        return row[0] if row else 0
+
+    def mark_read(self, user_id, message_id):
+        """Отметить сообщение прочитанным; False, если его нет во входящих или оно уже прочитано"""
+        with self.connection() as conn:
+            updated = conn.execute('''
+            UPDATE inbox SET is_read = 1
+            WHERE recipient_id = ? AND message_id = ? AND is_read = 0
+              AND created_at = (SELECT created_at FROM messages WHERE id = ?)
+            ''', (user_id, message_id, message_id)).rowcount
+            conn.commit()
+        return updated > 0
+
+    def mark_all_read(self, user_id):
+        """Отметить прочитанными все входящие, вернуть их число"""
+        with self.connection() as conn:
+            updated = conn.execute('UPDATE inbox SET is_read = 1 WHERE recipient_id = ? AND is_read = 0',
+                                   (user_id,)).rowcount
+            conn.commit()
+        return updated
@@ -1,13 +1,15 @@
 """
 Модуль для работы с функционалом старосты
 """
+from soobsh import INBOX_PAGE_SIZE, MessagesModule
 
 
 class StarostaModule:
-    def __init__(self):
+    def __init__(self, messages=None):
         self.students = []
         self.reports = []
-        self.messages = []
+        # Сообщения хранятся в БД (см. soobsh.py)
+        self.messages = messages if messages is not None else MessagesModule()
 
     def get_students_data(self, group=None):
         """Получить список студентов"""
@@ -100,39 +102,9 @@ class StarostaModule:
         ]
         return info
 
-    def get_messages(self, user_id=None):
-        """Получить сообщения мессенджера"""
-        messages = [
-            {
-                'id': 1,
-                'from': 'Деканат',
-                'to': 'Все старосты',
-                'subject': 'Собрание старост',
-                'message': 'Напоминаем о собрании 15 октября в 15:00',
-                'date': '10.10.2023 14:30',
-                'read': True
-            },
-            {
-                'id': 2,
-                'from': 'Преподаватель Сидоров А.В.',
-                'to': 'Староста ПИ-21',
-                'subject': 'Список группы',
-                'message': 'Пришлите, пожалуйста, актуальный список группы',
-                'date': '09.10.2023 10:15',
-                'read': True
-            },
-            {
-                'id': 3,
-                'from': 'Студент Петров П.П.',
-                'to': 'Староста',
-                'subject': 'Вопрос по практике',
-                'message': 'Когда будет информация о месте прохождения практики?',
-                'date': '08.10.2023 16:45',
-                'read': False
-            }
-        ]
-
-        if user_id:
-            return [m for m in messages if
-                    m['id'] == user_id or m['to'] == 'Староста ПИ-21' or m['to'] == 'Все старосты']
-        return messages
\ No newline at end of file
+    def get_messages(self, user_id=None, limit=INBOX_PAGE_SIZE):
+        """Получить сообщения мессенджера (последние входящие пользователя)"""
+        if user_id is None:
+            return []
+        messages, _ = self.messages.get_inbox(user_id, limit=limit)
+        return messages
@@ -0,0 +1,68 @@
+"""
+Общие фикстуры тестов
+
+Каждый тест получает модуль app с новой базой university.db во
+временном каталоге: пул соединений, кэши и модули сбрасываются.
+Шаблоны страниц подменяются однострочными (только нужные тестам поля).
+
+    python -m pytest -q
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import app as portal_module  # noqa: E402  (импорт app не обращается к БД)
+
+TEMPLATES = {
+    'login.html': '{{ get_flashed_messages()|join }}',
+    'profile.html': '{{ user.full_name }}',
+    # Как и настоящие шаблоны, забирает flash-сообщения (иначе страница не кэшируется)
+    'prepodavateli.html': '{% set flashes = get_flashed_messages() %}'
+                          '{{ user.full_name }}|{{ user.email }}|'
+                          '{% for teacher in teachers %}{{ teacher.name }};{% endfor %}',
+}
+
+
+@pytest.fixture
+def portal(tmp_path, monkeypatch):
+    """Модуль app с новой базой во временном каталоге"""
+    monkeypatch.chdir(tmp_path)
+    portal_module.db_pool.close_all()
+    monkeypatch.setattr(portal_module, 'user_cache', portal_module.UserCache())
+    monkeypatch.setattr(portal_module, 'page_cache', portal_module.PageCache())
+    for value in list(vars(portal_module).values()):
+        if isinstance(value, portal_module.LazyModule):
+            value.reset()
+    assert portal_module.check_and_fix_db()
+    yield portal_module
+    portal_module.db_pool.close_all()
+
+
+@pytest.fixture
+def app(portal, tmp_path):
+    """Приложение Flask с упрощенными шаблонами"""
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+    for name, text in TEMPLATES.items():
+        (templates / name).write_text(text, encoding='utf-8')
+    application = portal.create_app({'TESTING': True})
+    application.template_folder = str(templates)
+    return application
+
+
+@pytest.fixture
+def make_user(portal, app):
+    """Создать пользователя через register_user, вернуть его id"""
+    def make(username, user_type='student', password='Passw0rd!', full_name=None, **kwargs):
+        with app.app_context():
+            success, message = portal.register_user(username, password, full_name or username,
+                                                    user_type, **kwargs)
+            assert success, message
+            return portal.get_db_connection().execute(
+                'SELECT id FROM users WHERE username = ?', (username,)).fetchone()[0]
+    return make
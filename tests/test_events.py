@@ -0,0 +1,96 @@
+"""Мероприятия: выборки по датам, лента iCalendar, перезагрузка из таблицы events"""
+import random
+from datetime import date, datetime, timedelta
+
+import mero
+
+
+def random_events(count, seed=3):
+    rng = random.Random(seed)
+    first = datetime(2030, 1, 1)
+    events = []
+    for number in range(1, count + 1):
+        start = first + timedelta(days=rng.randrange(120), minutes=rng.randrange(0, 24 * 60, 30))
+        events.append({'id': number, 'title': f'Мероприятие {number}',
+                       'date': start.strftime('%d.%m.%Y'), 'time': start.strftime('%H:%M')})
+    return events
+
+
+def titles(events):
+    return [event['title'] for event in events]
+
+
+def test_date_queries_match_full_scan(tmp_path):
+    # Без таблицы events модуль берет данные по умолчанию; копию заменяем
+    module = mero.EventsModule(db_name=str(tmp_path / 'empty.db'), check_interval=3600)
+    module.set_events(random_events(500))
+    starts = {event['id']: mero.parse_event_start(event['date'], event['time'])
+              for event in module.get_events()}
+    assert list(starts.values()) == sorted(starts.values())
+
+    def scan(low, high):
+        return [event for event in module.get_events() if low <= starts[event['id']] < high]
+
+    for day in range(0, 120, 9):
+        low = datetime(2030, 1, 1) + timedelta(days=day)
+        high = low + timedelta(days=10)
+        assert module.get_events_between(low, high) == scan(low, high)
+        upcoming = scan(low, datetime.max)
+        assert module.get_upcoming_events(now=low) == upcoming
+        assert module.get_upcoming_events(now=low, limit=5) == upcoming[:5]
+
+    week = date(2030, 2, 13)  # среда
+    monday = datetime(2030, 2, 11)
+    assert module.get_week_events(week) == scan(monday, monday + timedelta(days=7))
+
+
+def test_add_and_remove_update_order_and_feed(portal):
+    module = portal.events_module._get()
+    feed = module.get_ical_feed()
+    assert module.get_ical_feed() is feed
+    count = feed.count('BEGIN:VEVENT')
+
+    assert module.add_event({'title': 'Выпускной', 'date': '30.06.2000', 'time': '18:00'})
+    assert titles(module.get_events())[0] == 'Выпускной'
+    feed = module.get_ical_feed()
+    assert feed.count('BEGIN:VEVENT') == count + 1 and 'SUMMARY:Выпускной' in feed
+
+    assert not module.add_event({'title': 'Когда-нибудь', 'date': 'скоро'})
+    removed = module.get_events()[0]['id']
+    assert module.remove_event(removed)
+    assert 'Выпускной' not in module.get_ical_feed()
+    assert not module.remove_event(removed)
+    # id удаленного мероприятия не достается новому (AUTOINCREMENT)
+    assert module.add_event({'title': 'Выпускной', 'date': '30.06.2000'})
+    assert module.get_events()[0]['id'] > removed
+
+
+def insert_raw_event(conn, title, date, time, starts_at):
+    """Мероприятие, записанное в БД напрямую (без make_event_row)"""
+    conn.execute('INSERT INTO events (title, date, time, starts_at) VALUES (?, ?, ?, ?)',
+                 (title, date, time, starts_at))
+    conn.commit()
+
+
+def test_reload_sorts_on_stored_start(portal):
+    events = portal.events_module._get()
+    events.check_interval = 0
+    insert_raw_event(portal.get_db_connection(), 'Олимпиада', '1 марта', '', '2030-03-01 09:00')
+
+    titles = [event['title'] for event in events.get_events()]
+    assert titles[-1] == 'Олимпиада'
+    assert events.starts[-1].isoformat() == '2030-03-01T09:00:00'
+
+
+def test_bad_row_does_not_break_reload(portal, capsys):
+    events = portal.events_module._get()
+    events.check_interval = 0
+    before = len(events.get_events())
+    insert_raw_event(portal.get_db_connection(), 'Сломанное', 'когда-нибудь', '', 'когда-нибудь')
+    insert_raw_event(portal.get_db_connection(), 'Выпускной', '30.06.2030', '18:00', '2030-06-30 18:00')
+
+    titles = [event['title'] for event in events.get_events()]
+    assert len(titles) == before + 1
+    assert 'Выпускной' in titles and 'Сломанное' not in titles
+    assert 'пропущено' in capsys.readouterr().out
+    assert 'Выпускной' in events.get_ical_feed()
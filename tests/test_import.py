@@ -0,0 +1,83 @@
+"""Массовый импорт пользователей"""
+import io
+import sqlite3
+
+import pytest
+
+from paroli import verify_password
+from test_user_cache import login
+
+CSV = ('username,password,full_name,user_type\n'
+       'zed1,secret1,Зед Первый,student\n'
+       'zed2,secret2,Зед Второй,student\n'
+       'zed3,secret3,Зед Третий,student\n')
+
+
+def stored_password(portal, username):
+    row = portal.get_db_connection().execute('SELECT password FROM users WHERE username = ?',
+                                             (username,)).fetchone()
+    return row[0] if row else None
+
+
+@pytest.mark.parametrize('batch_size', [1, 2, 10])
+def test_imported_users_can_log_in(portal, app, batch_size):
+    with app.app_context():
+        report = portal.bulk_import_users(io.StringIO(CSV), 'csv', batch_size=batch_size)
+    assert report == {'created': 3, 'failed': 0, 'errors': []}
+    for number in (1, 2, 3):
+        assert verify_password(stored_password(portal, f'zed{number}'), f'secret{number}')[0]
+        login(app.test_client(), f'zed{number}', f'secret{number}')
+
+
+def test_failed_insert_is_not_retried_with_hashed_passwords(portal, app, monkeypatch):
+    insert_users_batch = portal.insert_users_batch
+    calls = []
+
+    def failing_insert(conn, rows):
+        calls.append([row[0] for _, row in rows])
+        if len(calls) == 2:
+            raise sqlite3.OperationalError('database is locked')
+        return insert_users_batch(conn, rows)
+
+    monkeypatch.setattr(portal, 'insert_users_batch', failing_insert)
+    with app.app_context():
+        with pytest.raises(sqlite3.OperationalError):
+            portal.bulk_import_users(io.StringIO(CSV), 'csv', batch_size=1)
+        assert calls == [['zed1'], ['zed2']]
+        assert verify_password(stored_password(portal, 'zed1'), 'secret1')[0]
+        assert stored_password(portal, 'zed2') is None
+
+
+def test_bad_rows_skipped_with_line_numbers(portal, app):
+    data = CSV + ('zed1,secret9,Зед Повтор,student\n'
+                  'admin,secret9,Администратор,admin\n'
+                  'zed5,secret5,Зед Пятый,alien\n'
+                  'zed6,123,Зед Шестой,student\n'
+                  'zed7,secret7,Зед Седьмой,student\n')
+    with app.app_context():
+        report = portal.bulk_import_users(io.StringIO(data), 'csv', batch_size=2)
+    assert report['created'] == 4
+    assert [line_number for line_number, _ in report['errors']] == [5, 6, 7, 8]
+    assert report['failed'] == 4
+
+
+def test_jsonl_import(portal, app):
+    data = ('{"username": "zed1", "password": "secret1", "full_name": "Зед", '
+            '"user_type": "student", "course": 2}\n'
+            'не JSON\n')
+    with app.app_context():
+        report = portal.bulk_import_users(io.StringIO(data), 'jsonl')
+        course = portal.get_db_connection().execute(
+            'SELECT course FROM users WHERE username = ?', ('zed1',)).fetchone()[0]
+    assert report['created'] == 1 and report['failed'] == 1
+    assert course == 2
+
+
+def test_rows_before_broken_line_are_imported(portal, app):
+    # Поле длиннее csv.field_size_limit() - чтение файла обрывается с csv.Error
+    broken = CSV + 'zed4,' + 'x' * 200000 + '\n'
+    with app.app_context():
+        report = portal.bulk_import_users(io.StringIO(broken), 'csv', batch_size=2)
+    assert report['created'] == 3
+    assert report['failed'] == 1
+    assert report['errors'][0][1].startswith('файл не прочитан до конца')
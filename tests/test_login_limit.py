@@ -0,0 +1,56 @@
+"""Ограничение частоты попыток входа (limity)"""
+import pytest
+
+from limity import SQLiteTokenBucketLimiter, TokenBucketLimiter
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_limiter(request, tmp_path):
+    def make(rate, capacity):
+        if request.param == 'sqlite':
+            return SQLiteTokenBucketLimiter(str(tmp_path / 'limits.db'), rate, capacity)
+        return TokenBucketLimiter(rate, capacity)
+    return make
+
+
+def test_bucket_empties_and_refills(make_limiter):
+    limiter = make_limiter(rate=0.5, capacity=2)
+    assert limiter.allow('ip:1', now=100.0) == (True, 0.0)
+    assert limiter.allow('ip:1', now=100.0) == (True, 0.0)
+    assert limiter.allow('ip:1', now=100.0) == (False, 2.0)
+    assert limiter.allow('ip:2', now=100.0)[0]
+    assert not limiter.allow('ip:1', now=101.0)[0]
+    assert limiter.allow('ip:1', now=103.0)[0]
+
+
+def test_sweep_drops_only_full_buckets(make_limiter):
+    limiter = make_limiter(rate=0.1, capacity=5)
+    limiter.sweep_interval = 10
+    limiter._last_sweep = 100.0
+    limiter.allow('old', now=100.0)
+    limiter.allow('new', now=108.0)
+    limiter.allow('new', now=110.0)
+    stats = limiter.get_stats()
+    assert stats['evicted'] == 1
+    assert stats['buckets'] == 1
+
+
+def test_sqlite_buckets_shared(tmp_path):
+    path = str(tmp_path / 'limits.db')
+    first = SQLiteTokenBucketLimiter(path, rate=1 / 60, capacity=1)
+    second = SQLiteTokenBucketLimiter(path, rate=1 / 60, capacity=1)
+    assert first.allow('user:ivanov', now=100.0)[0]
+    assert not second.allow('user:ivanov', now=100.0)[0]
+
+
+def test_login_rejected_before_password_check(portal, app, make_user):
+    make_user('ivanov')
+    client = app.test_client()
+    for _ in range(5):
+        response = client.post('/login', data={'username': 'Ivanov', 'password': 'wrong'})
+        assert response.status_code != 429
+
+    response = client.post('/login', data={'username': 'ivanov', 'password': 'Passw0rd!'})
+    assert response.status_code == 429
+    assert 'Слишком много попыток входа' in response.get_data(as_text=True)
+    assert portal.login_limiter.get_stats()['username']['rejected'] == 1
@@ -0,0 +1,58 @@
+"""Отправка сообщений и рассылки, страницы входящих и счетчик непрочитанных"""
+
+
+def message_count(portal):
+    return portal.get_db_connection().execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+
+
+def test_inbox_pages_and_unread_count(portal, app, make_user):
+    sender = make_user('petrov', user_type='teacher')
+    reader = make_user('ivanov')
+    messages = portal.messages_module
+    with app.app_context():
+        for number in range(5):
+            assert messages.send_message(sender, 'Петров', f'Тема {number}', 'Текст',
+                                         recipient_ids=[reader])[0]
+        subjects, after = [], None
+        while True:
+            page, after = messages.get_inbox(reader, after=after, limit=2)
+            subjects += [message['subject'] for message in page]
+            if after is None:
+                break
+        assert subjects == [f'Тема {number}' for number in range(4, -1, -1)]
+
+        assert messages.get_unread_count(reader) == 5
+        newest = messages.get_inbox(reader, limit=1)[0][0]['id']
+        assert messages.mark_read(reader, newest)
+        assert not messages.mark_read(reader, newest)
+        assert not messages.mark_read(sender, newest)
+        assert messages.get_unread_count(reader) == 4
+        assert messages.mark_all_read(reader) == 4
+        assert messages.get_unread_count(reader) == 0
+
+
+def test_broadcast_skips_sender(portal, app, make_user):
+    first = make_user('starosta1', user_type='starosta', group='ПИ-21')
+    second = make_user('starosta2', user_type='starosta', group='ПИ-22')
+    with app.app_context():
+        success, message = portal.messages_module.send_message(
+            first, 'Староста ПИ-21', 'Собрание', 'Завтра в 15:00', audience='Все старосты')
+        assert success, message
+        assert message.endswith(': 1')
+        assert portal.messages_module.get_unread_count(second) == 1
+        assert portal.messages_module.get_unread_count(first) == 0
+
+
+def test_message_without_recipients_not_saved(portal, app, make_user):
+    sender = make_user('starosta1', user_type='starosta', group='ПИ-21')
+    before = message_count(portal)
+    with app.app_context():
+        # Единственный староста - сам отправитель
+        assert portal.messages_module.send_message(
+            sender, 'Староста ПИ-21', 'Тема', 'Текст', audience='Все старосты') == (
+            False, "Не найдено ни одного получателя")
+        assert not portal.messages_module.send_message(
+            sender, 'Староста ПИ-21', 'Тема', 'Текст', audience='Группа ИС-11')[0]
+        assert not portal.messages_module.send_message(
+            sender, 'Староста ПИ-21', 'Тема', 'Текст', recipient_ids=[999])[0]
+    assert message_count(portal) == before
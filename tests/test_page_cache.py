@@ -0,0 +1,35 @@
+"""Кэш готовых страниц (render_cached_page)"""
+from test_user_cache import login
+
+
+def open_page(app, username, path='/prepodavateli'):
+    """Войти и открыть страницу (первый запрос забирает flash-сообщение о входе)"""
+    client = app.test_client()
+    login(client, username)
+    client.get(path)
+    return client, client.get(path).get_data(as_text=True)
+
+
+def test_page_shared_by_users_with_same_name(portal, app, make_user):
+    make_user('petrov1', full_name='Петров Петр', email='one@example.com')
+    make_user('petrov2', full_name='Петров Петр', email='two@example.com')
+    make_user('sidorov', full_name='Сидоров Иван')
+    pages = {username: open_page(app, username)[1]
+             for username in ('petrov1', 'petrov2', 'sidorov')}
+
+    assert pages['petrov1'] == pages['petrov2']
+    assert pages['petrov1'].startswith('Петров Петр||')
+    assert pages['sidorov'].startswith('Сидоров Иван||')
+    assert portal.page_cache.get_stats()['entries'] == 2
+
+
+def test_version_bump_drops_pages(portal, app, make_user):
+    make_user('ivanov')
+    client, page = open_page(app, 'ivanov')
+    assert client.get('/prepodavateli').get_data(as_text=True) == page
+    assert portal.page_cache.get_stats()['hits'] >= 1
+
+    portal.bump_data_version('teachers')
+    assert portal.page_cache.get_stats()['entries'] == 0
+    assert client.get('/prepodavateli').get_data(as_text=True) == page
+    assert portal.page_cache.get_stats()['entries'] == 1
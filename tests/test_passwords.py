@@ -0,0 +1,36 @@
+"""Хэширование паролей (paroli) и перехэширование старых форматов при входе"""
+import hashlib
+
+import pytest
+
+import paroli
+from test_user_cache import login
+
+
+def stored_password(portal, username):
+    return portal.get_db_connection().execute('SELECT password FROM users WHERE username = ?',
+                                              (username,)).fetchone()[0]
+
+
+@pytest.mark.parametrize('params', ['scrypt:1024:8:1', 'pbkdf2:sha256:1000'])
+def test_hash_verifies_only_own_password(params):
+    stored = paroli._hash_password('Passw0rd!', params)
+    assert stored.startswith(params + '$')
+    assert paroli._verify_password(stored, 'Passw0rd!') == (True, True)
+    assert paroli._verify_password(stored, 'passw0rd!') == (False, False)
+
+
+@pytest.mark.parametrize('legacy', [
+    'Passw0rd!',
+    'sha256$abc$' + hashlib.sha256('Passw0rd!abc'.encode()).hexdigest(),
+])
+def test_legacy_password_rehashed_on_login(portal, app, make_user, legacy):
+    make_user('ivanov')
+    conn = portal.get_db_connection()
+    conn.execute('UPDATE users SET password = ? WHERE username = ?', (legacy, 'ivanov'))
+    conn.commit()
+
+    login(app.test_client(), 'ivanov')
+    stored = stored_password(portal, 'ivanov')
+    assert stored.startswith(paroli.current_params() + '$')
+    assert paroli.verify_password(stored, 'Passw0rd!') == (True, False)
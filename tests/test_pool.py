@@ -0,0 +1,31 @@
+"""Пул соединений: закрытие перед fork и соединения, унаследованные после него"""
+import sqlite3
+
+import pytest
+
+
+def test_close_all_closes_idle_and_thread_connections(portal, app):
+    pool = portal.db_pool
+    with app.app_context():
+        idle = portal.get_db_connection()
+    thread_conn = pool.thread_connection()
+
+    pool.close_all()
+    for conn in (idle, thread_conn):
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
+    assert pool.thread_connection() is not thread_conn
+
+
+def test_inherited_connections_are_kept_open(portal, app):
+    pool = portal.db_pool
+    with app.app_context():
+        idle = portal.get_db_connection()
+    thread_conn = pool.thread_connection()
+
+    pool.reset_after_fork()
+    # Соединения не используются, но и не освобождаются (освобождение закрыло бы их)
+    assert idle in pool._inherited and thread_conn in pool._inherited
+    assert pool.thread_connection() is not thread_conn
+    assert thread_conn.execute('SELECT 1').fetchone()[0] == 1
+    pool._inherited.clear()
@@ -0,0 +1,46 @@
+"""Запись на репетиторство под одновременной нагрузкой"""
+import threading
+from collections import Counter
+
+STUDENTS = 200
+SEATS = 10
+
+
+def test_concurrent_registrations_never_overbook(portal, app):
+    conn = portal.get_db_connection()
+    conn.execute("INSERT INTO users (id, username, password, full_name, user_type) "
+                 "VALUES (2, 'tutor', '', 'Преподаватель', 'teacher')")
+    conn.executemany("INSERT INTO users (id, username, password, full_name, user_type) "
+                     "VALUES (?, ?, '', ?, 'student')",
+                     [(100 + i, f'student{i}', f'Студент {i}') for i in range(STUDENTS)])
+    conn.commit()
+    with app.app_context():
+        success, _ = portal.tutoring_module.add_tutoring(
+            'Математика', 'Преподаватель', 2, 'teacher', 'Пн', '10:00', '101', '500',
+            max_students=SEATS)
+        assert success
+    tutoring_id = conn.execute('SELECT id FROM tutoring').fetchone()[0]
+
+    barrier = threading.Barrier(STUDENTS)
+    results = []
+
+    def register(student_id):
+        with app.app_context():
+            barrier.wait()
+            results.append(portal.tutoring_module.register_student_for_tutoring(
+                tutoring_id, student_id, f'Студент {student_id}'))
+
+    threads = [threading.Thread(target=register, args=(100 + i,)) for i in range(STUDENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    outcomes = Counter(message for _, message in results)
+    assert outcomes == {"Вы успешно записались на репетиторство!": SEATS,
+                        "Нет свободных мест": STUDENTS - SEATS}
+    assert conn.execute('SELECT registered_count FROM tutoring WHERE id = ?',
+                        (tutoring_id,)).fetchone()[0] == SEATS
+    assert conn.execute('SELECT COUNT(*) FROM tutoring_registrations WHERE tutoring_id = ?',
+                        (tutoring_id,)).fetchone()[0] == SEATS
+    assert portal.tutoring_module.check_registration_counts() == []
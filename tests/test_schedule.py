@@ -0,0 +1,177 @@
+"""Индексы расписания: занятия в слоте, свободные аудитории, версия данных"""
+import random
+import sqlite3
+
+import pytest
+
+import rasp
+
+LESSONS = [
+    (1, 'Понедельник', '09:00-10:30', 'Математика', 'Иванов', '101'),
+    (1, 'Понедельник', '10:45-12:15', 'Физика', 'Петров', '102'),
+    (2, 'Понедельник', '12:15-13:45', 'Химия', 'Сидоров', '103'),
+    (2, 'Вторник', '9:00-10:30', 'Биология', 'Козлов', '101'),
+]
+
+
+@pytest.fixture
+def schedule(portal):
+    conn = portal.get_db_connection()
+    conn.execute('DELETE FROM lessons')
+    rasp.insert_lessons(conn, [rasp.make_lesson_row(*lesson) for lesson in LESSONS])
+    conn.commit()
+    return rasp.ScheduleModule(connection_factory=portal.get_db_connection)
+
+
+def subjects(lessons):
+    return sorted(lesson['subject'] for lesson in lessons)
+
+
+@pytest.mark.parametrize('day, time, expected', [
+    ('Понедельник', '09:00', ['Математика']),
+    ('Понедельник', '9:00', ['Математика']),
+    ('Вторник', '09:00-10:30', ['Биология']),
+    ('Понедельник', '13:00', ['Химия']),
+    ('Понедельник', '10:30', []),
+    ('Понедельник', '10:00-11:00', ['Математика', 'Физика']),
+    ('Понедельник', '12:15', ['Химия']),
+    ('Среда', '09:00', []),
+])
+def test_slot_lessons_overlap(schedule, day, time, expected):
+    assert subjects(schedule.get_slot_lessons(day, time)) == expected
+
+
+def test_room_busy_inside_lesson(schedule):
+    assert '103' not in schedule.find_free_rooms('Понедельник', '13:00')
+    assert schedule.find_free_rooms('Понедельник', '14:00') == ['101', '102', '103']
+    assert schedule.find_free_rooms('Вторник', '9:30') == ['102', '103']
+
+
+@pytest.mark.parametrize('time', ['', 'утро', '25:00', '10:30-09:00'])
+def test_bad_time_rejected(schedule, time):
+    with pytest.raises(ValueError):
+        schedule.get_slot_lessons('Понедельник', time)
+
+
+def test_teacher_lessons_sorted_by_start(portal):
+    conn = portal.get_db_connection()
+    conn.execute('DELETE FROM lessons')
+    rasp.insert_lessons(conn, [
+        rasp.make_lesson_row(1, 'Понедельник', '10:45-12:15', 'Физика', 'Иванов', '102'),
+        rasp.make_lesson_row(1, 'Понедельник', '9:00-10:30', 'Математика', 'Иванов', '101'),
+    ])
+    conn.commit()
+    schedule = rasp.ScheduleModule(connection_factory=portal.get_db_connection)
+    lessons = schedule.get_teacher_schedule('Иванов', 'Понедельник')
+    assert [lesson['time'] for lesson in lessons] == ['9:00-10:30', '10:45-12:15']
+
+
+def test_slot_lookup_matches_full_scan(portal):
+    rng = random.Random(7)
+    rows = []
+    for number in range(300):
+        start = rng.randrange(8 * 60, 20 * 60)
+        end = start + rng.choice((45, 90, 180))
+        rows.append(rasp.make_lesson_row(
+            1, 'Среда', f"{start // 60}:{start % 60:02d}-{end // 60}:{end % 60:02d}",
+            f'Предмет {number}', f'Преподаватель {number}', str(100 + number)))
+    conn = portal.get_db_connection()
+    conn.execute('DELETE FROM lessons')
+    rasp.insert_lessons(conn, rows)
+    conn.commit()
+    schedule = rasp.ScheduleModule(connection_factory=portal.get_db_connection)
+
+    for minute in range(8 * 60, 23 * 60, 7):
+        time = f"{minute // 60}:{minute % 60:02d}"
+        expected = [row[6] for row in rows
+                    if rasp.parse_time_slot(row[4])[0] <= minute < rasp.parse_time_slot(row[4])[1]]
+        assert subjects(schedule.get_slot_lessons('Среда', time)) == sorted(expected)
+
+
+def test_conflicts_found(portal):
+    conn = portal.get_db_connection()
+    conn.execute('DELETE FROM lessons')
+    rasp.insert_lessons(conn, [
+        rasp.make_lesson_row(1, 'Понедельник', '09:00-10:30', 'Математика', 'Иванов', '101'),
+        rasp.make_lesson_row(2, 'Понедельник', '10:00-11:30', 'Физика', 'Иванов', '102'),
+        rasp.make_lesson_row(3, 'Понедельник', '10:30-12:00', 'Химия', 'Петров', '101'),
+        rasp.make_lesson_row(1, 'Вторник', '09:00-10:30', 'Классный час', 'Куратор', '105'),
+        rasp.make_lesson_row(2, 'Вторник', '09:00-10:30', 'Классный час', 'Куратор', '106'),
+    ])
+    # Старые данные с нераспознанным временем: make_lesson_row такое не пропустит
+    conn.execute('''INSERT INTO lessons (course, day, day_order, time, start_min, subject, teacher, room)
+                    VALUES (3, 'Вторник', 1, 'утро', 0, 'История', 'Козлов', '107')''')
+    conn.commit()
+    schedule = rasp.ScheduleModule(connection_factory=portal.get_db_connection)
+    found = sorted((conflict['type'], conflict['key'], conflict['day'])
+                   for conflict in schedule.conflicts)
+    assert found == [('teacher', 'Иванов', 'Понедельник'), ('time', 'утро', 'Вторник')]
+    assert schedule.get_teacher_schedule('Козлов', 'Вторник')[0]['subject'] == 'История'
+
+
+@pytest.fixture
+def group_schedule(portal):
+    conn = portal.get_db_connection()
+    conn.execute('DELETE FROM lessons')
+    rasp.insert_lessons(conn, [
+        rasp.make_lesson_row(1, 'Понедельник', '09:00-10:30', 'Математика', 'Иванов', '101'),
+        rasp.make_lesson_row(1, 'Понедельник', '09:30-11:00', 'Физика', 'Иванов', '102', 'ПИ-21'),
+        rasp.make_lesson_row(1, 'Вторник', '09:00-10:30', 'Химия', 'Петров', '101', 'ПИ-22'),
+        rasp.make_lesson_row(2, 'Вторник', '10:00-11:30', 'Биология', 'Сидоров', '101', 'ИС-11'),
+    ])
+    conn.commit()
+    return rasp.ScheduleModule(connection_factory=portal.get_db_connection)
+
+
+def test_group_lessons_indexed(group_schedule):
+    lessons = group_schedule.get_teacher_schedule('Иванов', 'Понедельник')
+    assert [(lesson['subject'], lesson['group']) for lesson in lessons] == [
+        ('Математика', None), ('Физика', 'ПИ-21')]
+    assert subjects(group_schedule.get_slot_lessons('Вторник', '10:15')) == ['Биология', 'Химия']
+    assert group_schedule.find_free_rooms('Вторник', '10:15') == ['102']
+
+
+def test_group_lessons_checked_for_conflicts(group_schedule):
+    found = {(conflict['type'], conflict['key'], conflict['day']) for conflict in group_schedule.conflicts}
+    assert found == {('teacher', 'Иванов', 'Понедельник'), ('room', '101', 'Вторник')}
+
+
+def test_course_schedule_excludes_group_lessons(group_schedule):
+    assert group_schedule.get_course_days(1) == ['Понедельник']
+    assert subjects(group_schedule.get_schedule(1)['Понедельник']) == ['Математика']
+    assert group_schedule._course_lessons(1) == {'Понедельник': [
+        {'time': '09:00-10:30', 'subject': 'Математика', 'teacher': 'Иванов', 'room': '101',
+         'group': None}]}
+
+
+def test_other_process_import_rebuilds_indexes(portal, app):
+    schedule = portal.schedule_module._get()
+    schedule.check_interval = 0
+    version, _ = portal.data_versions.get('schedule')
+    assert schedule.get_teacher_schedule('Новиков') == {}
+
+    # Запись другим процессом - отдельное соединение с той же базой
+    other = sqlite3.connect('university.db')
+    rasp.insert_lessons(other, [rasp.make_lesson_row(
+        3, 'Пятница', '12:15-13:45', 'История', 'Новиков', '305', 'ИС-31')])
+    other.commit()
+    other.close()
+
+    new_version, _ = portal.data_versions.get('schedule')
+    assert new_version > version
+    assert [lesson['group'] for lesson in schedule.get_teacher_schedule('Новиков', 'Пятница')] == ['ИС-31']
+    assert '305' not in schedule.find_free_rooms('Пятница', '13:00')
+
+
+def test_import_updates_version_in_same_process(portal, app, tmp_path):
+    schedule = portal.schedule_module._get()
+    schedule.check_interval = 3600
+    version, _ = portal.data_versions.get('schedule')
+    csv_path = tmp_path / 'lessons.csv'
+    csv_path.write_text('course,group,day,time,subject,teacher,room\n'
+                        '1,ПИ-21,Понедельник,09:00-10:30,Математика,Иванов,101\n', encoding='utf-8')
+
+    success, _ = schedule.import_lessons_csv(str(csv_path))
+    assert success
+    assert portal.data_versions.get('schedule')[0] > version
+    assert schedule.get_slot_lessons('Понедельник', '09:30')[0]['group'] == 'ПИ-21'
@@ -0,0 +1,116 @@
+"""
+Миграции схемы и использование индексов в частых запросах
+
+Запросы берутся из самих функций (set_trace_callback) и проверяются
+через EXPLAIN QUERY PLAN: каждая таблица читается по индексу, без
+полного просмотра. Постраничные запросы, кроме того, не сортируют
+строки во временном B-дереве - порядок дает индекс.
+"""
+import sqlite3
+
+import pytest
+
+
+def captured_queries(conn, action):
+    """SQL-команды (с подставленными параметрами), выполненные action()"""
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        action()
+    finally:
+        conn.set_trace_callback(None)
+    return [sql for sql in statements
+            if sql.lstrip().upper().startswith(('SELECT', 'INSERT', 'UPDATE', 'DELETE'))]
+
+
+def assert_uses_indexes(conn, sql, ordered=False):
+    """Проверить план запроса; ordered - порядок строк тоже должен давать индекс"""
+    plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+    for step in plan:
+        if step.startswith('SCAN') and 'INDEX' not in step:
+            pytest.fail(f"Полный просмотр таблицы: {step}\n{sql}")
+        if ordered and 'TEMP B-TREE' in step:
+            pytest.fail(f"Сортировка без индекса: {step}\n{sql}")
+    return plan
+
+
+@pytest.fixture
+def tutoring_db(portal, app):
+    """Репетиторство преподавателя (id 2) и студент (id 3)"""
+    with app.app_context():
+        conn = portal.get_db_connection()
+        conn.executemany('''
+        INSERT INTO users (id, username, password, full_name, user_type) VALUES (?, ?, '', ?, ?)
+        ''', [(2, 'teacher', 'Преподаватель', 'teacher'), (3, 'student', 'Студент', 'student')])
+        conn.execute('''
+        INSERT INTO tutoring (id, subject, tutor_name, tutor_id, tutor_type, days, time, room, price)
+        VALUES (1, 'Математика', 'Преподаватель', 2, 'teacher', 'Пн', '10:00', '101', '500')
+        ''')
+        conn.commit()
+    return portal
+
+
+@pytest.mark.parametrize('name, action', [
+    ('запись на репетиторство', lambda portal: portal.tutoring_module.reserve_seat(1, 3)),
+    ('повторная запись', lambda portal: (portal.tutoring_module.reserve_seat(1, 3),
+                                         portal.tutoring_module.reserve_seat(1, 3))),
+    ('мои репетиторства', lambda portal: portal.tutoring_module.get_my_tutoring(2)),
+    ('страница репетиторств', lambda portal: portal.tutoring_module.get_tutoring_data(limit=50)),
+    ('страница пользователей', lambda portal: portal.get_users_page(limit=50)),
+])
+def test_hot_queries_use_indexes(tutoring_db, app, name, action):
+    portal = tutoring_db
+    with app.app_context():
+        conn = portal.get_db_connection()
+        queries = captured_queries(conn, lambda: action(portal))
+        assert queries, name
+        for sql in queries:
+            assert_uses_indexes(conn, sql)
+
+
+def test_registration_lookups_use_expected_indexes(tutoring_db, app):
+    with app.app_context():
+        conn = tutoring_db.get_db_connection()
+        plans = {
+            'idx_registrations_tutoring_student':
+                'SELECT 1 FROM tutoring_registrations WHERE tutoring_id = 1 AND student_id = 3',
+            'idx_registrations_student':
+                'SELECT tutoring_id FROM tutoring_registrations WHERE student_id = 3',
+        }
+        for index, sql in plans.items():
+            assert any(index in step for step in assert_uses_indexes(conn, sql)), sql
+
+
+def test_pages_ordered_by_index(tutoring_db, app):
+    with app.app_context():
+        conn = tutoring_db.get_db_connection()
+        plans = {
+            'idx_tutoring_tutor_created':
+                'SELECT * FROM tutoring WHERE tutor_id = 2 ORDER BY created_at DESC',
+            'idx_tutoring_created':
+                'SELECT * FROM tutoring ORDER BY created_at DESC, id DESC LIMIT 51',
+            'idx_users_type_name':
+                'SELECT * FROM users ORDER BY user_type, full_name, id LIMIT 51',
+        }
+        for index, sql in plans.items():
+            assert any(index in step for step in assert_uses_indexes(conn, sql, ordered=True)), sql
+
+
+def test_migrations_applied_once(portal, app):
+    with app.app_context():
+        conn = portal.get_db_connection()
+        versions = [row[0] for row in conn.execute('SELECT version FROM schema_version ORDER BY version')]
+        assert versions == [version for version, _, _ in portal.MIGRATIONS]
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == portal.SCHEMA_VERSION
+        # Повторный запуск ничего не применяет
+        assert portal.run_migrations(conn) == portal.SCHEMA_VERSION
+        assert conn.execute('SELECT COUNT(*) FROM schema_version').fetchone()[0] == len(versions)
+
+
+def test_duplicate_registration_rejected_by_unique_index(tutoring_db, app):
+    with app.app_context():
+        conn = tutoring_db.get_db_connection()
+        conn.execute('INSERT INTO tutoring_registrations (tutoring_id, student_id) VALUES (1, 3)')
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute('INSERT INTO tutoring_registrations (tutoring_id, student_id) VALUES (1, 3)')
+        conn.rollback()
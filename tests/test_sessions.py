@@ -0,0 +1,56 @@
+"""Сессии на сервере (sessii): cookie с идентификатором, срок действия, сброс"""
+import pytest
+
+from sessii import MemorySessionBackend, SQLiteSessionBackend
+from test_user_cache import login
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteSessionBackend(str(tmp_path / 'sessions.db'))
+    return MemorySessionBackend()
+
+
+def test_backend_expiry_and_user_sessions(backend):
+    backend.save('a', {'user_id': 1, 'name': 'Иванов'}, 1, expires=200.0)
+    backend.save('b', {'user_id': 1}, 1, expires=100.0)
+    backend.save('c', {'user_id': 2}, 2, expires=200.0)
+    assert backend.load('a', now=150.0) == ({'user_id': 1, 'name': 'Иванов'}, 200.0)
+    assert backend.load('b', now=150.0) == (None, None)
+
+    assert backend.sweep(now=150.0) == 1
+    backend.update_user(1, {'name': 'Петров'})
+    assert backend.load('a', now=150.0)[0]['name'] == 'Петров'
+    assert backend.delete_user(1) == 1
+    assert backend.load('a', now=150.0) == (None, None)
+    assert backend.load('c', now=150.0)[0] == {'user_id': 2}
+
+
+def test_cookie_holds_only_new_session_id(portal, app, make_user):
+    make_user('ivanov')
+    client = app.test_client()
+    client.get('/login')
+    with client.session_transaction() as session:
+        session['note'] = 'до входа'
+    before = client.get_cookie('session').value
+
+    login(client, 'ivanov')
+    sid = client.get_cookie('session').value
+    assert sid != before
+    assert portal.session_backend.load(before, now=0) == (None, None)
+    data, _ = portal.session_backend.load(sid, now=0)
+    assert data['username'] == 'ivanov'
+
+
+def test_role_change_ends_sessions(portal, app, make_user):
+    user_id = make_user('ivanov', full_name='Иванов Иван')
+    client = app.test_client()
+    login(client, 'ivanov')
+    assert client.get('/profile').get_data(as_text=True) == 'Иванов Иван'
+
+    with app.app_context():
+        assert portal.update_user_data(user_id, user_type='teacher')[0]
+    response = client.get('/profile')
+    assert response.status_code == 302
+    assert '/login' in response.headers['Location']
@@ -0,0 +1,102 @@
+"""Поиск преподавателей, кэш страницы преподавателей и изменения списка"""
+from prepod import MATCH_EXACT, MATCH_INFIX, MATCH_PREFIX, TeachersModule
+from test_user_cache import login
+
+NEW_TEACHER = {'name': 'Новиков Олег Петрович', 'department': 'Кафедра истории',
+               'position': 'Доцент', 'subjects': ['История']}
+
+
+def make_module(teachers):
+    """TeachersModule с преподавателями (ФИО, кафедра, предметы)"""
+    module = TeachersModule()
+    module.teachers = [{'id': number, 'name': name, 'department': department,
+                        'position': 'Доцент', 'subjects': subjects}
+                       for number, (name, department, subjects) in enumerate(teachers, 1)]
+    module.build_search_index()
+    return module
+
+
+def names(teachers):
+    return [teacher['name'] for teacher in teachers]
+
+
+def test_search_ranks_name_before_subject_and_department():
+    module = make_module([
+        ('Петров Иван', 'Кафедра истории', ['История']),
+        ('Иванова Анна', 'Кафедра Петрова', ['Физика']),
+        ('Сидоров Олег', 'Кафедра физики', ['Петровская эпоха']),
+    ])
+    assert names(module.search_teachers('петров')) == [
+        'Петров Иван', 'Сидоров Олег', 'Иванова Анна']
+    assert names(module.search_teachers('петров', limit=1)) == ['Петров Иван']
+
+
+def test_every_query_word_must_match():
+    module = make_module([
+        ('Фёдоров Сергей', 'Кафедра математики', ['Алгебра']),
+        ('Федорова Мария', 'Кафедра физики', ['Механика']),
+    ])
+    assert names(module.search_teachers('федоров')) == ['Фёдоров Сергей', 'Федорова Мария']
+    assert names(module.search_teachers('ФЕДОР алгебр')) == ['Фёдоров Сергей']
+    assert names(module.search_teachers('едоро механ')) == ['Федорова Мария']
+    assert module.search_teachers('федоров химия') == []
+
+
+def test_prefix_matches_equal_full_scan():
+    module = make_module([(f'Петров{number} Пётр', f'Кафедра {number % 7}', [f'Предмет{number % 11}'])
+                          for number in range(300)])
+    for query in ('пет', 'петров1', 'петров12', 'кафедра', 'предмет1', 'етро', 'я'):
+        expected = {}
+        for word in module.words:
+            if word.startswith(query):
+                expected[word] = MATCH_EXACT if word == query else MATCH_PREFIX
+            elif len(query) >= 3 and query in word:
+                expected[word] = MATCH_INFIX
+        assert module._match_word(query) == expected
+
+
+def index_state(module):
+    return (module.by_id, module.postings, module.words, module.word_trigrams,
+            module.by_department, module.by_subject)
+
+
+def test_incremental_changes_match_rebuild():
+    module = make_module([('Петров Иван', 'Кафедра истории', ['История']),
+                          ('Сидоров Олег', 'Кафедра физики', ['Физика', 'История'])])
+    added = module.add_teacher(NEW_TEACHER)
+    module.remove_teacher(1)
+    incremental = index_state(module)
+    module.build_search_index()
+    assert incremental == index_state(module)
+    assert module.get_facets() == {
+        'departments': [('Кафедра истории', 1), ('Кафедра физики', 1)],
+        'subjects': [('История', 2), ('Физика', 1)]}
+    assert names(module.filter_teachers(subject='История')) == ['Сидоров Олег', added['name']]
+    assert names(module.filter_teachers(department='Кафедра истории', query='олег')) == [added['name']]
+
+
+def test_added_teacher_visible_on_next_request(portal, app, make_user):
+    make_user('ivanov')
+    client = app.test_client()
+    login(client, 'ivanov')
+    client.get('/prepodavateli')  # забирает flash-сообщение о входе
+    page = client.get('/prepodavateli').get_data(as_text=True)
+    assert client.get('/prepodavateli').get_data(as_text=True) == page
+    assert portal.page_cache.get_stats()['hits'] >= 1
+    assert 'Новиков' not in page
+
+    teacher = portal.teachers_module.add_teacher(NEW_TEACHER)
+    assert 'Новиков Олег Петрович' in client.get('/prepodavateli').get_data(as_text=True)
+    filtered = client.get('/prepodavateli?department=Кафедра истории').get_data(as_text=True)
+    assert filtered == 'ivanov||Новиков Олег Петрович;'
+
+    assert portal.teachers_module.remove_teacher(teacher['id'])
+    assert client.get('/prepodavateli').get_data(as_text=True) == page
+
+
+def test_version_follows_changes(portal):
+    version, _ = portal.data_versions.get('teachers')
+    teacher = portal.teachers_module.add_teacher(NEW_TEACHER)
+    assert portal.data_versions.get('teachers')[0] == version + 1
+    portal.teachers_module.remove_teacher(teacher['id'])
+    assert portal.data_versions.get('teachers')[0] == version + 2
@@ -0,0 +1,51 @@
+"""Готовые расписания групп (group_timetables) и выгрузка /raspisanie.ics"""
+import pytest
+
+from test_user_cache import login
+
+CSV = ('course,group,day,time,subject,teacher,room\n'
+       '1,,Понедельник,10:45-12:15,Физика,Петров,102\n'
+       '1,ПИ-21,Понедельник,09:00-10:30,Программирование,Иванов,201\n'
+       '1,ПИ-22,Вторник,09:00-10:30,Базы данных,Сидоров,202\n')
+
+
+@pytest.fixture
+def imported(portal, tmp_path):
+    csv_path = tmp_path / 'lessons.csv'
+    csv_path.write_text(CSV, encoding='utf-8')
+    success, message = portal.schedule_module.import_lessons_csv(str(csv_path))
+    assert success, message
+    return portal.schedule_module
+
+
+def lessons(timetable):
+    return [(day, lesson['subject']) for day in timetable['days']
+            for lesson in timetable['schedule'][day]]
+
+
+def test_group_timetable_adds_group_lessons(imported):
+    assert lessons(imported.get_group_timetable(1, 'ПИ-21')) == [
+        ('Понедельник', 'Программирование'), ('Понедельник', 'Физика')]
+    assert lessons(imported.get_group_timetable(1, 'ПИ-22')) == [
+        ('Понедельник', 'Физика'), ('Вторник', 'Базы данных')]
+
+
+def test_unknown_group_gets_course_timetable(imported):
+    assert lessons(imported.get_group_timetable(1, 'ИС-11')) == [('Понедельник', 'Физика')]
+    assert lessons(imported.get_group_timetable(1)) == [('Понедельник', 'Физика')]
+    assert imported.get_group_timetable(5, 'ПИ-21') == {'days': [], 'schedule': {}, 'exams': []}
+
+
+def test_ics_for_own_group_with_etag(portal, app, make_user, imported):
+    make_user('ivanov', course=1, group='ПИ-21')
+    client = app.test_client()
+    login(client, 'ivanov')
+
+    response = client.get('/raspisanie.ics')
+    body = response.get_data(as_text=True)
+    assert response.mimetype == 'text/calendar'
+    assert body.count('RRULE:FREQ=WEEKLY') == 2
+    assert 'SUMMARY:Программирование' in body and 'SUMMARY:Базы данных' not in body
+
+    again = client.get('/raspisanie.ics', headers={'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304
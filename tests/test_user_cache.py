@@ -0,0 +1,66 @@
+"""
+Кэш записей пользователей (UserCache и кэш в рамках запроса)
+"""
+
+
+def login(client, username, password='Passw0rd!'):
+    response = client.post('/login', data={'username': username, 'password': password})
+    assert response.status_code == 302
+
+
+def test_edit_visible_on_next_request(portal, app, make_user):
+    """Изменение через update_user_data видно уже в следующем запросе"""
+    user_id = make_user('ivanov', full_name='Иванов Иван')
+    client = app.test_client()
+    login(client, 'ivanov')
+
+    assert client.get('/profile').get_data(as_text=True) == 'Иванов Иван'
+    assert client.get('/profile').get_data(as_text=True) == 'Иванов Иван'
+    assert portal.user_cache.get_stats()['hits'] >= 1
+
+    with app.app_context():
+        assert portal.update_user_data(user_id, full_name='Иванов Петр')[0]
+
+    assert client.get('/profile').get_data(as_text=True) == 'Иванов Петр'
+
+
+def test_delete_visible_on_next_request(portal, app, make_user):
+    """Удаленный пользователь не возвращается из кэша"""
+    user_id = make_user('petrov')
+    with app.app_context():
+        assert portal.get_user_by_id(user_id) is not None
+    with app.app_context():
+        assert portal.delete_user(user_id)
+    with app.app_context():
+        assert portal.get_user_by_id(user_id) is None
+
+
+def test_memo_within_request(portal, app, make_user):
+    """Повторное чтение в том же запросе не идет ни в LRU, ни в БД"""
+    user_id = make_user('sidorov')
+    with app.test_request_context():
+        first = portal.get_user_by_id(user_id)
+        before = portal.user_cache.get_stats()
+        assert portal.get_user_by_id(user_id) == first
+        after = portal.user_cache.get_stats()
+    assert after['memo_hits'] == before['memo_hits'] + 1
+    assert (after['hits'], after['misses']) == (before['hits'], before['misses'])
+
+
+def test_put_after_invalidation_is_dropped(portal):
+    """Запись, прочитанная до инвалидации, не попадает в кэш"""
+    cache = portal.UserCache()
+    _, generation = cache.get(1)
+    cache.invalidate(1)
+    cache.put(1, {'id': 1, 'full_name': 'Старое имя'}, generation)
+    assert cache.get(1)[0] is None
+
+
+def test_lru_is_bounded(portal):
+    """Размер кэша не превышает max_size"""
+    cache = portal.UserCache(max_size=2)
+    for user_id in (1, 2, 3):
+        _, generation = cache.get(user_id)
+        cache.put(user_id, {'id': user_id}, generation)
+    assert cache.get_stats()['size'] == 2
+    assert cache.get(1)[0] is None
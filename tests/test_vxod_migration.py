@@ -0,0 +1,73 @@
+"""Перенос таблицы users из старого vxod.py (столбец password_hash)"""
+import hashlib
+import sqlite3
+
+import pytest
+
+from test_user_cache import login
+
+
+def vxod_hash(password, salt='0123456789abcdef'):
+    """Хэш в формате generate_password_hash из vxod.py"""
+    return f"sha256${salt}${hashlib.sha256((password + salt).encode()).hexdigest()}"
+
+
+@pytest.fixture(params=['vxod', 'opened_by_app'])
+def vxod_db(request, tmp_path):
+    """База vxod.py; opened_by_app - после запуска app.py без миграции 6 (пустой password)"""
+    conn = sqlite3.connect(tmp_path / 'university.db')
+    conn.execute('''
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        full_name TEXT NOT NULL,
+        user_type TEXT NOT NULL CHECK(user_type IN ('student', 'teacher', 'starosta', 'admin')),
+        email TEXT UNIQUE,
+        phone TEXT,
+        group_name TEXT,
+        course INTEGER,
+        department TEXT,
+        position TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    conn.executemany('''
+    INSERT INTO users (username, password_hash, full_name, user_type, email, group_name)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ''', [('admin', vxod_hash('admin123'), 'Администратор системы', 'admin', 'admin@university.ru', None),
+          ('ivanov', vxod_hash('Passw0rd!'), 'Иванов Иван', 'starosta', 'ivanov@university.ru', 'ПИ-21')])
+    if request.param == 'opened_by_app':
+        conn.execute("ALTER TABLE users ADD COLUMN password TEXT NOT NULL DEFAULT ''")
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def portal(vxod_db, portal):
+    return portal
+
+
+def test_password_hash_column_dropped(portal):
+    conn = portal.get_db_connection()
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(users)')}
+    assert 'password_hash' not in columns
+    assert {'password', 'created_by', 'unread_count'} <= columns
+    # Индекс миграции 1 создан на старой таблице и пересоздан вместе с ней
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE tbl_name = 'users'")}
+    assert {'idx_users_type_name', 'trg_users_delete_inbox'} <= names
+    # Рассылки миграции 8 дошли до старосты уже в пересозданной таблице
+    assert conn.execute("SELECT unread_count FROM users WHERE username = 'ivanov'").fetchone()[0] > 0
+
+
+def test_old_users_log_in(portal, app):
+    client = app.test_client()
+    login(client, 'ivanov')
+    login(app.test_client(), 'admin', 'admin123')
+
+
+def test_new_users_register(portal, app):
+    with app.app_context():
+        success, message = portal.register_user('petrov', 'Secret1!', 'Петров Петр', 'student')
+        assert success, message
+    login(app.test_client(), 'petrov', 'Secret1!')
@@ -0,0 +1,88 @@
+"""
+Точка входа для рабочего запуска (WSGI)
+
+Запуск под gunicorn с несколькими процессами-воркерами:
+
+    python wsgi.py
+    gunicorn -c wsgi.py wsgi:app      (то же самое)
+
+Настройки (переменные окружения):
+    BIND           адрес и порт, по умолчанию 0.0.0.0:5000
+    WEB_WORKERS    число процессов, по умолчанию 2 * CPU + 1
+    WEB_THREADS    потоков в каждом процессе, по умолчанию 4
+    WEB_TIMEOUT    таймаут запроса в секундах, по умолчанию 30
+    SECRET_KEY     ключ подписи cookie (обязательно задать свой)
+
+Приложение загружается один раз в главном процессе (preload), там же
+проверяется схема БД; воркеры получают его через fork. Сессии и
+ограничения входа по умолчанию хранятся в файлах SQLite, общих для
+всех воркеров (SESSION_DB, LOGIN_LIMIT_DB).
+"""
+import os
+import sys
+
+# Хранилища в памяти у каждого процесса свои - для нескольких
+# воркеров нужны общие файлы SQLite
+os.environ.setdefault('SESSION_DB', 'sessions.db')
+os.environ.setdefault('LOGIN_LIMIT_DB', 'login_limits.db')
+
+from app import check_and_fix_db, create_app, db_pool, preload_modules, reset_after_fork
+
+app = create_app()
+
+
+# ==================== НАСТРОЙКИ GUNICORN ====================
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_WORKERS', 2 * (os.cpu_count() or 1) + 1))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.environ.get('WEB_TIMEOUT', 30))
+preload_app = True
+accesslog = '-'
+
+
+def on_starting(server):
+    """Проверить схему БД и загрузить модули один раз, до запуска воркеров.
+
+    Соединения, открытые при этом, закрываются до fork: воркеры
+    открывают свои.
+    """
+    if not check_and_fix_db():
+        sys.exit("❌ Не удалось инициализировать базу данных")
+    preload_modules()
+    db_pool.close_all()
+
+
+def post_fork(server, worker):
+    """Соединения SQLite не переживают fork - воркер открывает свои"""
+    reset_after_fork()
+
+
+# ==================== ЗАПУСК ПРИЛОЖЕНИЯ ====================
+
+if __name__ == '__main__':
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        sys.exit("❌ Для рабочего запуска нужен gunicorn: pip install gunicorn "
+                 "(на Windows gunicorn не работает - используйте python app.py)")
+
+    class StandaloneApplication(BaseApplication):
+        """gunicorn с настройками из этого модуля"""
+
+        def load_config(self):
+            settings = {
+                'bind': bind, 'workers': workers, 'threads': threads,
+                'worker_class': worker_class, 'timeout': timeout,
+                'preload_app': preload_app, 'accesslog': accesslog,
+                'on_starting': on_starting, 'post_fork': post_fork,
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    print(f"🚀 Запуск: {bind}, процессов: {workers}, потоков: {threads}")
+    StandaloneApplication().run()